@@ -97,6 +97,7 @@ app.get('/api/resources', async (req, res) => {
     const {
       city,
       state,
+      county,
       category,
       zip,
       lat,
@@ -108,7 +109,7 @@ app.get('/api/resources', async (req, res) => {
 
     let query = `
       SELECT 
-        r.id, r.name, r.address, r.city, r.state, r.zip_code,
+        r.id, r.name, r.address, r.city, r.state, r.zip_code, r.county,
         r.phone, r.website, r.description,
         ST_Y(r.location::geometry) as latitude,
         ST_X(r.location::geometry) as longitude,
@@ -153,6 +154,13 @@ app.get('/api/resources', async (req, res) => {
       paramCount++;
     }
 
+    // Counties are stored as TIGER names ("Cook County", "St. Louis city"); "Cook" matches too
+    if (county) {
+      query += ` AND LOWER(r.county) IN (LOWER($${paramCount}), LOWER($${paramCount}) || ' county')`;
+      params.push(county);
+      paramCount++;
+    }
+
     if (zip) {
       query += ` AND r.zip_code LIKE $${paramCount}`;
       params.push(zip + '%');
@@ -0,0 +1,12 @@
+-- Expression indexes backing duplicate detection in scripts/import_csv.py
+-- (LOWER(name) = LOWER(...) and LOWER(address) = LOWER(...) probes)
+--
+-- Run with: psql -d humanaid -f database/migrations/001_resources_dedup_indexes.sql
+-- CONCURRENTLY avoids locking resources against writes on a live database.
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_resources_lower_name
+    ON resources (LOWER(name));
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_resources_lower_address
+    ON resources (LOWER(address))
+    WHERE address <> '';
@@ -0,0 +1,14 @@
+-- Incremental validation state for the categorize/cleanup scripts
+-- (scripts/validation_state.py). One row per (script ruleset, resource):
+-- the rule-set hash and resource version it was last classified at.
+--
+-- Run with: psql -d humanaid -f database/migrations/002_resource_validation_state.sql
+
+CREATE TABLE IF NOT EXISTS resource_validation_state (
+    ruleset VARCHAR(100) NOT NULL,
+    resource_id INTEGER NOT NULL REFERENCES resources(id) ON DELETE CASCADE,
+    rules_hash CHAR(64) NOT NULL,
+    source_updated_at TIMESTAMP,
+    validated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (ruleset, resource_id)
+);
@@ -0,0 +1,11 @@
+-- Google place_id for resources collected from the Places API, so collectors
+-- (scripts/place_registry.py --sync-db) and scripts/import_csv.py can skip
+-- places that are already in the database. NULL for hand-entered resources.
+--
+-- Run with: psql -d humanaid -f database/migrations/003_resources_google_place_id.sql
+-- CONCURRENTLY avoids locking resources against writes on a live database.
+
+ALTER TABLE resources ADD COLUMN IF NOT EXISTS google_place_id VARCHAR(255);
+
+CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS idx_resources_google_place_id
+    ON resources (google_place_id);
@@ -0,0 +1,18 @@
+-- Indexes for the /api/resources city, ZIP and county filters, whose columns
+-- scripts/boundary_join.py fills from TIGER place/county/ZCTA polygons:
+--   LOWER(r.city) = LOWER($1)           -> expression index on LOWER(city)
+--   r.zip_code LIKE '627%'              -> text_pattern_ops (prefix LIKE under any collation)
+--   LOWER(r.county) IN (...)            -> expression index on LOWER(county)
+--
+-- Run with: psql -d humanaid -f database/migrations/004_resources_area_indexes.sql
+-- CONCURRENTLY avoids locking resources against writes on a live database.
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_resources_lower_city
+    ON resources (LOWER(city));
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_resources_zip_pattern
+    ON resources (zip_code text_pattern_ops);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_resources_lower_county
+    ON resources (LOWER(county))
+    WHERE county IS NOT NULL;
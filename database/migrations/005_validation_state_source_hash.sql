@@ -0,0 +1,10 @@
+-- Key resource_validation_state on a content hash instead of last_updated
+-- (scripts/validation_state.py). Nothing bumped last_updated on app edits or
+-- category changes, and fix_resources_timestamp.js renames it to updated_at.
+-- Existing state rows are left without a hash, so the next run re-checks
+-- every resource once.
+--
+-- Run with: psql -d humanaid -f database/migrations/005_validation_state_source_hash.sql
+
+ALTER TABLE resource_validation_state ADD COLUMN IF NOT EXISTS source_hash CHAR(32);
+ALTER TABLE resource_validation_state DROP COLUMN IF EXISTS source_updated_at;
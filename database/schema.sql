@@ -37,6 +37,7 @@ CREATE TABLE resources (
     zip_code VARCHAR(10),
     county VARCHAR(200),
     location GEOGRAPHY(POINT, 4326), -- PostGIS geospatial point
+    google_place_id VARCHAR(255), -- Places API id for collected resources
     
     -- Contact info
     phone VARCHAR(50),
@@ -212,6 +213,16 @@ CREATE TABLE activity_log (
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
+-- Validation state table (incremental runs of the categorize/cleanup scripts)
+CREATE TABLE resource_validation_state (
+    ruleset VARCHAR(100) NOT NULL,
+    resource_id INTEGER NOT NULL REFERENCES resources(id) ON DELETE CASCADE,
+    rules_hash CHAR(64) NOT NULL,
+    source_hash CHAR(32),
+    validated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (ruleset, resource_id)
+);
+
 -- ==================== INDEXES ====================
 
 -- Geospatial index for location-based queries
@@ -224,6 +235,16 @@ CREATE INDEX idx_resources_city ON resources(city);
 CREATE INDEX idx_resources_state ON resources(state);
 CREATE INDEX idx_resources_zip ON resources(zip_code);
 
+-- /api/resources city, ZIP-prefix and county filters (scripts/boundary_join.py fills these)
+CREATE INDEX idx_resources_lower_city ON resources (LOWER(city));
+CREATE INDEX idx_resources_zip_pattern ON resources (zip_code text_pattern_ops);
+CREATE INDEX idx_resources_lower_county ON resources (LOWER(county)) WHERE county IS NOT NULL;
+
+-- Duplicate detection (import_csv.py)
+CREATE INDEX idx_resources_lower_name ON resources (LOWER(name));
+CREATE INDEX idx_resources_lower_address ON resources (LOWER(address)) WHERE address <> '';
+CREATE UNIQUE INDEX idx_resources_google_place_id ON resources (google_place_id);
+
 -- Category lookups
 CREATE INDEX idx_resource_categories_resource ON resource_categories(resource_id);
 CREATE INDEX idx_resource_categories_category ON resource_categories(category_id);
@@ -0,0 +1,28 @@
+"""
+Address Parsing Helpers
+Splits Google Places formatted addresses ("street, city, ST zip, USA") into
+the street, city and ZIP columns the collectors store
+"""
+
+import re
+
+# "ST 62701" or "ST 62701-1234", the state/ZIP component of a formatted address
+STATE_ZIP = re.compile(r'^[A-Z]{2}(?:\s+(\d{5})(?:-\d{4})?)?$')
+
+
+def address_city(formatted_address):
+    """City from a "street, city, ST zip, USA" formatted address"""
+    parts = [p.strip() for p in (formatted_address or '').split(',')]
+    return parts[-3] if len(parts) >= 4 else ''
+
+
+def parse_address(formatted_address):
+    """(street, zip_code) from a "street[, suite], city, ST zip, USA" address or a
+    short "street, city" vicinity; the street keeps any suite/unit parts"""
+    parts = [p.strip() for p in (formatted_address or '').split(',') if p.strip()]
+    if parts and parts[-1].upper() in ('USA', 'US', 'UNITED STATES'):
+        parts = parts[:-1]
+    match = STATE_ZIP.match(parts[-1]) if parts else None
+    if match and len(parts) >= 2:
+        return ', '.join(parts[:-2]), match.group(1) or ''
+    return (parts[0] if parts else ''), ''
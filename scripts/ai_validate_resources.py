@@ -4,24 +4,13 @@ AI-Powered Resource Validation
 Checks each resource's website and uses AI to determine correct categorization
 """
 
-import psycopg2
-import os
-import requests
 from bs4 import BeautifulSoup
 import json
-from dotenv import load_dotenv
-import time
 
-load_dotenv()
-
-def connect_db():
-    return psycopg2.connect(
-        host=os.getenv('DB_HOST', 'localhost'),
-        port=os.getenv('DB_PORT', '5432'),
-        database=os.getenv('DB_NAME', 'humanaid'),
-        user=os.getenv('DB_USER', 'postgres'),
-        password=os.getenv('DB_PASSWORD', 'humanaid2025')
-    )
+from humanaid_db import transaction
+from keyword_matcher import KeywordGroups, KeywordMatcher
+from website_cache import DEFAULT_CACHE_PATH, WebsiteCache, analysis_key, content_hash
+from website_fetcher import DEFAULT_PER_HOST, DEFAULT_WORKERS, WebsiteFetcher
 
 CATEGORIES = {
     'food-pantries': 'Food Pantries (food banks, pantries, soup kitchens, food distribution)',
@@ -40,33 +29,103 @@ CATEGORIES = {
     'REMOVE': 'Commercial Business (should be removed from database)'
 }
 
-def fetch_website_content(url, timeout=10):
-    """Fetch and extract text content from website"""
+def fetch_website_content(url, fetcher, cache=None):
+    """
+    Fetch and extract text content from website
+    Returns (text, cached_page) - cached_page is set when the site is unchanged
+    since the last run, in which case the page was not re-parsed
+    """
     try:
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (compatible; HumanAid/1.0; +https://humanaid.org)'
-        }
-        response = requests.get(url, headers=headers, timeout=timeout, allow_redirects=True)
-        response.raise_for_status()
-        
-        soup = BeautifulSoup(response.content, 'html.parser')
+        cached = cache.get(url) if cache else None
+        response, body = fetcher.get(url, headers=WebsiteCache.conditional_headers(cached))
+        etag = response.headers.get('ETag')
+        last_modified = response.headers.get('Last-Modified')
         
-        # Remove script and style elements
-        for script in soup(["script", "style", "nav", "footer", "header"]):
-            script.decompose()
+        if response.status_code == 304 and cached:
+            cache.touch(url, etag, last_modified)
+            return cached.text, cached
         
-        # Get text
-        text = soup.get_text(separator=' ', strip=True)
+        response.raise_for_status()
         
-        # Clean up whitespace
-        lines = (line.strip() for line in text.splitlines())
-        chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
-        text = ' '.join(chunk for chunk in chunks if chunk)
+        # Servers without validators: fall back to comparing the body hash
+        body_hash = content_hash(body)
+        if cached and cached.content_hash == body_hash:
+            cache.touch(url, etag, last_modified)
+            return cached.text, cached
         
-        # Limit to first 2000 characters for analysis
-        return text[:2000]
+        text = extract_text(body)
+        if cache:
+            cache.store(url, etag, last_modified, body_hash, text)
+        return text, None
     except Exception as e:
-        return None
+        return None, None
+
+def extract_text(html):
+    """Extract the first 2000 characters of visible text from an HTML page"""
+    soup = BeautifulSoup(html, 'html.parser')
+    
+    # Remove script and style elements
+    for script in soup(["script", "style", "nav", "footer", "header"]):
+        script.decompose()
+    
+    # Get text
+    text = soup.get_text(separator=' ', strip=True)
+    
+    # Clean up whitespace
+    lines = (line.strip() for line in text.splitlines())
+    chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
+    text = ' '.join(chunk for chunk in chunks if chunk)
+    
+    # Limit to first 2000 characters for analysis
+    return text[:2000]
+
+# KEEP these even if they match commercial keywords (non-profit thrift stores)
+NONPROFIT_STORES = [
+    'goodwill', 'salvation army', 'st. vincent', 'thrift shop',
+    'thrift store', 'resale shop', 'auxiliary', 'rescue mission'
+]
+
+COMMERCIAL_KEYWORDS = [
+    'restaurant', 'grill', 'cafe', 'diner', 'pizza', 'burger',
+    'wholesale', 'distributor', 'shopping',
+    'theater', 'cinema', 'movie', 'entertainment venue',
+    'coffee shop', 'bakery', 'meal prep',
+    "plato's closet", 'once upon a child', 'liquidation'
+]
+
+# Every keyword checked against name + description + website text, compiled
+# into one matcher so each resource is scanned once
+TEXT_MATCHER = KeywordGroups({
+    'commercial': COMMERCIAL_KEYWORDS,
+    'food_assistance': ['food bank', 'pantry', 'soup kitchen'],
+    'family': ['child care', 'foster care', 'adoption', 'early childhood', 'head start', 'youth programs'],
+    'family_context': ['family services', 'counseling'],
+    'health': ['clinic', 'hospital', 'medical center', 'health department', 'dental', 'vision'],
+    'patient_care': ['patient', 'doctor'],
+    'mental_health': ['mental health', 'therapy', 'counseling', 'psychiatric', 'behavioral health'],
+    'family_counseling': ['family counseling'],
+    'senior': ['senior center', 'senior services', 'aging', 'elderly', 'council on aging'],
+    'housing': ['homeless', 'shelter', 'housing assistance', 'transitional housing'],
+    'overnight': ['overnight', 'beds'],
+    'legal': ['legal aid', 'attorney', 'lawyer', 'law office', 'legal services'],
+    'jobs': ['workforce', 'employment', 'job training', 'career', 'job placement'],
+    'education': ['library', 'school', 'education', 'learning center'],
+    'community': ['community center', 'community organization', 'community initiative', 'civic center'],
+    'initiative': ['character', 'initiative', 'policy'],
+    'clothing': ['thrift store', 'clothing', 'clothes closet', 'resale'],
+    'food_general': ['feeding', 'meals', 'food'],
+    'food_focused': ['nutrition', 'hunger', 'feed'],
+    'food': ['food'],
+})
+
+NAME_MATCHER = KeywordGroups({
+    'nonprofit_store': NONPROFIT_STORES,
+    'veterans': ['vfw', 'american legion', 'veterans', 'va '],
+    'veteran_post': ['vfw', 'legion'],
+    'food': ['food'],
+})
+
+FOOD_PANTRY_MATCHER = KeywordMatcher(['food bank', 'food pantry', 'soup kitchen', 'food distribution', 'food ministry'])
 
 def analyze_organization(name, description, website_content):
     """
@@ -75,116 +134,99 @@ def analyze_organization(name, description, website_content):
     """
     text = (name + ' ' + (description or '') + ' ' + (website_content or '')).lower()
     name_lower = name.lower()
-    
-    # KEEP these even if they match commercial keywords (non-profit thrift stores)
-    nonprofit_stores = [
-        'goodwill', 'salvation army', 'st. vincent', 'thrift shop',
-        'thrift store', 'resale shop', 'auxiliary', 'rescue mission'
-    ]
-    
-    is_nonprofit_store = any(kw in name_lower for kw in nonprofit_stores)
+    hits = TEXT_MATCHER.match(text)
+    name_hits = NAME_MATCHER.match(name_lower)
     
     # Check for commercial businesses (REMOVE) - but skip non-profits
-    if not is_nonprofit_store:
-        commercial_keywords = [
-            'restaurant', 'grill', 'cafe', 'diner', 'pizza', 'burger',
-            'wholesale', 'distributor', 'shopping',
-            'theater', 'cinema', 'movie', 'entertainment venue',
-            'coffee shop', 'bakery', 'meal prep',
-            "plato's closet", 'once upon a child', 'liquidation'
-        ]
-        
-        for keyword in commercial_keywords:
-            if keyword in text and 'food bank' not in text and 'pantry' not in text and 'soup kitchen' not in text:
-                return 'REMOVE', f'Commercial business: {keyword}'
+    if 'nonprofit_store' not in name_hits and 'commercial' in hits and 'food_assistance' not in hits:
+        keyword = next(kw for kw in COMMERCIAL_KEYWORDS if kw in hits['commercial'])
+        return 'REMOVE', f'Commercial business: {keyword}'
     
     # Categorization logic (in priority order)
     
     # Family & Child Services
-    if any(kw in text for kw in ['child care', 'foster care', 'adoption', 'early childhood', 'head start', 'youth programs']):
-        if 'food' not in text or 'family services' in text or 'counseling' in text:
+    if 'family' in hits:
+        if 'food' not in hits or 'family_context' in hits:
             return 'family-shelters', 'Provides family and child services'
     
     # Health Services
-    if any(kw in text for kw in ['clinic', 'hospital', 'medical center', 'health department', 'dental', 'vision']):
-        if 'food' not in text or 'patient' in text or 'doctor' in text:
+    if 'health' in hits:
+        if 'food' not in hits or 'patient_care' in hits:
             return 'free-clinics', 'Provides health/medical services'
     
     # Mental Health
-    if any(kw in text for kw in ['mental health', 'therapy', 'counseling', 'psychiatric', 'behavioral health']):
-        if 'family counseling' not in text:
+    if 'mental_health' in hits:
+        if 'family_counseling' not in hits:
             return 'mental-health', 'Provides mental health services'
     
     # Senior Services
-    if any(kw in text for kw in ['senior center', 'senior services', 'aging', 'elderly', 'council on aging']):
+    if 'senior' in hits:
         return 'senior-centers', 'Provides senior services'
     
     # Veterans Services (prioritize if in name)
-    if any(kw in name_lower for kw in ['vfw', 'american legion', 'veterans', 'va ']):
-        if 'food' not in name_lower or 'vfw' in name_lower or 'legion' in name_lower:
+    if 'veterans' in name_hits:
+        if 'food' not in name_hits or 'veteran_post' in name_hits:
             return 'veterans-services', 'Provides veterans services'
     
     # Housing & Shelters
-    if any(kw in text for kw in ['homeless', 'shelter', 'housing assistance', 'transitional housing']):
-        if 'food' not in text or 'overnight' in text or 'beds' in text:
+    if 'housing' in hits:
+        if 'food' not in hits or 'overnight' in hits:
             return 'emergency-shelters', 'Provides housing/shelter services'
     
     # Legal Services
-    if any(kw in text for kw in ['legal aid', 'attorney', 'lawyer', 'law office', 'legal services']):
+    if 'legal' in hits:
         return 'free-legal-aid', 'Provides legal services'
     
     # Job Training
-    if any(kw in text for kw in ['workforce', 'employment', 'job training', 'career', 'job placement']):
-        if 'food' not in text:
+    if 'jobs' in hits:
+        if 'food' not in hits:
             return 'job-training', 'Provides job training/employment services'
     
     # Education
-    if any(kw in text for kw in ['library', 'school', 'education', 'learning center']):
-        if 'food' not in text:
+    if 'education' in hits:
+        if 'food' not in hits:
             return 'education', 'Provides educational services'
     
     # Community Centers
-    if any(kw in text for kw in ['community center', 'community organization', 'community initiative', 'civic center']):
-        if 'character' in text or 'initiative' in text or 'policy' in text:
+    if 'community' in hits:
+        if 'initiative' in hits:
             return 'community-centers', 'Community organization/initiative'
     
     # Clothing
-    if any(kw in text for kw in ['thrift store', 'clothing', 'clothes closet', 'resale']):
+    if 'clothing' in hits:
         return 'clothing-closets', 'Provides clothing assistance'
     
     # Food Pantries (STRONG priority if in name or description)
-    if any(kw in (name_lower + ' ' + (description or '').lower()) for kw in ['food bank', 'food pantry', 'soup kitchen', 'food distribution', 'food ministry']):
+    if FOOD_PANTRY_MATCHER.search(name_lower + ' ' + (description or '').lower()):
         return 'food-pantries', 'Provides food assistance'
     
     # General food services (lower priority)
-    if any(kw in text for kw in ['feeding', 'meals', 'food']):
+    if 'food_general' in hits:
         # Only if it's clearly food-focused
-        if 'nutrition' in text or 'hunger' in text or 'feed' in text:
+        if 'food_focused' in hits:
             return 'food-pantries', 'Provides food assistance'
     
     return None, None
 
-def validate_resources_with_ai(limit=50, dry_run=True):
+def validate_resources_with_ai(limit=50, dry_run=True, workers=DEFAULT_WORKERS, per_host=DEFAULT_PER_HOST,
+                               cache_path=DEFAULT_CACHE_PATH):
     """Validate resources by checking their websites"""
-    conn = connect_db()
-    cur = conn.cursor()
-    
     # Get resources with websites that might be miscategorized
-    cur.execute("""
-        SELECT r.id, r.name, r.description, r.website, r.city, r.state,
-               c.slug as current_category, c.name as current_category_name
-        FROM resources r
-        JOIN resource_categories rc ON r.id = rc.resource_id
-        JOIN categories c ON rc.category_id = c.id
-        WHERE r.is_active = true 
-        AND r.approval_status = 'approved'
-        AND r.website IS NOT NULL
-        AND r.website != ''
-        ORDER BY r.id
-        LIMIT %s
-    """, (limit,))
-    
-    resources = cur.fetchall()
+    with transaction() as cur:
+        cur.execute("""
+            SELECT r.id, r.name, r.description, r.website, r.city, r.state,
+                   c.slug as current_category, c.name as current_category_name
+            FROM resources r
+            JOIN resource_categories rc ON r.id = rc.resource_id
+            JOIN categories c ON rc.category_id = c.id
+            WHERE r.is_active = true 
+            AND r.approval_status = 'approved'
+            AND r.website IS NOT NULL
+            AND r.website != ''
+            ORDER BY r.id
+            LIMIT %s
+        """, (limit,))
+        resources = cur.fetchall()
     
     print(f"\n{'='*80}")
     print(f"🤖 AI-Powered Validation: Checking {len(resources)} resources with websites")
@@ -194,22 +236,36 @@ def validate_resources_with_ai(limit=50, dry_run=True):
     to_remove = []
     correctly_categorized = []
     
-    for i, resource in enumerate(resources, 1):
+    # Fetch websites concurrently; results come back in resource order
+    fetcher = WebsiteFetcher(max_workers=workers, per_host=per_host)
+    cache = WebsiteCache(cache_path) if cache_path else None
+    pages = fetcher.map(lambda res: fetch_website_content(res[3], fetcher, cache), resources,
+                        url=lambda res: res[3])
+    unchanged_count = 0
+    
+    for i, (resource, (content, unchanged)) in enumerate(zip(resources, pages), 1):
         res_id, name, description, website, city, state, current_cat, current_cat_name = resource
         
         print(f"[{i}/{len(resources)}] Checking: {name}")
         print(f"  Current: {current_cat_name}")
         print(f"  Website: {website}")
         
-        # Fetch website content
-        content = fetch_website_content(website)
-        if content:
+        if unchanged:
+            unchanged_count += 1
+            print(f"  ✓ Website unchanged since last run")
+        elif content:
             print(f"  ✓ Fetched {len(content)} characters from website")
         else:
             print(f"  ✗ Could not fetch website")
         
-        # Analyze
-        correct_cat, reason = analyze_organization(name, description, content)
+        # Analyze (reusing the cached result when neither the page nor the inputs changed)
+        key = analysis_key(name, description)
+        if unchanged and unchanged.analysis_key == key:
+            correct_cat, reason = unchanged.category, unchanged.reason
+        else:
+            correct_cat, reason = analyze_organization(name, description, content)
+            if cache and content is not None:
+                cache.store_analysis(website, key, correct_cat, reason)
         
         if correct_cat == 'REMOVE':
             to_remove.append({
@@ -237,12 +293,10 @@ def validate_resources_with_ai(limit=50, dry_run=True):
         else:
             correctly_categorized.append(name)
             print(f"  ✅ Correctly categorized\n")
-        
-        # Rate limiting
-        time.sleep(0.5)
     
-    cur.close()
-    conn.close()
+    fetcher.close()
+    if cache:
+        cache.close()
     
     # Print summary
     print(f"\n{'='*80}")
@@ -250,6 +304,7 @@ def validate_resources_with_ai(limit=50, dry_run=True):
     print(f"  ✅ Correctly categorized: {len(correctly_categorized)}")
     print(f"  🔄 Need recategorization: {len(to_recategorize)}")
     print(f"  ❌ Should be removed: {len(to_remove)}")
+    print(f"  💾 Unchanged websites (cached): {unchanged_count}")
     print(f"{'='*80}\n")
     
     # Show results
@@ -298,9 +353,18 @@ def main():
     parser = argparse.ArgumentParser()
     parser.add_argument('--fix', action='store_true', help='Apply fixes (default is dry run)')
     parser.add_argument('--limit', type=int, default=50, help='Number of resources to check (default: 50)')
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS,
+                        help=f'Websites fetched concurrently (default: {DEFAULT_WORKERS})')
+    parser.add_argument('--per-host', type=int, default=DEFAULT_PER_HOST,
+                        help=f'Concurrent requests per website host (default: {DEFAULT_PER_HOST})')
+    parser.add_argument('--cache-db', default=DEFAULT_CACHE_PATH,
+                        help='Website content cache (default: data/website_cache.sqlite3 or WEBSITE_CACHE_DB)')
+    parser.add_argument('--no-cache', action='store_true', help='Re-download and re-analyze every website')
     args = parser.parse_args()
     
-    validate_resources_with_ai(limit=args.limit, dry_run=not args.fix)
+    validate_resources_with_ai(limit=args.limit, dry_run=not args.fix,
+                               workers=args.workers, per_host=args.per_host,
+                               cache_path=None if args.no_cache else args.cache_db)
 
 if __name__ == '__main__':
     main()
@@ -4,21 +4,10 @@ Apply AI Validation Results (Safe Mode)
 Only applies HIGH-CONFIDENCE changes from ai_validation_results.json
 """
 
-import psycopg2
-import os
 import json
-from dotenv import load_dotenv
 
-load_dotenv()
-
-def connect_db():
-    return psycopg2.connect(
-        host=os.getenv('DB_HOST', 'localhost'),
-        port=os.getenv('DB_PORT', '5432'),
-        database=os.getenv('DB_NAME', 'humanaid'),
-        user=os.getenv('DB_USER', 'postgres'),
-        password=os.getenv('DB_PASSWORD', 'humanaid2025')
-    )
+from humanaid_db import transaction
+from keyword_matcher import KeywordMatcher
 
 # HIGH-CONFIDENCE removals (definitely commercial)
 HIGH_CONF_REMOVE = [
@@ -34,15 +23,18 @@ PROTECTED_ORGS = [
     'thrift shop', 'auxiliary'
 ]
 
+HIGH_CONF_MATCHER = KeywordMatcher(HIGH_CONF_REMOVE)
+PROTECTED_MATCHER = KeywordMatcher(PROTECTED_ORGS)
+
 def is_protected(name):
     """Check if organization is protected from removal"""
     name_lower = name.lower()
-    return any(protected in name_lower for protected in PROTECTED_ORGS)
+    return PROTECTED_MATCHER.search(name_lower)
 
 def is_high_confidence_removal(name):
     """Check if this is definitely a commercial business"""
     name_lower = name.lower()
-    return any(commercial in name_lower for commercial in HIGH_CONF_REMOVE)
+    return HIGH_CONF_MATCHER.search(name_lower)
 
 def apply_safe_changes(dry_run=True):
     """Apply only HIGH-CONFIDENCE changes"""
@@ -130,29 +122,19 @@ def apply_safe_changes(dry_run=True):
         return
     
     # Apply changes
-    conn = connect_db()
-    cur = conn.cursor()
-    
     print("\n🔧 Applying changes...")
     
     # Remove commercial businesses
-    removed = 0
-    for res in safe_removals:
-        try:
-            cur.execute("DELETE FROM resource_categories WHERE resource_id = %s", (res['id'],))
-            cur.execute("DELETE FROM resources WHERE id = %s", (res['id'],))
-            removed += 1
-        except Exception as e:
-            print(f"❌ Error removing {res['name']}: {str(e)}")
+    ids = [res['id'] for res in safe_removals]
+    with transaction() as cur:
+        cur.execute("DELETE FROM resource_categories WHERE resource_id = ANY(%s)", (ids,))
+        cur.execute("DELETE FROM resources WHERE id = ANY(%s)", (ids,))
+        removed = cur.rowcount
     
     # Recategorize (simplified - would need full implementation)
     print(f"\n⚠️  Recategorization not yet implemented in safe mode")
     print(f"Please run the full validation script with --fix for recategorizations")
     
-    conn.commit()
-    cur.close()
-    conn.close()
-    
     print(f"\n✅ COMPLETE!")
     print(f"  ❌ Removed: {removed} commercial businesses")
     print(f"\n📋 Next Steps:")
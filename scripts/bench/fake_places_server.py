@@ -0,0 +1,355 @@
+#!/usr/bin/env python3
+"""
+Fake Google Places / Geocoding API Server
+Serves the googlemaps endpoints the collectors use from a deterministic
+synthetic world (or recorded fixtures), with configurable latency, errors,
+QPS throttling and a daily quota, so collectors can be run and benchmarked
+without an API key
+
+Point a collector at it with:
+  GOOGLE_MAPS_BASE_URL=http://127.0.0.1:8099 GOOGLE_PLACES_API_KEY=AIzaFakeKey python collect_all_food_banks.py
+
+GET /__stats returns request counters as JSON; GET /__reset clears them.
+"""
+
+import argparse
+import hashlib
+import json
+import math
+import random
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+FAKE_API_KEY = 'AIzaFakeBenchmarkKey'
+
+# Rough state bounding boxes (south, west, north, east) used to place geocodes
+STATE_BOUNDS = {
+    'IL': (36.97, -91.51, 42.51, -87.02),
+    'MO': (35.99, -95.77, 40.61, -89.10),
+}
+DEFAULT_BOUNDS = STATE_BOUNDS['IL']
+
+TILE_DEGREES = 0.1
+PAGE_SIZE = 20
+MAX_RESULTS = 60
+
+# (kind, share of places) - kinds are matched against query words
+PLACE_KINDS = [
+    ('Food Pantry', 4), ('Food Bank', 1), ('Soup Kitchen', 1), ('Community Church', 4),
+    ('Community Center', 2), ('Salvation Army', 1), ('Senior Center', 1), ('Shelter', 1),
+    ('Health Clinic', 2), ('Pizza & Grill', 3), ('Family Restaurant', 3), ('Grocery Market', 2),
+    ('Public Library', 1), ('Park District', 1),
+]
+NAME_PREFIXES = ['Hope', 'Grace', 'Riverside', 'Northside', 'Unity', 'Harvest', 'Lincoln',
+                 'Prairie', 'St. Mark', 'New Life', 'Good Shepherd', 'Faith', 'Main Street']
+STREETS = ['Main St', 'Oak Ave', 'Washington St', 'Lincoln Ave', 'Church St', 'Broadway',
+           'Elm St', 'State St', 'Park Ave', 'Market St']
+
+ENDPOINTS = {
+    '/maps/api/geocode/json': 'geocode',
+    '/maps/api/place/textsearch/json': 'places',
+    '/maps/api/place/nearbysearch/json': 'places_nearby',
+    '/maps/api/place/details/json': 'place',
+}
+
+
+def _seed(*parts):
+    return int(hashlib.sha256('|'.join(map(str, parts)).encode('utf-8')).hexdigest()[:16], 16)
+
+
+def _distance_m(lat1, lng1, lat2, lng2):
+    """Equirectangular distance - plenty for search radii of a few dozen km"""
+    x = math.radians(lng2 - lng1) * math.cos(math.radians((lat1 + lat2) / 2))
+    y = math.radians(lat2 - lat1)
+    return 6371000 * math.hypot(x, y)
+
+
+class SyntheticWorld:
+    """Deterministic places laid out on 0.1 degree tiles, denser near 'towns'"""
+
+    def __init__(self, seed=0, density=1.0, fixtures=None):
+        self.seed = seed
+        self.density = density
+        self.tiles = {}
+        self.places = {}
+        self.geocodes = {}
+        self.lock = threading.Lock()
+        if fixtures:
+            self._load_fixtures(fixtures)
+
+    def _load_fixtures(self, path):
+        """Recorded fixtures: {"geocode": {address: {lat, lng}}, "places": [place, ...]}"""
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        self.geocodes.update({address.lower(): loc for address, loc in data.get('geocode', {}).items()})
+        for place in data.get('places', []):
+            loc = place['geometry']['location']
+            tile = (math.floor(loc['lat'] / TILE_DEGREES), math.floor(loc['lng'] / TILE_DEGREES))
+            self.places[place['place_id']] = place
+            self.tiles.setdefault(tile, []).append(place)
+
+    def _tile(self, i, j):
+        with self.lock:
+            if (i, j) in self.tiles:
+                return self.tiles[(i, j)]
+            rng = random.Random(_seed(self.seed, i, j))
+            # Most tiles are rural; roughly one in eight is a town with many more places
+            urban = rng.random() < 0.125
+            count = int(rng.randint(8, 40) * self.density) if urban else int(rng.randint(0, 4) * self.density)
+            town = f"{rng.choice(NAME_PREFIXES).split()[-1]}ville"
+            places = []
+            for n in range(count):
+                kind = rng.choices([k for k, _ in PLACE_KINDS], weights=[w for _, w in PLACE_KINDS])[0]
+                lat = (i + rng.random()) * TILE_DEGREES
+                lng = (j + rng.random()) * TILE_DEGREES
+                place_id = f"fake_{i}_{j}_{n}"
+                street = f"{rng.randint(100, 9999)} {rng.choice(STREETS)}"
+                place = {
+                    'place_id': place_id,
+                    'name': f"{rng.choice(NAME_PREFIXES)} {kind}",
+                    'formatted_address': f"{street}, {town}, IL 6{rng.randint(1000, 2999)}, USA",
+                    'vicinity': f"{street}, {town}",
+                    'formatted_phone_number': f"({rng.randint(200, 999)}) {rng.randint(200, 999)}-{rng.randint(1000, 9999)}",
+                    'website': f"https://{place_id.replace('_', '-')}.example.org" if rng.random() < 0.6 else None,
+                    'geometry': {'location': {'lat': round(lat, 6), 'lng': round(lng, 6)}},
+                    'types': ['establishment', 'point_of_interest'],
+                    'business_status': 'OPERATIONAL',
+                    'rating': round(rng.uniform(3.0, 5.0), 1),
+                    'opening_hours': {'weekday_text': ['Monday: 9:00 AM - 5:00 PM']},
+                    '_kind': kind.lower(),
+                }
+                places.append(place)
+                self.places[place_id] = place
+            self.tiles[(i, j)] = places
+            return places
+
+    def geocode(self, address):
+        key = address.lower()
+        if key in self.geocodes:
+            loc = self.geocodes[key]
+        else:
+            state = next((s for s in STATE_BOUNDS if f", {s.lower()}" in key or f" {s.lower()} " in f"{key} "), None)
+            south, west, north, east = STATE_BOUNDS.get(state, DEFAULT_BOUNDS)
+            rng = random.Random(_seed(self.seed, 'geocode', key))
+            loc = {'lat': round(rng.uniform(south, north), 6), 'lng': round(rng.uniform(west, east), 6)}
+        return [{'formatted_address': address, 'geometry': {'location': loc}, 'place_id': f"geo_{_seed(key):x}"}]
+
+    def search(self, query, lat, lng, radius):
+        """Places within radius that match the query, nearest first"""
+        radius = min(max(radius, 1), 50000)
+        dlat = radius / 111000
+        dlng = radius / (111000 * max(math.cos(math.radians(lat)), 0.01))
+        words = [w for w in (query or '').lower().split() if len(w) > 3]
+        hits = []
+        for i in range(math.floor((lat - dlat) / TILE_DEGREES), math.floor((lat + dlat) / TILE_DEGREES) + 1):
+            for j in range(math.floor((lng - dlng) / TILE_DEGREES), math.floor((lng + dlng) / TILE_DEGREES) + 1):
+                for place in self._tile(i, j):
+                    loc = place['geometry']['location']
+                    distance = _distance_m(lat, lng, loc['lat'], loc['lng'])
+                    if distance > radius:
+                        continue
+                    # Relevant if the query names its kind; a share of others match loosely
+                    relevant = any(w in place.get('_kind', place.get('name', '').lower()) for w in words) or _seed(place['place_id'], query) % 4 == 0
+                    if relevant or not words:
+                        hits.append((distance, place))
+        hits.sort(key=lambda hit: hit[0])
+        return [place for _, place in hits[:MAX_RESULTS]]
+
+    def details(self, place_id):
+        with self.lock:
+            place = self.places.get(place_id)
+        if place is None and place_id.startswith('fake_'):
+            # Details for a place whose tile this process has not generated yet
+            _, i, j, _ = place_id.split('_')
+            self._tile(int(i), int(j))
+            with self.lock:
+                place = self.places.get(place_id)
+        return place
+
+
+def public(place, summary=False):
+    """Strip internal fields; search results carry only the summary fields"""
+    result = {k: v for k, v in place.items() if not k.startswith('_') and v is not None}
+    if summary:
+        for key in ('formatted_phone_number', 'website', 'opening_hours'):
+            result.pop(key, None)
+    return result
+
+
+class FakeApi:
+    """Request policy (latency, errors, throttling, quota), paging and stats"""
+
+    def __init__(self, world, latency_ms=50, jitter_ms=20, error_rate=0.0, max_qps=None,
+                 quota=None, page_token_delay=2.0):
+        self.world = world
+        self.latency = latency_ms / 1000
+        self.jitter = jitter_ms / 1000
+        self.error_rate = error_rate
+        self.max_qps = max_qps
+        self.quota = quota
+        self.page_token_delay = page_token_delay
+        self.rng = random.Random(1)
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.stats = Counter()
+            self.pages = {}
+            self.window = []
+            self.started = time.monotonic()
+
+    def snapshot(self):
+        with self.lock:
+            stats = dict(self.stats)
+            stats['elapsed'] = round(time.monotonic() - self.started, 3)
+        return stats
+
+    def _admit(self, endpoint):
+        """Returns an error status for this request, or None to serve it"""
+        with self.lock:
+            self.stats['requests'] += 1
+            self.stats[endpoint] += 1
+            now = time.monotonic()
+            if self.quota is not None and self.stats['served'] >= self.quota:
+                self.stats['quota_rejected'] += 1
+                return 'OVER_DAILY_LIMIT'
+            if self.max_qps:
+                self.window = [t for t in self.window if now - t < 1.0]
+                if len(self.window) >= self.max_qps:
+                    self.stats['throttled'] += 1
+                    return 'OVER_QUERY_LIMIT'
+                self.window.append(now)
+            if self.error_rate and self.rng.random() < self.error_rate:
+                self.stats['errors'] += 1
+                return 'HTTP_500'
+            self.stats['served'] += 1
+            return None
+
+    def handle(self, endpoint, params):
+        """Returns (http_status, body)"""
+        time.sleep(max(0.0, self.latency + self.rng.uniform(-self.jitter, self.jitter)))
+        error = self._admit(endpoint)
+        if error == 'HTTP_500':
+            return 500, {'status': 'UNKNOWN_ERROR'}
+        if error:
+            return 200, {'status': error, 'error_message': f'Fake server: {error}'}
+
+        if endpoint == 'geocode':
+            return 200, {'status': 'OK', 'results': self.world.geocode(params.get('address', ''))}
+        if endpoint == 'place':
+            place = self.world.details(params.get('place_id') or params.get('placeid', ''))
+            if place is None:
+                return 200, {'status': 'NOT_FOUND'}
+            return 200, {'status': 'OK', 'result': public(place)}
+        return 200, self._search(params)
+
+    def _search(self, params):
+        token = params.get('pagetoken')
+        if token:
+            with self.lock:
+                page = self.pages.get(token)
+            if page is None:
+                return {'status': 'INVALID_REQUEST', 'error_message': 'Unknown page token'}
+            ready_at, results = page
+            if time.monotonic() < ready_at:
+                return {'status': 'INVALID_REQUEST', 'error_message': 'Page token not ready yet'}
+        else:
+            query = params.get('query') or params.get('keyword') or params.get('name') or ''
+            if 'location' in params:
+                lat, lng = (float(v) for v in params['location'].split(','))
+            else:
+                loc = self.world.geocode(query)[0]['geometry']['location']
+                lat, lng = loc['lat'], loc['lng']
+            results = self.world.search(query, lat, lng, float(params.get('radius', 50000)))
+
+        body = {'status': 'OK' if results else 'ZERO_RESULTS',
+                'results': [public(p, summary=True) for p in results[:PAGE_SIZE]]}
+        if len(results) > PAGE_SIZE:
+            next_token = f"page_{_seed(time.monotonic_ns(), id(results)):x}"
+            with self.lock:
+                self.pages[next_token] = (time.monotonic() + self.page_token_delay, results[PAGE_SIZE:])
+            body['next_page_token'] = next_token
+        return body
+
+
+def make_handler(api):
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            url = urlsplit(self.path)
+            if url.path == '/__stats':
+                return self._send(200, api.snapshot())
+            if url.path == '/__reset':
+                api.reset()
+                return self._send(200, {'status': 'OK'})
+            endpoint = ENDPOINTS.get(url.path)
+            if endpoint is None:
+                return self._send(404, {'status': 'NOT_FOUND'})
+            params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+            if not params.get('key', '').startswith('AIza'):
+                return self._send(200, {'status': 'REQUEST_DENIED', 'error_message': 'Invalid key'})
+            self._send(*api.handle(endpoint, params))
+
+        def _send(self, status, body):
+            payload = json.dumps(body).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+
+def start_server(api, host='127.0.0.1', port=0):
+    """Serve api on a background thread; returns the server (server.server_port is the port)"""
+    server = ThreadingHTTPServer((host, port), make_handler(api))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def add_server_arguments(parser):
+    parser.add_argument('--latency-ms', type=float, default=50, help='Mean response latency (default: 50)')
+    parser.add_argument('--jitter-ms', type=float, default=20, help='Latency jitter +/- (default: 20)')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Fraction of requests answered with HTTP 500')
+    parser.add_argument('--max-qps', type=float, help='Answer OVER_QUERY_LIMIT above this rate')
+    parser.add_argument('--quota', type=int, help='Answer OVER_DAILY_LIMIT after this many served requests')
+    parser.add_argument('--page-token-delay', type=float, default=2.0,
+                        help='Seconds before a next_page_token becomes valid (default: 2)')
+    parser.add_argument('--density', type=float, default=1.0, help='Scale the number of synthetic places')
+    parser.add_argument('--seed', type=int, default=0, help='Synthetic world seed')
+    parser.add_argument('--fixtures', help='JSON file of recorded geocodes/places to serve')
+
+
+def api_from_args(args):
+    world = SyntheticWorld(seed=args.seed, density=args.density, fixtures=args.fixtures)
+    return FakeApi(world, latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, error_rate=args.error_rate,
+                   max_qps=args.max_qps, quota=args.quota, page_token_delay=args.page_token_delay)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Fake Google Places/Geocoding API for offline runs')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8099)
+    add_server_arguments(parser)
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(api_from_args(args)))
+    server.daemon_threads = True
+    print(f"🧪 Fake Places API on http://{args.host}:{args.port}  (stats: /__stats)")
+    print(f"   GOOGLE_MAPS_BASE_URL=http://{args.host}:{args.port} GOOGLE_PLACES_API_KEY={FAKE_API_KEY}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n👋 Stopped")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+"""
+Collector Benchmark Suite for HumanAid
+Runs each Google Places collector against the fake API server and reports
+wall time, request count, requests/sec and peak RSS - no API key needed
+
+Usage:
+    python bench/run_benchmarks.py
+    python bench/run_benchmarks.py --collectors food_banks small_towns --cities 2
+    python bench/run_benchmarks.py --latency-ms 100 --error-rate 0.05 --json bench.json
+    python bench/run_benchmarks.py --baseline bench.json --tolerance 0.2
+    python bench/run_benchmarks.py --details none     # search fields only, no place() calls
+    python bench/run_benchmarks.py --max-pages 1      # first result page only, no next_page_token
+    python bench/run_benchmarks.py --gazetteer        # city centroids from an offline gazetteer
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import resource
+import subprocess
+import tempfile
+from contextlib import redirect_stdout
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+SCRIPTS_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, BENCH_DIR)
+sys.path.insert(0, SCRIPTS_DIR)
+
+from fake_places_server import ENDPOINTS, FAKE_API_KEY, add_server_arguments, api_from_args, start_server
+from gazetteer import load_gazetteer, write_gazetteer
+from place_details import DEFAULT_DETAILS_MODE, add_details_argument
+from places_fetcher import MAX_PAGES, add_pagination_argument
+
+DEFAULT_CITIES = 2
+
+
+def _run_food_banks(cache_path, cities, details, max_pages, gazetteer):
+    from collect_all_food_banks import FoodBankCollector, ILLINOIS_CITIES
+    collector = FoodBankCollector(FAKE_API_KEY, cache_path=cache_path, details=details, max_pages=max_pages,
+                                  gazetteer=gazetteer)
+    collector.collect_pipelined(collector.start_city(city, 'IL', radius) for city, radius in ILLINOIS_CITIES[:cities])
+    collector.resolve_details()
+    return len(collector.results)
+
+
+def _run_optimized(cache_path, cities, details, max_pages, gazetteer):
+    from collect_food_banks_optimized import OptimizedFoodBankCollector, ILLINOIS_PRIORITY_CITIES
+    collector = OptimizedFoodBankCollector(FAKE_API_KEY, cache_path=cache_path, details=details, max_pages=max_pages,
+                                           gazetteer=gazetteer)
+    for city, radius in ILLINOIS_PRIORITY_CITIES[:cities]:
+        collector.collect_city_optimized(city, 'IL', radius)
+    collector.resolve_details()
+    return len(collector.results)
+
+
+def _run_small_towns(cache_path, cities, details, max_pages, gazetteer):
+    from collect_small_towns_IL import SmallTownCollector, SMALL_IL_CITIES
+    collector = SmallTownCollector(FAKE_API_KEY, cache_path=cache_path, details=details, max_pages=max_pages,
+                                   gazetteer=gazetteer)
+    for city, radius in SMALL_IL_CITIES[:cities]:
+        collector.collect_city(city, radius)
+    collector.resolve_details()
+    return len(collector.results)
+
+
+def _run_places(cache_path, cities, details, max_pages, gazetteer):
+    from google_places_collector import PlacesCollector
+    from collect_food_banks_optimized import ILLINOIS_PRIORITY_CITIES
+    collector = PlacesCollector(FAKE_API_KEY, cache_path=cache_path, details=details, max_pages=max_pages,
+                                gazetteer=gazetteer)
+    for city, radius in ILLINOIS_PRIORITY_CITIES[:cities]:
+        collector.search_location(city, 'IL', radius)
+    collector.resolve_details()
+    return len(collector.results)
+
+
+def _run_resources(cache_path, cities, details, max_pages, gazetteer):
+    # Reads GOOGLE_MAPS_API_KEY / PLACES_CACHE_DB from the environment and
+    # always walks its own fixed city list, so `cities` does not apply
+    sys.path.insert(0, os.path.join(SCRIPTS_DIR, 'data-collection'))
+    from collect_il_mo_resources import ResourceCollector
+    collector = ResourceCollector(details=details, max_pages=max_pages, gazetteer=gazetteer)
+    collector.collect_food_pantries_il()
+    collector.resolve_details()
+    return len(collector.resources)
+
+
+COLLECTORS = {
+    'food_banks': _run_food_banks,
+    'optimized': _run_optimized,
+    'small_towns': _run_small_towns,
+    'places': _run_places,
+    'resources': _run_resources,
+}
+
+
+def run_collector(name, cache_path, cities, details, max_pages=MAX_PAGES, gazetteer_path=None, verbose=False):
+    """Child process: run one collector and print a JSON result line"""
+    started = time.perf_counter()
+    with open(os.devnull, 'w') as devnull, redirect_stdout(sys.stdout if verbose else devnull):
+        gazetteer = load_gazetteer(gazetteer_path) if gazetteer_path else None
+        found = COLLECTORS[name](cache_path, cities, details, max_pages, gazetteer)
+    wall = time.perf_counter() - started
+    print(json.dumps({
+        'resources': found,
+        'wall_seconds': round(wall, 3),
+        'peak_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    }))
+
+
+def write_bench_gazetteer(api, path):
+    """Gazetteer of every collector city at the fake world's geocode for it"""
+    from collect_all_food_banks import ILLINOIS_CITIES, MISSOURI_CITIES
+    from collect_food_banks_optimized import ILLINOIS_PRIORITY_CITIES
+    from collect_small_towns_IL import SMALL_IL_CITIES
+    cities = {(city, 'IL') for city, _ in ILLINOIS_CITIES + ILLINOIS_PRIORITY_CITIES + SMALL_IL_CITIES}
+    cities |= {(city, 'MO') for city, _ in MISSOURI_CITIES}
+    rows = []
+    for city, state in sorted(cities):
+        loc = api.world.geocode(f"{city}, {state}, USA")[0]['geometry']['location']
+        rows.append(('place', state, city, loc['lat'], loc['lng']))
+    write_gazetteer(rows, path)
+
+
+def benchmark(name, api, base_url, cities, workdir, details=DEFAULT_DETAILS_MODE, max_pages=MAX_PAGES,
+              gazetteer_path=None, verbose=False):
+    """Run one collector in a fresh process with a cold cache and collect its numbers"""
+    cache_path = os.path.join(workdir, f"{name}_cache.db")
+    env = dict(os.environ,
+               GOOGLE_MAPS_BASE_URL=base_url,
+               GOOGLE_MAPS_API_KEY=FAKE_API_KEY,
+               GOOGLE_PLACES_API_KEY=FAKE_API_KEY,
+               PLACES_CACHE_DB=cache_path,
+               QUERY_YIELD_DB=os.path.join(workdir, f"{name}_yield.db"),
+               PLACE_REGISTRY_DB=os.path.join(workdir, f"{name}_registry.db"))
+    cmd = [sys.executable, os.path.abspath(__file__), '--run-collector', name,
+           '--cities', str(cities), '--cache-db', cache_path, '--details', details, '--max-pages', str(max_pages)]
+    if gazetteer_path:
+        cmd += ['--gazetteer-file', gazetteer_path]
+    if verbose:
+        cmd.append('--verbose')
+
+    api.reset()
+    proc = subprocess.run(cmd, env=env, cwd=workdir, stdout=subprocess.PIPE, text=True)
+    stats = api.snapshot()
+    if verbose:
+        print(proc.stdout, end='')
+    if proc.returncode != 0:
+        raise RuntimeError(f"{name} exited with status {proc.returncode}")
+
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+    result['collector'] = name
+    result['requests'] = stats.get('requests', 0)
+    result['errors'] = stats.get('errors', 0) + stats.get('throttled', 0) + stats.get('quota_rejected', 0)
+    result['requests_per_sec'] = round(result['requests'] / result['wall_seconds'], 2) if result['wall_seconds'] else 0.0
+    # Per-endpoint counts under the names the fake server records them with
+    for endpoint in ENDPOINTS.values():
+        result[endpoint] = stats.get(endpoint, 0)
+    result['searches'] = result['places'] + result['places_nearby']
+    return result
+
+
+def compare(results, baseline, tolerance):
+    """Returns a list of regressions against a baseline results file"""
+    previous = {r['collector']: r for r in baseline['results']}
+    regressions = []
+    for result in results:
+        old = previous.get(result['collector'])
+        if not old:
+            continue
+        if result['requests_per_sec'] < old['requests_per_sec'] * (1 - tolerance):
+            regressions.append(f"{result['collector']}: {result['requests_per_sec']} req/s "
+                               f"(baseline {old['requests_per_sec']})")
+        if result['wall_seconds'] > old['wall_seconds'] * (1 + tolerance):
+            regressions.append(f"{result['collector']}: {result['wall_seconds']}s wall "
+                               f"(baseline {old['wall_seconds']}s)")
+        if result['requests'] > old['requests'] * (1 + tolerance):
+            regressions.append(f"{result['collector']}: {result['requests']} requests "
+                               f"(baseline {old['requests']})")
+        if 'searches' in old and result['searches'] > old['searches'] * (1 + tolerance):
+            regressions.append(f"{result['collector']}: {result['searches']} searches "
+                               f"(baseline {old['searches']})")
+        if result['peak_rss_mb'] > old['peak_rss_mb'] * (1 + tolerance):
+            regressions.append(f"{result['collector']}: {result['peak_rss_mb']} MB peak RSS "
+                               f"(baseline {old['peak_rss_mb']} MB)")
+    return regressions
+
+
+def print_report(results):
+    print(f"\n{'='*94}")
+    print(f"{'Collector':<14}{'Wall (s)':>10}{'Requests':>10}{'Req/s':>9}{'Errors':>8}"
+          f"{'Searches':>10}{'Details':>9}{'Found':>8}{'Peak RSS (MB)':>16}")
+    print(f"{'-'*94}")
+    for r in results:
+        print(f"{r['collector']:<14}{r['wall_seconds']:>10.2f}{r['requests']:>10}{r['requests_per_sec']:>9.1f}"
+              f"{r['errors']:>8}{r['searches']:>10}{r['place']:>9}{r['resources']:>8}{r['peak_rss_mb']:>16.1f}")
+    print(f"{'='*94}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the Places collectors against a fake API server')
+    parser.add_argument('--collectors', nargs='+', choices=list(COLLECTORS), default=list(COLLECTORS),
+                        help='Collectors to run (default: all)')
+    parser.add_argument('--cities', type=int, default=DEFAULT_CITIES,
+                        help=f'Cities per collector (default: {DEFAULT_CITIES})')
+    parser.add_argument('--json', help='Write results to this JSON file')
+    parser.add_argument('--baseline', help='Compare against a previous --json results file')
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help='Allowed regression vs. --baseline as a fraction (default: 0.2)')
+    parser.add_argument('--gazetteer', action='store_true',
+                        help="Geocode collector cities from an offline gazetteer of the fake world's cities")
+    parser.add_argument('--verbose', action='store_true', help='Show collector output')
+    parser.add_argument('--run-collector', choices=list(COLLECTORS), help=argparse.SUPPRESS)
+    parser.add_argument('--cache-db', help=argparse.SUPPRESS)
+    parser.add_argument('--gazetteer-file', help=argparse.SUPPRESS)
+    add_details_argument(parser)
+    add_pagination_argument(parser)
+    add_server_arguments(parser)
+    args = parser.parse_args()
+
+    if args.run_collector:
+        run_collector(args.run_collector, args.cache_db, args.cities, args.details, args.max_pages,
+                      args.gazetteer_file, args.verbose)
+        return 0
+
+    api = api_from_args(args)
+    server = start_server(api)
+    base_url = f"http://127.0.0.1:{server.server_port}"
+    print(f"🧪 Fake Places API on {base_url} "
+          f"(latency {args.latency_ms}ms ±{args.jitter_ms}, errors {args.error_rate:.0%})")
+
+    results = []
+    try:
+        with tempfile.TemporaryDirectory(prefix='humanaid_bench_') as workdir:
+            gazetteer_path = None
+            if args.gazetteer:
+                gazetteer_path = os.path.join(workdir, 'gazetteer.tsv')
+                write_bench_gazetteer(api, gazetteer_path)
+            for name in args.collectors:
+                print(f"⏱️  {name}...", end=" ", flush=True)
+                result = benchmark(name, api, base_url, args.cities, workdir, args.details, args.max_pages,
+                                   gazetteer_path, args.verbose)
+                print(f"✅ {result['wall_seconds']:.2f}s, {result['requests']} requests")
+                results.append(result)
+    finally:
+        server.shutdown()
+
+    print_report(results)
+
+    report = {
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'cities': args.cities,
+        'details': args.details,
+        'max_pages': args.max_pages,
+        'gazetteer': args.gazetteer,
+        'server': {k: getattr(args, k) for k in ('latency_ms', 'jitter_ms', 'error_rate', 'max_qps',
+                                                 'quota', 'page_token_delay', 'density', 'seed')},
+        'results': results,
+    }
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"💾 Results written to {args.json}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        if regressions:
+            print(f"\n❌ {len(regressions)} regression(s) beyond {args.tolerance:.0%}:")
+            for line in regressions:
+                print(f"   - {line}")
+            return 1
+        print(f"\n✅ No regressions beyond {args.tolerance:.0%} of {args.baseline}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+"""
+Point-in-Polygon Boundary Join
+Assigns collected resources the city, county, state and ZIP they actually
+lie in - TIGER/Line place, county and ZCTA polygons bulk-loaded into
+shapely STRtrees, joined against a whole batch of coordinates with one
+vectorized query per layer - instead of the city that was searched
+
+Needs shapely >= 2.0 (pip install shapely) and, for shapefiles, pyshp
+(pip install pyshp). Put the TIGER/Line files
+(https://www.census.gov/geographies/mapping-files/time-series/geo/tiger-line-file.html)
+in data/tiger/, zipped as downloaded or as GeoJSON, e.g.:
+    tl_2023_17_place.zip  tl_2023_29_place.zip  tl_2023_us_county.zip  tl_2023_us_zcta520.zip
+
+Usage:
+    python boundary_join.py --csv ../data/il_all_food_banks.csv    # rewrite city/county/zip_code columns
+    python boundary_join.py --db                                   # backfill resources in the database
+"""
+
+import os
+import csv
+import glob
+import json
+import argparse
+from collections import Counter
+
+try:
+    import numpy as np
+    import shapely
+    from shapely.geometry import shape
+    from shapely.strtree import STRtree
+    SHAPELY_AVAILABLE = True
+except ImportError:
+    SHAPELY_AVAILABLE = False
+
+DEFAULT_BOUNDARY_DIR = os.getenv(
+    'TIGER_DIR',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data', 'tiger')
+)
+
+# Layer -> (file name pattern, attributes to try in order). County NAMELSAD keeps
+# "St. Louis County" and the independent "St. Louis city" apart.
+LAYERS = {
+    'place': ('*place*', ('NAME',)),
+    'county': ('*county*', ('NAMELSAD', 'NAME')),
+    'zcta': ('*zcta*', ('ZCTA5CE20', 'ZCTA5CE10', 'GEOID20', 'GEOID10')),
+}
+
+BOUNDARY_EXTENSIONS = ('.zip', '.shp', '.geojson', '.json')
+
+STATE_FIPS = {
+    '01': 'AL', '02': 'AK', '04': 'AZ', '05': 'AR', '06': 'CA', '08': 'CO', '09': 'CT', '10': 'DE',
+    '11': 'DC', '12': 'FL', '13': 'GA', '15': 'HI', '16': 'ID', '17': 'IL', '18': 'IN', '19': 'IA',
+    '20': 'KS', '21': 'KY', '22': 'LA', '23': 'ME', '24': 'MD', '25': 'MA', '26': 'MI', '27': 'MN',
+    '28': 'MS', '29': 'MO', '30': 'MT', '31': 'NE', '32': 'NV', '33': 'NH', '34': 'NJ', '35': 'NM',
+    '36': 'NY', '37': 'NC', '38': 'ND', '39': 'OH', '40': 'OK', '41': 'OR', '42': 'PA', '44': 'RI',
+    '45': 'SC', '46': 'SD', '47': 'TN', '48': 'TX', '49': 'UT', '50': 'VT', '51': 'VA', '53': 'WA',
+    '54': 'WV', '55': 'WI', '56': 'WY', '72': 'PR',
+}
+
+# Resource columns the join may rewrite
+JOIN_FIELDS = ('city', 'county', 'state', 'zip_code')
+
+
+def read_features(path):
+    """(geometry, properties) pairs from a GeoJSON file or a shapefile (.shp or zipped)"""
+    if path.endswith(('.geojson', '.json')):
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        for feature in data['features']:
+            if feature.get('geometry'):
+                yield shape(feature['geometry']), feature.get('properties') or {}
+        return
+
+    import shapefile  # pyshp
+
+    with shapefile.Reader(path) as reader:
+        fields = [field[0] for field in reader.fields[1:]]
+        for record in reader.iterShapeRecords():
+            if record.shape.points:
+                yield shape(record.shape.__geo_interface__), dict(zip(fields, record.record))
+
+
+class BoundaryLayer:
+    """One polygon layer in an STRtree; lookup() maps a batch of points to each one's polygon"""
+
+    def __init__(self, paths, attributes):
+        geometries, self.values, self.states = [], [], []
+        for path in paths:
+            for geometry, properties in read_features(path):
+                attribute = next((name for name in attributes if properties.get(name)), None)
+                if attribute is None:
+                    continue
+                geometries.append(geometry)
+                self.values.append(str(properties[attribute]).strip())
+                self.states.append(STATE_FIPS.get(str(properties.get('STATEFP', '')).zfill(2)))
+        self.tree = STRtree(geometries)
+
+    def __len__(self):
+        return len(self.values)
+
+    def lookup(self, points):
+        """Polygon index per point (-1 outside every polygon); on a shared edge the first polygon wins"""
+        found = np.full(len(points), -1)
+        point_index, polygon_index = self.tree.query(points, predicate='intersects')
+        found[point_index[::-1]] = polygon_index[::-1]
+        return found
+
+
+class BoundaryJoin:
+    """Place/county/ZCTA layers; assign() moves resources to the areas they lie in.
+
+    A resource outside every place polygon (unincorporated) keeps its city,
+    and one outside every ZCTA keeps the ZIP from its address."""
+
+    def __init__(self, place_paths=(), county_paths=(), zcta_paths=()):
+        self.layers = {}
+        for name, paths in (('place', place_paths), ('county', county_paths), ('zcta', zcta_paths)):
+            if paths:
+                self.layers[name] = BoundaryLayer(paths, LAYERS[name][1])
+        self.stats = Counter()
+
+    def lookup(self, coordinates):
+        """{city, county, state, zip_code} per (lat, lng); fields outside every polygon are None"""
+        coordinates = list(coordinates)
+        matches = [dict.fromkeys(JOIN_FIELDS) for _ in coordinates]
+        if not coordinates:
+            return matches
+
+        lats, lngs = np.array(coordinates, dtype=float).T
+        points = shapely.points(lngs, lats)
+        for name, layer in self.layers.items():
+            for match, i in zip(matches, layer.lookup(points)):
+                if i < 0:
+                    continue
+                if name == 'place':
+                    match['city'] = layer.values[i]
+                elif name == 'county':
+                    match['county'] = layer.values[i]
+                    match['state'] = layer.states[i]
+                else:
+                    match['zip_code'] = layer.values[i]
+        return matches
+
+    def assign(self, resources):
+        """Rewrite city/county/state/zip_code of resources (dicts or objects) with coordinates, in place"""
+        def get(resource, field):
+            return resource.get(field) if isinstance(resource, dict) else getattr(resource, field, None)
+
+        located = [r for r in resources if get(r, 'latitude') not in (None, '') and get(r, 'longitude') not in (None, '')]
+        matches = self.lookup((float(get(r, 'latitude')), float(get(r, 'longitude'))) for r in located)
+        for resource, match in zip(located, matches):
+            self.stats['joined'] += 1
+            for field, value in match.items():
+                if not value or value == get(resource, field):
+                    continue
+                if get(resource, field):
+                    self.stats[f"{field}_changed"] += 1
+                if isinstance(resource, dict):
+                    resource[field] = value
+                else:
+                    setattr(resource, field, value)
+        return len(located)
+
+    def summary(self):
+        labels = {'place': 'places', 'county': 'counties', 'zcta': 'ZCTAs'}
+        sizes = ', '.join(f"{len(layer)} {labels[name]}" for name, layer in self.layers.items())
+        return (f"Boundary join ({sizes}): {self.stats['joined']} resources, "
+                f"{self.stats['city_changed']} cities, {self.stats['zip_code_changed']} ZIPs "
+                f"and {self.stats['state_changed']} states corrected")
+
+
+def boundary_files(directory):
+    """{layer: [paths]} of the TIGER files found in directory"""
+    files = {}
+    for name, (pattern, _) in LAYERS.items():
+        paths = sorted(path for path in glob.glob(os.path.join(directory, pattern))
+                       if path.lower().endswith(BOUNDARY_EXTENSIONS))
+        # A shapefile's sidecar .json/.zip of the same layer would load it twice
+        files[name] = [path for path in paths if not (path.endswith('.shp') and path[:-4] + '.zip' in paths)]
+    return files
+
+
+def load_boundaries(directory=DEFAULT_BOUNDARY_DIR):
+    """A BoundaryJoin over the TIGER files in directory, or None (with a hint) if unavailable"""
+    files = boundary_files(directory) if os.path.isdir(directory) else {}
+    if not any(files.values()):
+        print(f"🗺️  No TIGER boundaries in {directory} - keeping searched cities (see boundary_join.py)")
+        return None
+    if not SHAPELY_AVAILABLE:
+        print("⚠️  shapely not installed, skipping the boundary join. Run: pip install shapely pyshp")
+        return None
+    try:
+        return BoundaryJoin(files['place'], files['county'], files['zcta'])
+    except ImportError:
+        print("⚠️  pyshp not installed, cannot read TIGER shapefiles. Run: pip install pyshp")
+        return None
+
+
+def add_boundary_arguments(parser):
+    parser.add_argument('--boundaries', default=DEFAULT_BOUNDARY_DIR,
+                        help='TIGER place/county/ZCTA files for the city/county/ZIP join (default: data/tiger or TIGER_DIR)')
+    parser.add_argument('--no-boundaries', action='store_true',
+                        help='Keep the searched city and the address ZIP instead of joining on boundaries')
+
+
+def boundaries_from_args(args):
+    return None if args.no_boundaries else load_boundaries(args.boundaries)
+
+
+def join_csv(boundaries, path):
+    """Rewrite a collector CSV's city/county/state/zip_code columns in place"""
+    with open(path, 'r', newline='', encoding='utf-8') as f:
+        reader = csv.DictReader(f)
+        fieldnames = list(reader.fieldnames or [])
+        rows = list(reader)
+
+    boundaries.assign(rows)
+    for field in JOIN_FIELDS:
+        if field not in fieldnames:
+            fieldnames.insert(fieldnames.index('city') + 1 if 'city' in fieldnames else len(fieldnames), field)
+
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=fieldnames, extrasaction='ignore')
+        writer.writeheader()
+        writer.writerows(rows)
+    return len(rows)
+
+
+UPDATE_SQL = """
+    UPDATE resources r SET
+        city = v.city, county = v.county, state = v.state, zip_code = v.zip_code
+    FROM (VALUES %s) AS v (id, city, county, state, zip_code)
+    WHERE r.id = v.id
+"""
+
+
+def join_database(boundaries, itersize):
+    """Backfill city/county/state/zip_code of every located resource; returns rows updated"""
+    from db_stream import stream_batches
+    from humanaid_db import connect, insert_values, transaction
+
+    conn = connect()
+    updated = 0
+    try:
+        for batch in stream_batches(conn, """
+            SELECT id, city, county, state, zip_code,
+                   ST_Y(location::geometry) AS latitude, ST_X(location::geometry) AS longitude
+            FROM resources
+            WHERE location IS NOT NULL
+        """, itersize=itersize):
+            rows = [row._asdict() for row in batch]
+            before = [tuple(row[field] for field in JOIN_FIELDS) for row in rows]
+            boundaries.assign(rows)
+            changed = [(row['id'],) + tuple(row[field] for field in JOIN_FIELDS)
+                       for row, old in zip(rows, before) if tuple(row[field] for field in JOIN_FIELDS) != old]
+            if changed:
+                with transaction() as cur:
+                    insert_values(cur, UPDATE_SQL, changed)
+                updated += len(changed)
+    finally:
+        conn.close()
+    return updated
+
+
+def main():
+    from db_stream import DEFAULT_ITERSIZE
+
+    parser = argparse.ArgumentParser(description='Assign city/county/ZIP to resources from TIGER boundaries')
+    parser.add_argument('--csv', nargs='+', default=[], help='Collector CSVs to rewrite in place')
+    parser.add_argument('--db', action='store_true', help='Backfill resources in the database')
+    parser.add_argument('--itersize', type=int, default=DEFAULT_ITERSIZE,
+                        help=f'Resources joined per batch with --db (default: {DEFAULT_ITERSIZE})')
+    parser.add_argument('--boundaries', default=DEFAULT_BOUNDARY_DIR,
+                        help='Directory of TIGER place/county/ZCTA files (default: data/tiger or TIGER_DIR)')
+    args = parser.parse_args()
+
+    if not (args.csv or args.db):
+        parser.print_help()
+        return 1
+    boundaries = load_boundaries(args.boundaries)
+    if not boundaries:
+        return 1
+
+    for path in args.csv:
+        print(f"✅ Joined {join_csv(boundaries, path)} rows of {path}")
+    if args.db:
+        print(f"✅ Updated {join_database(boundaries, args.itersize)} resources in the database")
+    print(f"🗺️  {boundaries.summary()}")
+    return 0
+
+
+if __name__ == '__main__':
+    exit(main())
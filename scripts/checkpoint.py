@@ -0,0 +1,61 @@
+"""
+Checkpoint Journal for Resumable Collection Runs
+Append-only JSONL log of completed (city, query, method) units and the
+resources each unit produced, so a crashed run can pick up where it stopped
+"""
+
+import json
+import os
+import threading
+
+
+def journal_path_for(output_file):
+    """Journal lives next to the CSV/JSON it is checkpointing"""
+    return f"{output_file}.journal.jsonl"
+
+
+class CheckpointJournal:
+    """Records finished work units; with resume=True, replays an existing journal"""
+
+    def __init__(self, path, resume=False):
+        self.path = path
+        self.completed = set()
+        self.resources = []
+        self.lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        if resume and os.path.exists(path):
+            self._load()
+        self.file = open(path, 'a' if resume else 'w', encoding='utf-8')
+
+    def _load(self):
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # A crash can leave a half-written last line
+                    continue
+                self.resources.extend(entry.get('resources', []))
+                if entry.get('complete', True):
+                    self.completed.add(tuple(entry['unit']))
+
+    def is_done(self, *unit):
+        return tuple(unit) in self.completed
+
+    def record(self, unit, resources, complete=True):
+        """Append one unit's resources; incomplete units are retried on resume"""
+        line = json.dumps({'unit': list(unit), 'complete': complete, 'resources': resources})
+        with self.lock:
+            self.file.write(line + '\n')
+            self.file.flush()
+            if complete:
+                self.completed.add(tuple(unit))
+
+    def close(self):
+        self.file.close()
+
+
+def add_resume_argument(parser):
+    parser.add_argument('--resume', action='store_true',
+                        help='Skip (city, query, method) units already recorded in the checkpoint journal')
@@ -4,11 +4,9 @@ Remove business/commercial organizations from database
 These are chambers of commerce, theaters, convention centers, etc.
 """
 
-import psycopg2
-import os
-from dotenv import load_dotenv
-
-load_dotenv()
+from humanaid_db import connection, transaction
+from keyword_matcher import KeywordMatcher
+from validation_state import ValidationState, add_full_argument, rules_hash, source_version
 
 # Keywords for business/commercial organizations to remove
 BUSINESS_ORG_KEYWORDS = [
@@ -33,40 +31,36 @@ KEEP_KEYWORDS = [
     'food shelf', 'emergency food', 'food rescue'
 ]
 
-def connect_db():
-    return psycopg2.connect(
-        host=os.getenv('DB_HOST', 'localhost'),
-        port=os.getenv('DB_PORT', '5432'),
-        database=os.getenv('DB_NAME', 'humanaid'),
-        user=os.getenv('DB_USER', 'postgres'),
-        password=os.getenv('DB_PASSWORD', 'humanaid2025')
-    )
+BUSINESS_ORG_MATCHER = KeywordMatcher(BUSINESS_ORG_KEYWORDS)
+KEEP_MATCHER = KeywordMatcher(KEEP_KEYWORDS)
+RULES_HASH = rules_hash(BUSINESS_ORG_KEYWORDS, KEEP_KEYWORDS)
 
-def find_business_orgs():
+def find_business_orgs(conn, validation_state):
     """Find business organizations to remove"""
-    conn = connect_db()
     cur = conn.cursor()
     
-    cur.execute("""
-        SELECT id, name, address, city, state, website
-        FROM resources
-        WHERE is_active = true AND approval_status = 'approved'
-        ORDER BY name
-    """)
+    cur.execute(f"""
+        SELECT r.id, r.name, r.address, r.city, r.state, r.website, {source_version('r')}
+        FROM resources r
+        WHERE r.is_active = true AND r.approval_status = 'approved'
+          AND {validation_state.where('r')}
+        ORDER BY r.name
+    """, validation_state.params)
     
     resources = cur.fetchall()
     to_remove = []
     
     for resource in resources:
-        res_id, name, address, city, state, website = resource
+        res_id, name, address, city, state, website, source_hash = resource
+        validation_state.mark(res_id, source_hash)
         name_lower = name.lower()
         
         # Keep if food-related
-        if any(kw in name_lower for kw in KEEP_KEYWORDS):
+        if KEEP_MATCHER.search(name_lower):
             continue
         
         # Remove if business org
-        if any(kw in name_lower for kw in BUSINESS_ORG_KEYWORDS):
+        if BUSINESS_ORG_MATCHER.search(name_lower):
             to_remove.append({
                 'id': res_id,
                 'name': name,
@@ -77,13 +71,12 @@ def find_business_orgs():
             })
     
     cur.close()
-    conn.close()
-    
     return to_remove
 
-def remove_business_orgs(dry_run=True):
+def remove_business_orgs(conn, dry_run=True, full=False):
     """Remove business organizations"""
-    orgs = find_business_orgs()
+    validation_state = ValidationState('cleanup_business_orgs', RULES_HASH, full)
+    orgs = find_business_orgs(conn, validation_state)
     
     print(f"\n{'='*80}")
     print(f"🔍 Found {len(orgs)} business organizations to remove")
@@ -91,6 +84,8 @@ def remove_business_orgs(dry_run=True):
     
     if not orgs:
         print("✅ No business organizations found!")
+        if not dry_run:
+            validation_state.save(conn)
         return
     
     for i, org in enumerate(orgs, 1):
@@ -115,21 +110,13 @@ def remove_business_orgs(dry_run=True):
         return
     
     # Delete
-    conn = connect_db()
-    cur = conn.cursor()
+    ids = [org['id'] for org in orgs]
+    with transaction(conn) as cur:
+        cur.execute("DELETE FROM resource_categories WHERE resource_id = ANY(%s)", (ids,))
+        cur.execute("DELETE FROM resources WHERE id = ANY(%s)", (ids,))
+        deleted = cur.rowcount
     
-    deleted = 0
-    for org in orgs:
-        try:
-            cur.execute("DELETE FROM resource_categories WHERE resource_id = %s", (org['id'],))
-            cur.execute("DELETE FROM resources WHERE id = %s", (org['id'],))
-            deleted += 1
-        except Exception as e:
-            print(f"❌ Error deleting {org['name']}: {str(e)}")
-    
-    conn.commit()
-    cur.close()
-    conn.close()
+    validation_state.save(conn)
     
     print(f"\n✅ Deleted {deleted} business organizations")
 
@@ -137,9 +124,11 @@ def main():
     import argparse
     parser = argparse.ArgumentParser()
     parser.add_argument('--remove', action='store_true')
+    add_full_argument(parser)
     args = parser.parse_args()
     
-    remove_business_orgs(dry_run=not args.remove)
+    with connection() as conn:
+        remove_business_orgs(conn, dry_run=not args.remove, full=args.full)
 
 if __name__ == '__main__':
     main()
@@ -4,11 +4,10 @@ Data Cleanup - Remove Non-Food Locations
 Removes parks, recreation centers, gyms, libraries, VFW posts, etc.
 """
 
-import psycopg2
-import os
-from dotenv import load_dotenv
-
-load_dotenv()
+from db_stream import DEFAULT_ITERSIZE, add_itersize_argument, stream_rows
+from humanaid_db import connection, transaction
+from keyword_matcher import KeywordMatcher
+from validation_state import ValidationState, add_full_argument, rules_hash, source_version
 
 # Non-food location indicators
 NON_FOOD_KEYWORDS = [
@@ -38,14 +37,9 @@ KEEP_KEYWORDS = [
     'st. vincent', 'food shelf', 'emergency food'
 ]
 
-def connect_db():
-    return psycopg2.connect(
-        host=os.getenv('DB_HOST', 'localhost'),
-        port=os.getenv('DB_PORT', '5432'),
-        database=os.getenv('DB_NAME', 'humanaid'),
-        user=os.getenv('DB_USER', 'postgres'),
-        password=os.getenv('DB_PASSWORD', 'humanaid2025')
-    )
+NON_FOOD_MATCHER = KeywordMatcher(NON_FOOD_KEYWORDS)
+KEEP_MATCHER = KeywordMatcher(KEEP_KEYWORDS)
+RULES_HASH = rules_hash(NON_FOOD_KEYWORDS, KEEP_KEYWORDS)
 
 def is_non_food_location(name, website=''):
     """Check if location is not food assistance"""
@@ -53,34 +47,26 @@ def is_non_food_location(name, website=''):
     website_lower = (website or '').lower()
     
     # Keep if it has food assistance keywords
-    for keyword in KEEP_KEYWORDS:
-        if keyword in name_lower:
-            return False
+    if KEEP_MATCHER.search(name_lower):
+        return False
     
     # Remove if it matches non-food keywords
-    for keyword in NON_FOOD_KEYWORDS:
-        if keyword in name_lower:
-            return True
-    
-    return False
+    return NON_FOOD_MATCHER.search(name_lower)
 
-def find_non_food_locations():
+def find_non_food_locations(conn, validation_state, itersize=DEFAULT_ITERSIZE):
     """Find non-food locations"""
-    conn = connect_db()
-    cur = conn.cursor()
-    
-    cur.execute("""
-        SELECT id, name, address, city, state, website
-        FROM resources
-        WHERE is_active = true AND approval_status = 'approved'
-        ORDER BY name
-    """)
-    
-    resources = cur.fetchall()
+    resources = stream_rows(conn, f"""
+        SELECT r.id, r.name, r.address, r.city, r.state, r.website, {source_version('r')} AS source_hash
+        FROM resources r
+        WHERE r.is_active = true AND r.approval_status = 'approved'
+          AND {validation_state.where('r')}
+        ORDER BY r.id
+    """, validation_state.params, itersize=itersize)
     non_food = []
     
     for resource in resources:
-        res_id, name, address, city, state, website = resource
+        res_id, name, address, city, state, website, source_hash = resource
+        validation_state.mark(res_id, source_hash)
         if is_non_food_location(name, website):
             non_food.append({
                 'id': res_id,
@@ -91,14 +77,12 @@ def find_non_food_locations():
                 'website': website
             })
     
-    cur.close()
-    conn.close()
-    
     return non_food
 
-def remove_non_food_locations(dry_run=True):
+def remove_non_food_locations(conn, dry_run=True, itersize=DEFAULT_ITERSIZE, full=False):
     """Remove non-food locations from database"""
-    locations = find_non_food_locations()
+    validation_state = ValidationState('cleanup_non_food_locations', RULES_HASH, full)
+    locations = find_non_food_locations(conn, validation_state, itersize)
     
     print(f"\n{'='*80}")
     print(f"🔍 Found {len(locations)} non-food locations to remove")
@@ -106,6 +90,8 @@ def remove_non_food_locations(dry_run=True):
     
     if not locations:
         print("✅ No non-food locations found!")
+        if not dry_run:
+            validation_state.save(conn)
         return
     
     # Show first 30
@@ -135,21 +121,13 @@ def remove_non_food_locations(dry_run=True):
         return
     
     # Delete
-    conn = connect_db()
-    cur = conn.cursor()
-    
-    deleted = 0
-    for loc in locations:
-        try:
-            cur.execute("DELETE FROM resource_categories WHERE resource_id = %s", (loc['id'],))
-            cur.execute("DELETE FROM resources WHERE id = %s", (loc['id'],))
-            deleted += 1
-        except Exception as e:
-            print(f"❌ Error deleting {loc['name']}: {str(e)}")
-    
-    conn.commit()
-    cur.close()
-    conn.close()
+    ids = [loc['id'] for loc in locations]
+    with transaction(conn) as cur:
+        cur.execute("DELETE FROM resource_categories WHERE resource_id = ANY(%s)", (ids,))
+        cur.execute("DELETE FROM resources WHERE id = ANY(%s)", (ids,))
+        deleted = cur.rowcount
+    
+    validation_state.save(conn)
     
     print(f"\n✅ Deleted {deleted} non-food locations")
 
@@ -157,9 +135,12 @@ def main():
     import argparse
     parser = argparse.ArgumentParser()
     parser.add_argument('--remove', action='store_true')
+    add_itersize_argument(parser)
+    add_full_argument(parser)
     args = parser.parse_args()
     
-    remove_non_food_locations(dry_run=not args.remove)
+    with connection() as conn:
+        remove_non_food_locations(conn, dry_run=not args.remove, itersize=args.itersize, full=args.full)
 
 if __name__ == '__main__':
     main()
@@ -4,11 +4,9 @@ Data Cleanup Script - Remove Restaurants and Commercial Food Businesses
 Keeps only legitimate food assistance resources
 """
 
-import psycopg2
-import os
-from dotenv import load_dotenv
-
-load_dotenv()
+from humanaid_db import connection, transaction
+from keyword_matcher import KeywordMatcher
+from validation_state import ValidationState, add_full_argument, rules_hash, source_version
 
 # Commercial food business indicators
 COMMERCIAL_KEYWORDS = [
@@ -57,15 +55,9 @@ FOOD_ASSISTANCE_KEYWORDS = [
     'church.*food', 'temple.*food', 'synagogue.*food'
 ]
 
-def connect_db():
-    """Connect to PostgreSQL database"""
-    return psycopg2.connect(
-        host=os.getenv('DB_HOST', 'localhost'),
-        port=os.getenv('DB_PORT', '5432'),
-        database=os.getenv('DB_NAME', 'humanaid'),
-        user=os.getenv('DB_USER', 'postgres'),
-        password=os.getenv('DB_PASSWORD', 'humanaid2025')
-    )
+COMMERCIAL_MATCHER = KeywordMatcher(COMMERCIAL_KEYWORDS)
+FOOD_ASSISTANCE_MATCHER = KeywordMatcher(FOOD_ASSISTANCE_KEYWORDS)
+RULES_HASH = rules_hash(COMMERCIAL_KEYWORDS, FOOD_ASSISTANCE_KEYWORDS)
 
 def is_commercial_business(name, website=''):
     """Check if a resource is a commercial food business (not food assistance)"""
@@ -73,35 +65,31 @@ def is_commercial_business(name, website=''):
     website_lower = (website or '').lower()
     
     # Check if name contains food assistance keywords (keep these)
-    for keyword in FOOD_ASSISTANCE_KEYWORDS:
-        if keyword in name_lower:
-            return False
+    if FOOD_ASSISTANCE_MATCHER.search(name_lower):
+        return False
     
     # Check if name/website contains commercial keywords
-    for keyword in COMMERCIAL_KEYWORDS:
-        if keyword in name_lower or keyword in website_lower:
-            return True
-    
-    return False
+    return COMMERCIAL_MATCHER.search(name_lower) or COMMERCIAL_MATCHER.search(website_lower)
 
-def find_commercial_businesses():
+def find_commercial_businesses(conn, validation_state):
     """Find all resources that appear to be commercial businesses"""
-    conn = connect_db()
     cur = conn.cursor()
     
-    # Get all resources
-    cur.execute("""
-        SELECT id, name, address, city, state, website
-        FROM resources
-        WHERE is_active = true AND approval_status = 'approved'
-        ORDER BY name
-    """)
+    # Get all resources not yet checked against the current keyword lists
+    cur.execute(f"""
+        SELECT r.id, r.name, r.address, r.city, r.state, r.website, {source_version('r')}
+        FROM resources r
+        WHERE r.is_active = true AND r.approval_status = 'approved'
+          AND {validation_state.where('r')}
+        ORDER BY r.name
+    """, validation_state.params)
     
     resources = cur.fetchall()
     commercial = []
     
     for resource in resources:
-        res_id, name, address, city, state, website = resource
+        res_id, name, address, city, state, website, source_hash = resource
+        validation_state.mark(res_id, source_hash)
         if is_commercial_business(name, website):
             commercial.append({
                 'id': res_id,
@@ -113,13 +101,12 @@ def find_commercial_businesses():
             })
     
     cur.close()
-    conn.close()
-    
     return commercial
 
-def remove_commercial_businesses(dry_run=True):
+def remove_commercial_businesses(conn, dry_run=True, full=False):
     """Remove commercial businesses from database"""
-    businesses = find_commercial_businesses()
+    validation_state = ValidationState('cleanup_restaurants', RULES_HASH, full)
+    businesses = find_commercial_businesses(conn, validation_state)
     
     print(f"\n{'='*80}")
     print(f"🔍 Found {len(businesses)} commercial businesses to remove")
@@ -127,6 +114,8 @@ def remove_commercial_businesses(dry_run=True):
     
     if not businesses:
         print("✅ No commercial businesses found! Database is clean.")
+        if not dry_run:
+            validation_state.save(conn)
         return
     
     # Show first 20
@@ -156,23 +145,15 @@ def remove_commercial_businesses(dry_run=True):
         return
     
     # Delete businesses
-    conn = connect_db()
-    cur = conn.cursor()
+    ids = [biz['id'] for biz in businesses]
+    with transaction(conn) as cur:
+        # Delete from resource_categories first (foreign key)
+        cur.execute("DELETE FROM resource_categories WHERE resource_id = ANY(%s)", (ids,))
+        # Delete resources
+        cur.execute("DELETE FROM resources WHERE id = ANY(%s)", (ids,))
+        deleted = cur.rowcount
     
-    deleted = 0
-    for biz in businesses:
-        try:
-            # Delete from resource_categories first (foreign key)
-            cur.execute("DELETE FROM resource_categories WHERE resource_id = %s", (biz['id'],))
-            # Delete resource
-            cur.execute("DELETE FROM resources WHERE id = %s", (biz['id'],))
-            deleted += 1
-        except Exception as e:
-            print(f"❌ Error deleting {biz['name']}: {str(e)}")
-    
-    conn.commit()
-    cur.close()
-    conn.close()
+    validation_state.save(conn)
     
     print(f"\n✅ Deleted {deleted} commercial businesses from database")
     print(f"📊 Remaining resources: Check your app!")
@@ -181,9 +162,11 @@ def main():
     import argparse
     parser = argparse.ArgumentParser()
     parser.add_argument('--remove', action='store_true', help='Actually remove commercial businesses (default is dry run)')
+    add_full_argument(parser)
     args = parser.parse_args()
     
-    remove_commercial_businesses(dry_run=not args.remove)
+    with connection() as conn:
+        remove_commercial_businesses(conn, dry_run=not args.remove, full=args.full)
 
 if __name__ == '__main__':
     main()
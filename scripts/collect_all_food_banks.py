@@ -7,11 +7,26 @@ Collects food banks, food pantries, and food distribution centers
 import os
 import json
 import csv
-import time
 import argparse
+from collections import deque
 from datetime import datetime
 import googlemaps
 
+from checkpoint import CheckpointJournal, add_resume_argument, journal_path_for
+from boundary_join import add_boundary_arguments, boundaries_from_args
+from address_utils import address_city, parse_address
+from coverage_planner import (SplitPolicy, add_plan_argument, add_split_arguments, bounds_around, load_plan,
+                              split_policy_from_args)
+from gazetteer import add_gazetteer_arguments, gazetteer_from_args
+from place_registry import PlaceRegistry, add_registry_arguments, registry_from_args
+from places_cache import DEFAULT_CACHE_PATH, add_cache_arguments, cache_path_from_args
+from resource_sink import add_sink_arguments, sink_from_args
+from query_yield import QueryScheduler, add_scheduler_arguments, scheduler_from_args, size_class
+from hit_filter import HitFilter, add_prefilter_argument, hit_filter_from_args
+from place_details import DEFAULT_DETAILS_MODE, DetailsStage, add_details_argument, missing_fields
+from places_fetcher import (DEFAULT_WORKERS, MAX_PAGES, PlacesFetcher, add_pagination_argument, client_options,
+                            parse_qps, qps_value, wrap_client)
+
 # All major cities in Illinois (50+)
 ILLINOIS_CITIES = [
     # Major metros
@@ -151,13 +166,42 @@ FOOD_QUERIES = [
     "feeding program",
 ]
 
+# Fields requested from place() details for each search method
+NEARBY_DETAIL_FIELDS = [
+    'name', 'formatted_address', 'formatted_phone_number',
+    'website', 'geometry', 'business_status'
+]
+
+TEXT_DETAIL_FIELDS = NEARBY_DETAIL_FIELDS + ['opening_hours', 'rating']
+
+# Areas with searches in flight at once, so one area's page-token waits
+# overlap the next area's searches
+AREA_WINDOW = 2
+
 class FoodBankCollector:
-    def __init__(self, api_key):
-        self.gmaps = googlemaps.Client(key=api_key)
+    def __init__(self, api_key, qps=None, workers=DEFAULT_WORKERS, cache_path=DEFAULT_CACHE_PATH,
+                 journal=None, split_policy=None, scheduler=None, details=DEFAULT_DETAILS_MODE, hit_filter=None,
+                 registry=None, sink=None, max_pages=MAX_PAGES, gazetteer=None, boundaries=None):
+        self.gmaps = wrap_client(googlemaps.Client(key=api_key, **client_options()), qps, cache_path, gazetteer)
+        self.fetcher = PlacesFetcher(self.gmaps, max_workers=workers)
+        self.max_pages = max_pages
+        self.split_policy = split_policy or SplitPolicy()
+        self.scheduler = scheduler or QueryScheduler()
+        self.hit_filter = hit_filter or HitFilter()
+        self.registry = registry or PlaceRegistry()
+        self.sink = sink
+        self.boundaries = boundaries
+        self.details = DetailsStage(self.gmaps, self._fill_details, details, fetcher=self.fetcher)
         self.results = []
         self.query_count = 0
         self.cost_estimate = 0
-        self.seen_place_ids = set()
+        
+        # Replay resources from a resumed checkpoint journal
+        self.journal = journal
+        if journal:
+            self.results.extend(journal.resources)
+            self.registry.mark_seen(r['place_id'] for r in journal.resources)
+            self.details.resume(self.results)
         
     def collect_all_cities(self, state):
         """Collect food banks from all cities in a state"""
@@ -171,17 +215,18 @@ class FoodBankCollector:
         print(f"🎯 Target: 300+ food resources")
         print(f"{'='*60}\n")
         
-        for i, (city, radius) in enumerate(cities, 1):
-            print(f"\n[{i}/{len(cities)}] 🏙️  {city}, {state}")
-            print("-" * 50)
-            self.collect_city(city, state, radius)
-            
-            # Progress update
-            if i % 5 == 0:
-                print(f"\n📈 PROGRESS: {i}/{len(cities)} cities • {len(self.results)} resources • ${self.cost_estimate:.2f}")
-            
-            # Rate limiting - be nice to the API
-            time.sleep(1)
+        def areas():
+            for i, (city, radius) in enumerate(cities, 1):
+                print(f"\n[{i}/{len(cities)}] 🏙️  {city}, {state}")
+                print("-" * 50)
+                yield self.start_city(city, state, radius)
+                
+                # Progress update
+                if i % 5 == 0:
+                    print(f"\n📈 PROGRESS: {i}/{len(cities)} cities • {len(self.results)} resources • ${self.cost_estimate:.2f}")
+        
+        self.collect_pipelined(areas())
+        self.resolve_details()
         
         print(f"\n{'='*60}")
         print(f"✅ COMPLETED {state_name}")
@@ -191,179 +236,266 @@ class FoodBankCollector:
         print(f"🔢 Total queries: {self.query_count}")
         print(f"{'='*60}\n")
     
+    def collect_plan(self, plan):
+        """Collect food banks in every cell of a coverage plan"""
+        state = plan['state']
+        cells = plan['cells']
+        
+        print(f"\n{'='*60}")
+        print(f"🍽️  COLLECTING FOOD BANKS IN {state} (coverage plan)")
+        print(f"{'='*60}")
+        print(f"🔲 Total cells: {len(cells)}")
+        print(f"{'='*60}\n")
+        
+        def areas():
+            for i, cell in enumerate(cells, 1):
+                print(f"\n[{i}/{len(cells)}] 🔲 {cell['id']} {cell['label'] or ''} ({cell['radius_m'] / 1000:.1f} km)")
+                print("-" * 50)
+                yield self.start_area(cell['id'], state, cell['lat'], cell['lng'], cell['radius_m'],
+                                      label=cell['label'], size=size_class(expected=cell['expected']))
+                
+                if i % 5 == 0:
+                    print(f"\n📈 PROGRESS: {i}/{len(cells)} cells • {len(self.results)} resources • ${self.cost_estimate:.2f}")
+        
+        self.collect_pipelined(areas())
+        self.resolve_details()
+        
+        print(f"\n{'='*60}")
+        print(f"✅ COMPLETED {state}")
+        print(f"📊 Total resources: {len(self.results)}")
+        print(f"💰 Total cost: ${self.cost_estimate:.2f}")
+        print(f"🔢 Total queries: {self.query_count}")
+        print(f"{'='*60}\n")
+    
+    def collect_pipelined(self, areas):
+        """Finish started areas in order, keeping up to AREA_WINDOW of them in flight"""
+        in_flight = deque()
+        for area in areas:
+            if area:
+                in_flight.append(area)
+            if len(in_flight) >= AREA_WINDOW:
+                self.finish_area(in_flight.popleft())
+        while in_flight:
+            self.finish_area(in_flight.popleft())
+    
+    def _pending(self, unit):
+        """(query, method) units not already recorded in the checkpoint journal"""
+        return [
+            (query, method)
+            for query in FOOD_QUERIES
+            for method in ('nearby', 'text')
+            if not (self.journal and self.journal.is_done(unit, query, method))
+        ]
+    
     def collect_city(self, city, state, radius_miles):
         """Collect food banks in a specific city"""
+        self.finish_area(self.start_city(city, state, radius_miles))
+    
+    def start_city(self, city, state, radius_miles):
+        """Geocode a city and start its searches (see start_area)"""
+        if not self._pending(city):
+            print(f"  ⏭️  Already collected {city} (checkpoint)")
+            return None
+        
         try:
             # Geocode the city
-            geocode_result = self.gmaps.geocode(f"{city}, {state}, USA")
-            if not geocode_result:
-                print(f"  ❌ Could not geocode {city}")
-                return
-            
-            location = geocode_result[0]['geometry']['location']
-            lat, lng = location['lat'], location['lng']
-            radius_meters = int(radius_miles * 1609.34)
-            
-            city_results = 0
-            
-            # Search with each query using both methods
-            for query in FOOD_QUERIES:
-                # Method 1: Places Nearby (radius-based)
-                found_nearby = self._search_query(query, city, state, lat, lng, radius_meters)
-                city_results += found_nearby
-                time.sleep(0.3)
-                
-                # Method 2: Text Search (broader, finds more specific organizations)
-                found_text = self._search_text(query, city, state, lat, lng, radius_meters)
-                city_results += found_text
-                time.sleep(0.3)
-            
-            print(f"  ✅ Found {city_results} new food resources in {city}")
-            
+            geocode_result = self.fetcher.call('geocode', f"{city}, {state}, USA")
         except Exception as e:
             print(f"  ❌ Error in {city}: {str(e)}")
+            return None
+        if not geocode_result:
+            print(f"  ❌ Could not geocode {city}")
+            return None
+        
+        location = geocode_result[0]['geometry']['location']
+        return self.start_area(city, state, location['lat'], location['lng'], int(radius_miles * 1609.34), city=city)
+    
+    def collect_area(self, unit, state, lat, lng, radius_meters, city=None, label='', size=None):
+        """Collect food banks around a point; unit keys the checkpoint journal.
+        Without a city (plan cells), each resource takes the city from its address."""
+        self.finish_area(self.start_area(unit, state, lat, lng, radius_meters, city, label, size))
+    
+    def start_area(self, unit, state, lat, lng, radius_meters, city=None, label='', size=None):
+        """Schedule every search for an area and return the in-flight area for finish_area()"""
+        pending = self._pending(unit)
+        if not pending:
+            print(f"  ⏭️  Already collected {unit} (checkpoint)")
+            return None
+        
+        # Best-yielding terms first; terms that only re-find known places are skipped
+        cls = size or size_class(radius_m=radius_meters)
+        scheduled = self.scheduler.schedule(pending, cls)
+        if len(scheduled) < len(pending):
+            print(f"  ✂️  Skipping {len(pending) - len(scheduled)} low-yield searches ({cls})")
+        
+        # Fire every search for the area at once - the rate limiter paces them,
+        # and saturated ones are split while the others are still paging.
+        # Method 1: Places Nearby (radius-based)
+        # Method 2: Text Search (broader, finds more specific organizations)
+        searches = []
+        for query, method in scheduled:
+            if method == 'nearby':
+                future = self._search_query(query, lat, lng, radius_meters)
+            else:
+                future = self._search_text(query, city or label, state, lat, lng, radius_meters)
+            searches.append((query, method, future))
+        
+        return {'unit': unit, 'state': state, 'city': city, 'label': label, 'size': cls, 'searches': searches}
     
-    def _search_query(self, query, city, state, lat, lng, radius):
-        """Execute a single search query"""
+    def finish_area(self, area):
+        """Wait for a started area's searches and record its new resources"""
+        if not area:
+            return
+        unit, state, city, label, cls = area['unit'], area['state'], area['city'], area['label'], area['size']
+        
         try:
-            places_result = self.gmaps.places_nearby(
-                location=(lat, lng),
-                radius=radius,
-                keyword=query,
-                type='point_of_interest'
-            )
-            
-            self.query_count += 1
-            self.cost_estimate = self.query_count * 0.017
-            
-            results = places_result.get('results', [])
-            new_count = 0
+            # Collect new hits as each search comes back (in query order,
+            # so duplicates are credited to the same query as a serial run)
+            units = [(query, method, self._collect_hits(query, method, future, cls))
+                     for query, method, future in area['searches']]
             
-            for place in results:
-                place_id = place['place_id']
-                
-                # Skip duplicates
-                if place_id in self.seen_place_ids:
+            # Build resources from the search payload; details are owed only for missing fields
+            built = []
+            for query, method, hits in units:
+                if hits is None:
+                    # Search failed - leave the unit open so --resume retries it
                     continue
                 
-                self.seen_place_ids.add(place_id)
-                
-                # Get detailed info
-                details = self.gmaps.place(place_id=place_id, fields=[
-                    'name', 'formatted_address', 'formatted_phone_number',
-                    'website', 'geometry', 'business_status'
-                ])['result']
-                
-                # Parse address components
-                address_parts = details.get('formatted_address', '').split(',')
-                street = address_parts[0] if len(address_parts) > 0 else ''
-                zip_code = ''
-                if len(address_parts) >= 3:
-                    zip_match = address_parts[-1].strip().split()
-                    zip_code = zip_match[-1] if zip_match else ''
-                
-                resource = {
-                    'place_id': place_id,
-                    'name': details.get('name'),
-                    'address': street,
-                    'city': city,
-                    'state': state,
-                    'zip_code': zip_code,
-                    'latitude': details['geometry']['location']['lat'],
-                    'longitude': details['geometry']['location']['lng'],
-                    'phone': details.get('formatted_phone_number', ''),
-                    'website': details.get('website', ''),
-                    'category': 'food-pantries',
-                    'search_query': query,
-                    'business_status': details.get('business_status', 'OPERATIONAL'),
-                    'collected_at': datetime.now().isoformat()
-                }
-                
-                self.results.append(resource)
-                new_count += 1
+                fields = NEARBY_DETAIL_FIELDS if method == 'nearby' else TEXT_DETAIL_FIELDS
+                resources = []
+                for place in hits:
+                    resource_city = city or address_city(place.get('formatted_address', '')) or label
+                    resource = self._build_resource(place['place_id'], place, query, method, resource_city, state)
+                    self.details.add(resource, place['place_id'], missing_fields(place, fields))
+                    resources.append(resource)
+                built.append((query, method, resources))
             
-            return new_count
+            # Move the whole area's resources to the city/county/ZIP they lie in, in one batch
+            if self.boundaries:
+                self.boundaries.assign([r for _, _, resources in built for r in resources])
+            
+            self.details.unit_done()
+            self.cost_estimate = (self.query_count + self.details.calls) * 0.017
+            
+            area_results = 0
+            for query, method, resources in built:
+                self.results.extend(resources)
+                area_results += len(resources)
+                if self.sink:
+                    self.sink.write(resources)
+                if self.journal:
+                    self.journal.record((unit, query, method), resources)
+            
+            print(f"  ✅ Found {area_results} new food resources in {city or unit}")
             
         except Exception as e:
-            print(f"    ⚠️  Query '{query}' failed: {str(e)}")
-            return 0
+            print(f"  ❌ Error in {city or unit}: {str(e)}")
+    
+    def _search_query(self, query, lat, lng, radius):
+        """Schedule a Places Nearby search (following its next_page_tokens, split if saturated)"""
+        return self.fetcher.submit_refined(
+            self.split_policy,
+            'places_nearby',
+            bounds_around(lat, lng, radius),
+            self.registry,
+            self.max_pages,
+            location=(lat, lng),
+            radius=radius,
+            keyword=query,
+            type='point_of_interest'
+        )
     
     def _search_text(self, query, city, state, lat, lng, radius):
-        """Execute a text search query (broader than places_nearby)"""
+        """Schedule a text search query (broader than places_nearby)"""
+        # Build location-specific query (plan cells without a label rely on the location bias)
+        search_query = f"{query} in {city}, {state}" if city else query
+        
+        return self.fetcher.submit_refined(
+            self.split_policy,
+            'places',
+            bounds_around(lat, lng, radius),
+            self.registry,
+            self.max_pages,
+            query=search_query,
+            location=(lat, lng),
+            radius=radius
+        )
+    
+    def _collect_hits(self, query, method, future, cls):
+        """Wait for a search (and its split, if saturated) and return its hits with unseen place_ids"""
         try:
-            # Build location-specific query
-            search_query = f"{query} in {city}, {state}"
-            
-            text_result = self.gmaps.places(
-                query=search_query,
-                location=(lat, lng),
-                radius=radius
-            )
-            
-            self.query_count += 1
-            self.cost_estimate = self.query_count * 0.017
-            
-            results = text_result.get('results', [])
-            new_count = 0
-            
-            for place in results:
-                place_id = place['place_id']
-                
-                # Skip duplicates
-                if place_id in self.seen_place_ids:
-                    continue
-                
-                self.seen_place_ids.add(place_id)
-                
-                # Get detailed info
-                try:
-                    details = self.gmaps.place(place_id=place_id, fields=[
-                        'name', 'formatted_address', 'formatted_phone_number',
-                        'website', 'geometry', 'business_status',
-                        'opening_hours', 'rating'
-                    ])['result']
-                    
-                    # Parse address components
-                    address_parts = details.get('formatted_address', '').split(',')
-                    street = address_parts[0] if len(address_parts) > 0 else ''
-                    zip_code = ''
-                    if len(address_parts) >= 3:
-                        zip_match = address_parts[-1].strip().split()
-                        zip_code = zip_match[-1] if zip_match else ''
-                    
-                    resource = {
-                        'place_id': place_id,
-                        'name': details.get('name'),
-                        'address': street,
-                        'city': city,
-                        'state': state,
-                        'zip_code': zip_code,
-                        'latitude': details['geometry']['location']['lat'],
-                        'longitude': details['geometry']['location']['lng'],
-                        'phone': details.get('formatted_phone_number', ''),
-                        'website': details.get('website', ''),
-                        'category': 'food-pantries',
-                        'search_query': query + ' (text search)',
-                        'business_status': details.get('business_status', 'OPERATIONAL'),
-                        'rating': details.get('rating', ''),
-                        'collected_at': datetime.now().isoformat()
-                    }
-                    
-                    self.results.append(resource)
-                    new_count += 1
-                    
-                except Exception as detail_error:
-                    # Skip if we can't get details
-                    continue
-            
-            return new_count
-            
+            places, queries = future.result()
         except Exception as e:
             # Text search might not always work, that's OK
-            return 0
+            if method == 'nearby':
+                print(f"    ⚠️  Query '{query}' failed: {str(e)}")
+            return None
+        
+        self.query_count += queries
+        
+        hits = []
+        for place in places:
+            place_id = place['place_id']
+            
+            # Skip duplicates
+            if not self.registry.claim(place_id):
+                continue
+            
+            # Drop restaurants and chains before they cost a details lookup
+            if not self.hit_filter.allow(place):
+                continue
+            hits.append(place)
+        
+        self.scheduler.record(query, method, cls, queries, self.hit_filter.relevant(places), len(hits))
+        return hits
+    
+    def _build_resource(self, place_id, details, query, method, city, state):
+        """Build an export row from a search hit or place() details result"""
+        # Nearby hits carry only a short 'vicinity' until details fill in the full address
+        street, zip_code = parse_address(details.get('formatted_address') or details.get('vicinity', ''))
+        
+        resource = {
+            'place_id': place_id,
+            'name': details.get('name'),
+            'address': street,
+            'city': city,
+            'state': state,
+            'zip_code': zip_code,
+            'latitude': details['geometry']['location']['lat'],
+            'longitude': details['geometry']['location']['lng'],
+            'phone': details.get('formatted_phone_number', ''),
+            'website': details.get('website', ''),
+            'category': 'food-pantries',
+            'search_query': query if method == 'nearby' else query + ' (text search)',
+            'business_status': details.get('business_status', 'OPERATIONAL'),
+            'collected_at': datetime.now().isoformat()
+        }
+        if method == 'text':
+            resource['rating'] = details.get('rating', '')
+        
+        return resource
+    
+    def _fill_details(self, resource, details):
+        """Merge deferred place() details into a resource built from its search hit"""
+        if details.get('formatted_address'):
+            # A ZIP from the boundary join (or the search hit) stays
+            resource['address'], zip_code = parse_address(details['formatted_address'])
+            resource['zip_code'] = resource['zip_code'] or zip_code
+        resource['phone'] = details.get('formatted_phone_number', resource['phone'])
+        resource['website'] = details.get('website', resource['website'])
+        if self.sink:
+            self.sink.write([resource])
+    
+    def resolve_details(self):
+        """Deferred stage: fetch the details still owed to collected resources in one batch"""
+        if len(self.details):
+            print(f"\n📇 Fetching place details for {len(self.details)} resources...")
+            self.details.flush()
+        self.cost_estimate = (self.query_count + self.details.calls) * 0.017
     
     def export_to_csv(self, filename):
         """Export results to CSV"""
+        self.resolve_details()
         if not self.results:
             print("❌ No results to export")
             return
@@ -371,7 +503,7 @@ class FoodBankCollector:
         os.makedirs(os.path.dirname(filename) if os.path.dirname(filename) else '.', exist_ok=True)
         
         with open(filename, 'w', newline='', encoding='utf-8') as csvfile:
-            fieldnames = ['name', 'address', 'city', 'state', 'zip_code', 'latitude', 
+            fieldnames = ['name', 'address', 'city', 'county', 'state', 'zip_code', 'latitude', 
                          'longitude', 'phone', 'website', 'category', 'search_query', 
                          'business_status', 'place_id']
             writer = csv.DictWriter(csvfile, fieldnames=fieldnames, extrasaction='ignore')
@@ -380,9 +512,22 @@ class FoodBankCollector:
             for row in self.results:
                 writer.writerow(row)
         
+        self.registry.commit((r['place_id'] for r in self.results), 'collect_all_food_banks')
         print(f"\n✅ Exported {len(self.results)} food resources to {filename}")
         print(f"💰 Total API Cost: ${self.cost_estimate:.2f}")
-        print(f"🔢 Total Queries: {self.query_count}")
+        print(f"🔢 Total Queries: {self.query_count} searches + {self.details.calls} details")
+        print(f"📇 {self.details.summary()}")
+        print(f"🚫 {self.hit_filter.summary()}")
+        print(f"🗂️  {self.registry.summary()}")
+        if self.boundaries:
+            print(f"🗺️  {self.boundaries.summary()}")
+        if self.sink:
+            self.sink.flush()
+            print(f"🗄️  {self.sink.summary()}")
+        print(f"🔲 {self.split_policy.summary()}")
+        print(f"✂️  {self.scheduler.summary()}")
+        if hasattr(self.gmaps, 'summary'):
+            print(f"💾 {self.gmaps.summary()}")
 
 def main():
     parser = argparse.ArgumentParser(description='Collect all food banks in IL and MO')
@@ -391,8 +536,30 @@ def main():
     parser.add_argument('--output-dir', default='../data',
                        help='Output directory for CSV files')
     parser.add_argument('--api-key', help='Google Places API key (or set GOOGLE_PLACES_API_KEY env var)')
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS,
+                       help=f'Concurrent API requests in flight (default: {DEFAULT_WORKERS})')
+    parser.add_argument('--qps', action='append', type=qps_value, metavar='[ENDPOINT=]RATE',
+                       help='Queries per second, for all endpoints or one of geocode/places/places_nearby/place (repeatable)')
+    add_plan_argument(parser)
+    add_split_arguments(parser)
+    add_scheduler_arguments(parser)
+    add_pagination_argument(parser)
+    add_details_argument(parser)
+    add_prefilter_argument(parser)
+    add_registry_arguments(parser)
+    add_sink_arguments(parser)
+    add_cache_arguments(parser)
+    add_gazetteer_arguments(parser)
+    add_boundary_arguments(parser)
+    add_resume_argument(parser)
     
     args = parser.parse_args()
+    qps = parse_qps(args.qps)
+    
+    # A coverage plan covers one state and replaces that state's city list
+    plan = load_plan(args.plan) if args.plan else None
+    if plan:
+        args.state = plan['state']
     
     # Get API key
     api_key = args.api_key or os.environ.get('GOOGLE_PLACES_API_KEY')
@@ -404,18 +571,53 @@ def main():
     # Create output directory
     os.makedirs(args.output_dir, exist_ok=True)
     
+    # Both states share one registry, so a place found by the IL run is not re-collected for MO
+    registry = registry_from_args(args)
+    sink = sink_from_args(args)
+    gazetteer = gazetteer_from_args(args)
+    boundaries = boundaries_from_args(args)
+    
     # Collect data
     if args.state in ['IL', 'BOTH']:
         print("\n🌽 Starting Illinois collection...")
-        collector_il = FoodBankCollector(api_key)
-        collector_il.collect_all_cities('IL')
-        collector_il.export_to_csv(f"{args.output_dir}/il_all_food_banks.csv")
+        il_output = f"{args.output_dir}/il_all_food_banks.csv"
+        journal_il = CheckpointJournal(journal_path_for(il_output), resume=args.resume)
+        collector_il = FoodBankCollector(api_key, qps, args.workers, cache_path_from_args(args),
+                                         journal=journal_il, split_policy=split_policy_from_args(args),
+                                         scheduler=scheduler_from_args(args), details=args.details,
+                                         hit_filter=hit_filter_from_args(args), registry=registry,
+                                         sink=sink, max_pages=args.max_pages, gazetteer=gazetteer,
+                                         boundaries=boundaries)
+        if plan:
+            collector_il.collect_plan(plan)
+        else:
+            collector_il.collect_all_cities('IL')
+        collector_il.export_to_csv(il_output)
+        collector_il.fetcher.close()
+        collector_il.scheduler.close()
+        journal_il.close()
     
     if args.state in ['MO', 'BOTH']:
         print("\n🎺 Starting Missouri collection...")
-        collector_mo = FoodBankCollector(api_key)
-        collector_mo.collect_all_cities('MO')
-        collector_mo.export_to_csv(f"{args.output_dir}/mo_all_food_banks.csv")
+        mo_output = f"{args.output_dir}/mo_all_food_banks.csv"
+        journal_mo = CheckpointJournal(journal_path_for(mo_output), resume=args.resume)
+        collector_mo = FoodBankCollector(api_key, qps, args.workers, cache_path_from_args(args),
+                                         journal=journal_mo, split_policy=split_policy_from_args(args),
+                                         scheduler=scheduler_from_args(args), details=args.details,
+                                         hit_filter=hit_filter_from_args(args), registry=registry,
+                                         sink=sink, max_pages=args.max_pages, gazetteer=gazetteer,
+                                         boundaries=boundaries)
+        if plan:
+            collector_mo.collect_plan(plan)
+        else:
+            collector_mo.collect_all_cities('MO')
+        collector_mo.export_to_csv(mo_output)
+        collector_mo.fetcher.close()
+        collector_mo.scheduler.close()
+        journal_mo.close()
+    registry.close()
+    if sink:
+        sink.close()
     
     print("\n" + "="*60)
     print("🎉 COLLECTION COMPLETE!")
@@ -12,6 +12,20 @@ import argparse
 from datetime import datetime
 import googlemaps
 
+from checkpoint import CheckpointJournal, add_resume_argument, journal_path_for
+from boundary_join import add_boundary_arguments, boundaries_from_args
+from address_utils import address_city, parse_address
+from coverage_planner import (SplitPolicy, add_plan_argument, add_split_arguments, bounds_around, load_plan,
+                              split_policy_from_args)
+from hit_filter import HitFilter, add_prefilter_argument, hit_filter_from_args
+from place_details import DEFAULT_DETAILS_MODE, DetailsStage, add_details_argument, missing_fields
+from place_registry import PlaceRegistry, add_registry_arguments, registry_from_args
+from gazetteer import add_gazetteer_arguments, gazetteer_from_args
+from places_cache import DEFAULT_CACHE_PATH, add_cache_arguments, cache_path_from_args
+from resource_sink import add_sink_arguments, sink_from_args
+from query_yield import QueryScheduler, add_scheduler_arguments, scheduler_from_args, size_class
+from places_fetcher import MAX_PAGES, PlacesFetcher, add_pagination_argument, client_options, wrap_client
+
 # Prioritized cities for food bank collection (most populous first)
 ILLINOIS_PRIORITY_CITIES = [
     ("Chicago", 20), ("Aurora", 15), ("Rockford", 15), ("Joliet", 12), ("Naperville", 12),
@@ -25,6 +39,9 @@ MISSOURI_PRIORITY_CITIES = [
     ("St. Charles", 10), ("St. Peters", 10),
 ]
 
+# Fields each resource needs; text search hits lack phone and website
+DETAIL_FIELDS = ['name', 'formatted_address', 'formatted_phone_number', 'website', 'geometry']
+
 # Most effective search terms (tested to get best results)
 PRIORITY_FOOD_QUERIES = [
     "food bank",
@@ -35,12 +52,31 @@ PRIORITY_FOOD_QUERIES = [
 ]
 
 class OptimizedFoodBankCollector:
-    def __init__(self, api_key, max_queries=11000):
-        self.gmaps = googlemaps.Client(key=api_key)
+    def __init__(self, api_key, max_queries=11000, cache_path=DEFAULT_CACHE_PATH, journal=None,
+                 split_policy=None, scheduler=None, details=DEFAULT_DETAILS_MODE,
+                 hit_filter=None, registry=None, sink=None, max_pages=MAX_PAGES,
+                 gazetteer=None, boundaries=None):
+        self.gmaps = wrap_client(googlemaps.Client(key=api_key, **client_options()), cache_path=cache_path,
+                                 gazetteer=gazetteer)
+        self.fetcher = PlacesFetcher(self.gmaps)
+        self.max_pages = max_pages
+        self.split_policy = split_policy or SplitPolicy()
+        self.scheduler = scheduler or QueryScheduler()
+        self.hit_filter = hit_filter or HitFilter()
+        self.registry = registry or PlaceRegistry()
+        self.sink = sink
+        self.boundaries = boundaries
+        self.details = DetailsStage(self.gmaps, self._fill_details, details, fetcher=self.fetcher)
         self.results = []
         self.query_count = 0
         self.max_queries = max_queries
-        self.seen_place_ids = set()
+        
+        # Replay resources from a resumed checkpoint journal
+        self.journal = journal
+        if journal:
+            self.results.extend(journal.resources)
+            self.registry.mark_seen(r['place_id'] for r in journal.resources)
+            self.details.resume(self.results)
         
     def collect_optimized(self, state):
         """Optimized collection that stays within free tier"""
@@ -58,112 +94,207 @@ class OptimizedFoodBankCollector:
         
         for i, (city, radius) in enumerate(cities, 1):
             # Check query limit
-            if self.query_count >= self.max_queries:
+            if self.requests_used() >= self.max_queries:
                 print(f"\n⚠️  Reached query limit ({self.max_queries})")
                 print(f"   Collected from {i-1}/{len(cities)} cities")
                 break
             
             print(f"\n[{i}/{len(cities)}] 🏙️  {city}, {state}")
-            print(f"   Queries used: {self.query_count}/{self.max_queries}")
+            print(f"   Queries used: {self.requests_used()}/{self.max_queries}")
             print("-" * 50)
             
             self.collect_city_optimized(city, state, radius)
             time.sleep(1)
         
+        self.resolve_details()
+        
+        print(f"\n{'='*60}")
+        print(f"✅ COLLECTION COMPLETE")
+        print(f"{'='*60}")
+        print(f"📊 Resources found: {len(self.results)}")
+        print(f"🔢 Queries used: {self.query_count} searches + {self.details.calls} details")
+        print(f"💰 Cost: ${(self.query_count + self.details.calls) * 0.017:.2f}")
+        print(f"{'='*60}\n")
+    
+    def collect_plan(self, plan):
+        """Optimized collection over the cells of a coverage plan"""
+        state = plan['state']
+        cells = plan['cells']
+        
+        print(f"\n{'='*60}")
+        print(f"🍽️  OPTIMIZED COLLECTION - {state} (coverage plan)")
+        print(f"{'='*60}")
+        print(f"🔲 Cells: {len(cells)}")
+        print(f"🔍 Search terms: {len(PRIORITY_FOOD_QUERIES)}")
+        print(f"💰 Target: Stay under {self.max_queries:,} queries")
+        print(f"{'='*60}\n")
+        
+        for i, cell in enumerate(cells, 1):
+            if self.requests_used() >= self.max_queries:
+                print(f"\n⚠️  Reached query limit ({self.max_queries})")
+                print(f"   Collected from {i-1}/{len(cells)} cells")
+                break
+            
+            print(f"\n[{i}/{len(cells)}] 🔲 {cell['id']} {cell['label'] or ''} ({cell['radius_m'] / 1000:.1f} km)")
+            print(f"   Queries used: {self.requests_used()}/{self.max_queries}")
+            print("-" * 50)
+            
+            self.collect_area(cell['id'], state, cell['lat'], cell['lng'], cell['radius_m'], label=cell['label'],
+                              size=size_class(expected=cell['expected']))
+        
+        self.resolve_details()
+        
         print(f"\n{'='*60}")
         print(f"✅ COLLECTION COMPLETE")
         print(f"{'='*60}")
         print(f"📊 Resources found: {len(self.results)}")
-        print(f"🔢 Queries used: {self.query_count}")
-        print(f"💰 Cost: ${self.query_count * 0.017:.2f}")
+        print(f"🔢 Queries used: {self.query_count} searches + {self.details.calls} details")
+        print(f"💰 Cost: ${(self.query_count + self.details.calls) * 0.017:.2f}")
         print(f"{'='*60}\n")
     
+    def _pending(self, unit):
+        return [q for q in PRIORITY_FOOD_QUERIES
+                if not (self.journal and self.journal.is_done(unit, q, 'text'))]
+    
     def collect_city_optimized(self, city, state, radius_miles):
         """Optimized collection for a single city"""
+        if not self._pending(city):
+            print(f"  ⏭️  Already collected (checkpoint)")
+            return
+        
         try:
             # Geocode
             geocode_result = self.gmaps.geocode(f"{city}, {state}, USA")
-            if not geocode_result:
-                return
-            
-            location = geocode_result[0]['geometry']['location']
-            lat, lng = location['lat'], location['lng']
-            radius_meters = int(radius_miles * 1609.34)
-            
-            city_results = 0
+        except Exception as e:
+            print(f"  ❌ Error: {str(e)}")
+            return
+        if not geocode_result:
+            return
+        
+        location = geocode_result[0]['geometry']['location']
+        self.collect_area(city, state, location['lat'], location['lng'], int(radius_miles * 1609.34), city=city)
+    
+    def collect_area(self, unit, state, lat, lng, radius_meters, city=None, label='', size=None):
+        """Optimized collection around a point; unit keys the checkpoint journal"""
+        pending = self._pending(unit)
+        if not pending:
+            print(f"  ⏭️  Already collected (checkpoint)")
+            return
+        
+        # Best-yielding terms first; terms that only re-find known places are skipped
+        cls = size or size_class(radius_m=radius_meters)
+        scheduled = [query for query, _ in self.scheduler.schedule([(q, 'text') for q in pending], cls)]
+        if len(scheduled) < len(pending):
+            print(f"  ✂️  Skipping {len(pending) - len(scheduled)} low-yield searches ({cls})")
+        pending = scheduled
+        
+        # Start only the searches the budget covers even if every one fills all its pages;
+        # they run at once so their page-token waits and splits overlap
+        budget = (self.max_queries - self.requests_used()) // self.max_pages
+        pending = pending[:max(budget, 1)]
+        
+        try:
+            area_results = 0
             
             # Use text search only (more effective per query)
-            for query in PRIORITY_FOOD_QUERIES:
-                if self.query_count >= self.max_queries:
-                    break
-                
-                found = self._search_text_optimized(query, city, state, lat, lng, radius_meters)
-                city_results += found
-                time.sleep(0.2)
+            place_name = city or label
+            searches = []
+            for query in pending:
+                search_query = f"{query} in {place_name}, {state}" if place_name else query
+                searches.append((query, self._submit_text(search_query, lat, lng, radius_meters)))
+            
+            for query, future in searches:
+                found = self._search_text_optimized(query, future, unit, state, city, label, cls)
+                area_results += found
             
-            print(f"  ✅ {city_results} new resources")
+            print(f"  ✅ {area_results} new resources")
             
         except Exception as e:
             print(f"  ❌ Error: {str(e)}")
     
-    def _search_text_optimized(self, query, city, state, lat, lng, radius):
-        """Optimized text search"""
+    def _submit_text(self, search_query, lat, lng, radius):
+        """Schedule a text search (following its next_page_tokens, split if saturated)"""
+        return self.fetcher.submit_refined(self.split_policy, 'places', bounds_around(lat, lng, radius),
+                                           self.registry, self.max_pages, query=search_query,
+                                           location=(lat, lng), radius=radius)
+    
+    def _search_text_optimized(self, query, future, unit, state, city=None, label='', cls='city'):
+        """Optimized text search; without a city (plan cells) resources take the city from their address"""
         try:
-            search_query = f"{query} in {city}, {state}"
-            
-            result = self.gmaps.places(
-                query=search_query,
-                location=(lat, lng),
-                radius=radius
-            )
+            # Saturated searches come back split into quadrant searches while those kept finding new places
+            places, queries = future.result()
+            self.query_count += queries
+            resources = []
+            new_places = 0
             
-            self.query_count += 1
-            new_count = 0
-            
-            for place in result.get('results', []):
+            for place in places:
                 place_id = place['place_id']
                 
-                if place_id in self.seen_place_ids:
+                if not self.registry.claim(place_id):
                     continue
                 
-                self.seen_place_ids.add(place_id)
-                
-                try:
-                    details = self.gmaps.place(place_id=place_id, fields=[
-                        'name', 'formatted_address', 'formatted_phone_number',
-                        'website', 'geometry'
-                    ])['result']
-                    
-                    address_parts = details.get('formatted_address', '').split(',')
-                    street = address_parts[0] if address_parts else ''
-                    zip_code = address_parts[-1].strip().split()[-1] if len(address_parts) >= 3 else ''
-                    
-                    self.results.append({
-                        'place_id': place_id,
-                        'name': details.get('name'),
-                        'address': street,
-                        'city': city,
-                        'state': state,
-                        'zip_code': zip_code,
-                        'latitude': details['geometry']['location']['lat'],
-                        'longitude': details['geometry']['location']['lng'],
-                        'phone': details.get('formatted_phone_number', ''),
-                        'website': details.get('website', ''),
-                        'category': 'food-pantries',
-                        'search_query': query,
-                        'collected_at': datetime.now().isoformat()
-                    })
-                    
-                    new_count += 1
-                except:
+                # Drop restaurants and chains before they cost a details lookup
+                if not self.hit_filter.allow(place):
                     continue
+                new_places += 1
+                
+                # Text search hits already carry name, address and geometry
+                street, zip_code = parse_address(place.get('formatted_address', ''))
+                resource = {
+                    'place_id': place_id,
+                    'name': place.get('name'),
+                    'address': street,
+                    'city': city or address_city(place.get('formatted_address', '')) or label,
+                    'state': state,
+                    'zip_code': zip_code,
+                    'latitude': place['geometry']['location']['lat'],
+                    'longitude': place['geometry']['location']['lng'],
+                    'phone': place.get('formatted_phone_number', ''),
+                    'website': place.get('website', ''),
+                    'category': 'food-pantries',
+                    'search_query': query,
+                    'collected_at': datetime.now().isoformat()
+                }
+                self.details.add(resource, place_id, missing_fields(place, DETAIL_FIELDS))
+                resources.append(resource)
             
-            return new_count
+            if self.boundaries:
+                self.boundaries.assign(resources)
+            self.details.unit_done()
+            self.results.extend(resources)
+            self.scheduler.record(query, 'text', cls, queries, self.hit_filter.relevant(places), new_places)
+            if self.sink:
+                self.sink.write(resources)
+            if self.journal:
+                self.journal.record((unit, query, 'text'), resources)
+            return len(resources)
         except:
             return 0
     
+    def _fill_details(self, resource, details):
+        """Merge deferred place() details into a resource built from its search hit"""
+        if details.get('formatted_address'):
+            # A ZIP from the boundary join (or the search hit) stays
+            resource['address'], zip_code = parse_address(details['formatted_address'])
+            resource['zip_code'] = resource['zip_code'] or zip_code
+        resource['phone'] = details.get('formatted_phone_number', resource['phone'])
+        resource['website'] = details.get('website', resource['website'])
+        if self.sink:
+            self.sink.write([resource])
+    
+    def requests_used(self):
+        """Searches plus place details made or still owed - what counts against --max-queries"""
+        return self.query_count + self.details.calls + len(self.details)
+    
+    def resolve_details(self):
+        """Deferred stage: fetch the details still owed to collected resources in one batch"""
+        if len(self.details):
+            print(f"\n📇 Fetching place details for {len(self.details)} resources...")
+            self.details.flush()
+    
     def export_to_csv(self, filename):
         """Export to CSV"""
+        self.resolve_details()
         if not self.results:
             print("❌ No results")
             return
@@ -172,26 +303,57 @@ class OptimizedFoodBankCollector:
         
         with open(filename, 'w', newline='', encoding='utf-8') as f:
             writer = csv.DictWriter(f, fieldnames=[
-                'name', 'address', 'city', 'state', 'zip_code', 'latitude',
+                'name', 'address', 'city', 'county', 'state', 'zip_code', 'latitude',
                 'longitude', 'phone', 'website', 'category', 'place_id'
             ], extrasaction='ignore')
             writer.writeheader()
             writer.writerows(self.results)
+        self.registry.commit((r['place_id'] for r in self.results), 'collect_food_banks_optimized')
         
-        cost = self.query_count * 0.017
+        cost = (self.query_count + self.details.calls) * 0.017
         print(f"\n✅ Saved {len(self.results)} resources to {filename}")
-        print(f"💰 Cost: ${cost:.2f} ({self.query_count} queries)")
+        print(f"💰 Cost: ${cost:.2f} ({self.query_count} searches + {self.details.calls} details)")
+        print(f"📇 {self.details.summary()}")
+        print(f"🚫 {self.hit_filter.summary()}")
+        print(f"🗂️  {self.registry.summary()}")
+        if self.boundaries:
+            print(f"🗺️  {self.boundaries.summary()}")
+        if self.sink:
+            self.sink.flush()
+            print(f"🗄️  {self.sink.summary()}")
+        print(f"🔲 {self.split_policy.summary()}")
+        print(f"✂️  {self.scheduler.summary()}")
+        if hasattr(self.gmaps, 'summary'):
+            print(f"💾 {self.gmaps.summary()}")
         if cost == 0:
             print("   🎉 FREE with Google credit!")
 
 def main():
     parser = argparse.ArgumentParser()
-    parser.add_argument('--state', choices=['IL', 'MO'], required=True)
+    parser.add_argument('--state', choices=['IL', 'MO'], help='Required unless --plan is given')
     parser.add_argument('--output-dir', default='../data')
     parser.add_argument('--max-queries', type=int, default=11000)
     parser.add_argument('--api-key', help='Google API key')
+    add_plan_argument(parser)
+    add_split_arguments(parser)
+    add_scheduler_arguments(parser)
+    add_pagination_argument(parser)
+    add_details_argument(parser)
+    add_prefilter_argument(parser)
+    add_registry_arguments(parser)
+    add_sink_arguments(parser)
+    add_cache_arguments(parser)
+    add_gazetteer_arguments(parser)
+    add_boundary_arguments(parser)
+    add_resume_argument(parser)
     args = parser.parse_args()
     
+    plan = load_plan(args.plan) if args.plan else None
+    if plan:
+        args.state = plan['state']
+    elif not args.state:
+        parser.error('--state is required without --plan')
+    
     api_key = args.api_key or os.environ.get('GOOGLE_PLACES_API_KEY')
     if not api_key:
         print("❌ Need API key")
@@ -199,11 +361,28 @@ def main():
     
     os.makedirs(args.output_dir, exist_ok=True)
     
-    collector = OptimizedFoodBankCollector(api_key, args.max_queries)
-    collector.collect_optimized(args.state)
-    
     filename = f"{args.output_dir}/{args.state.lower()}_food_banks_optimized.csv"
+    journal = CheckpointJournal(journal_path_for(filename), resume=args.resume)
+    
+    collector = OptimizedFoodBankCollector(api_key, args.max_queries, cache_path_from_args(args),
+                                           journal=journal, split_policy=split_policy_from_args(args),
+                                           scheduler=scheduler_from_args(args), details=args.details,
+                                           hit_filter=hit_filter_from_args(args), registry=registry_from_args(args),
+                                           sink=sink_from_args(args), max_pages=args.max_pages,
+                                           gazetteer=gazetteer_from_args(args),
+                                           boundaries=boundaries_from_args(args))
+    if plan:
+        collector.collect_plan(plan)
+    else:
+        collector.collect_optimized(args.state)
     collector.export_to_csv(filename)
+    collector.scheduler.close()
+    collector.details.close()
+    collector.fetcher.close()
+    collector.registry.close()
+    if collector.sink:
+        collector.sink.close()
+    journal.close()
     
     print(f"\nNext: python import_csv.py --file {filename}")
     return 0
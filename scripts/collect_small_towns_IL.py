@@ -7,9 +7,24 @@ Captures community outreach centers in smaller communities
 import os
 import csv
 import time
+import argparse
 from datetime import datetime
 import googlemaps
 
+from checkpoint import CheckpointJournal, add_resume_argument, journal_path_for
+from boundary_join import add_boundary_arguments, boundaries_from_args
+from address_utils import address_city, parse_address
+from coverage_planner import (SplitPolicy, add_plan_argument, add_split_arguments, bounds_around, load_plan,
+                              split_policy_from_args)
+from hit_filter import HitFilter, add_prefilter_argument, hit_filter_from_args
+from place_details import DEFAULT_DETAILS_MODE, DetailsStage, add_details_argument, missing_fields
+from place_registry import PlaceRegistry, add_registry_arguments, registry_from_args
+from gazetteer import add_gazetteer_arguments, gazetteer_from_args
+from places_cache import DEFAULT_CACHE_PATH, add_cache_arguments, cache_path_from_args
+from resource_sink import add_sink_arguments, sink_from_args
+from query_yield import QueryScheduler, add_scheduler_arguments, scheduler_from_args, size_class
+from places_fetcher import MAX_PAGES, PlacesFetcher, add_pagination_argument, client_options, wrap_client
+
 # Smaller Illinois cities and county seats (population 5,000-30,000)
 SMALL_IL_CITIES = [
     # County seats and regional centers
@@ -66,6 +81,9 @@ SMALL_IL_CITIES = [
 ]
 
 # Enhanced search terms for community outreach and county programs
+# Fields each resource needs; text search hits lack phone and website
+DETAIL_FIELDS = ['name', 'formatted_address', 'formatted_phone_number', 'website', 'geometry']
+
 COMMUNITY_QUERIES = [
     "food bank",
     "food pantry",
@@ -80,11 +98,29 @@ COMMUNITY_QUERIES = [
 ]
 
 class SmallTownCollector:
-    def __init__(self, api_key):
-        self.gmaps = googlemaps.Client(key=api_key)
+    def __init__(self, api_key, cache_path=DEFAULT_CACHE_PATH, journal=None, split_policy=None, scheduler=None,
+                 details=DEFAULT_DETAILS_MODE, hit_filter=None, registry=None, sink=None, max_pages=MAX_PAGES,
+                 gazetteer=None, boundaries=None):
+        self.gmaps = wrap_client(googlemaps.Client(key=api_key, **client_options()), cache_path=cache_path,
+                                 gazetteer=gazetteer)
+        self.fetcher = PlacesFetcher(self.gmaps)
+        self.max_pages = max_pages
+        self.split_policy = split_policy or SplitPolicy()
+        self.scheduler = scheduler or QueryScheduler()
+        self.hit_filter = hit_filter or HitFilter()
+        self.registry = registry or PlaceRegistry()
+        self.sink = sink
+        self.boundaries = boundaries
+        self.details = DetailsStage(self.gmaps, self._fill_details, details, fetcher=self.fetcher)
         self.results = []
         self.query_count = 0
-        self.seen_place_ids = set()
+        
+        # Replay resources from a resumed checkpoint journal
+        self.journal = journal
+        if journal:
+            self.results.extend(journal.resources)
+            self.registry.mark_seen(r['place_id'] for r in journal.resources)
+            self.details.resume(self.results)
     
     def collect_all(self):
         print(f"\n{'='*60}")
@@ -101,78 +137,174 @@ class SmallTownCollector:
             time.sleep(1)
             
             if i % 10 == 0:
-                print(f"\n📈 PROGRESS: {i}/{len(SMALL_IL_CITIES)} • {len(self.results)} resources • ${self.query_count * 0.017:.2f}")
+                print(f"\n📈 PROGRESS: {i}/{len(SMALL_IL_CITIES)} • {len(self.results)} resources • ${self.cost():.2f}")
+        
+        self.resolve_details()
         
         print(f"\n{'='*60}")
         print(f"✅ COLLECTION COMPLETE")
         print(f"{'='*60}")
         print(f"📊 Resources: {len(self.results)}")
-        print(f"💰 Cost: ${self.query_count * 0.017:.2f}")
+        print(f"💰 Cost: ${self.cost():.2f}")
         print(f"{'='*60}\n")
     
+    def collect_plan(self, plan):
+        state = plan['state']
+        cells = plan['cells']
+        
+        print(f"\n{'='*60}")
+        print(f"🏘️  COVERAGE PLAN - {state}")
+        print(f"{'='*60}")
+        print(f"🔲 Total cells: {len(cells)}")
+        print(f"{'='*60}\n")
+        
+        for i, cell in enumerate(cells, 1):
+            print(f"\n[{i}/{len(cells)}] 🔲 {cell['id']} {cell['label'] or ''} ({cell['radius_m'] / 1000:.1f} km)")
+            print("-" * 50)
+            self.collect_area(cell['id'], cell['lat'], cell['lng'], cell['radius_m'], label=cell['label'], state=state,
+                              size=size_class(expected=cell['expected']))
+            
+            if i % 10 == 0:
+                print(f"\n📈 PROGRESS: {i}/{len(cells)} • {len(self.results)} resources • ${self.cost():.2f}")
+        
+        self.resolve_details()
+        
+        print(f"\n{'='*60}")
+        print(f"✅ COLLECTION COMPLETE")
+        print(f"{'='*60}")
+        print(f"📊 Resources: {len(self.results)}")
+        print(f"💰 Cost: ${self.cost():.2f}")
+        print(f"{'='*60}\n")
+    
+    def _pending(self, unit):
+        return [q for q in COMMUNITY_QUERIES
+                if not (self.journal and self.journal.is_done(unit, q, 'text'))]
+    
     def collect_city(self, city, radius_miles):
+        if not self._pending(city):
+            print(f"  ⏭️  Already collected (checkpoint)")
+            return
+        
         try:
             geocode = self.gmaps.geocode(f"{city}, IL, USA")
-            if not geocode:
-                print(f"  ❌ Could not geocode")
-                return
-            
-            loc = geocode[0]['geometry']['location']
-            lat, lng = loc['lat'], loc['lng']
-            radius = int(radius_miles * 1609.34)
-            
+        except Exception as e:
+            print(f"  ❌ Error: {str(e)}")
+            return
+        if not geocode:
+            print(f"  ❌ Could not geocode")
+            return
+        
+        loc = geocode[0]['geometry']['location']
+        self.collect_area(city, loc['lat'], loc['lng'], int(radius_miles * 1609.34), city=city)
+    
+    def collect_area(self, unit, lat, lng, radius, city=None, label='', state='IL', size=None):
+        """Search around a point; unit keys the checkpoint journal.
+        Without a city (plan cells), each resource takes the city from its address."""
+        pending = self._pending(unit)
+        if not pending:
+            print(f"  ⏭️  Already collected (checkpoint)")
+            return
+        
+        # Best-yielding terms first; terms that only re-find known places are skipped
+        cls = size or size_class(radius_m=radius)
+        scheduled = [query for query, _ in self.scheduler.schedule([(q, 'text') for q in pending], cls)]
+        if len(scheduled) < len(pending):
+            print(f"  ✂️  Skipping {len(pending) - len(scheduled)} low-yield searches ({cls})")
+        pending = scheduled
+        
+        place_name = city or label
+        
+        try:
             city_count = 0
             
-            for query in COMMUNITY_QUERIES:
-                # Text search (better for finding specific named organizations)
-                search_query = f"{query} in {city}, IL"
-                result = self.gmaps.places(query=search_query, location=(lat, lng), radius=radius)
-                self.query_count += 1
+            # Text search (better for finding specific named organizations); every search
+            # starts at once so their page-token waits and splits overlap
+            searches = []
+            for query in pending:
+                search_query = f"{query} in {place_name}, {state}" if place_name else query
+                searches.append((query, self._submit_text(search_query, lat, lng, radius)))
+            
+            for query, future in searches:
+                places, queries = future.result()
+                self.query_count += queries
+                resources = []
+                new_places = 0
                 
-                for place in result.get('results', []):
+                for place in places:
                     place_id = place['place_id']
-                    if place_id in self.seen_place_ids:
+                    if not self.registry.claim(place_id):
                         continue
                     
-                    self.seen_place_ids.add(place_id)
-                    
-                    try:
-                        details = self.gmaps.place(place_id=place_id, fields=[
-                            'name', 'formatted_address', 'formatted_phone_number',
-                            'website', 'geometry', 'business_status', 'rating'
-                        ])['result']
-                        
-                        address_parts = details.get('formatted_address', '').split(',')
-                        street = address_parts[0] if address_parts else ''
-                        zip_code = address_parts[-1].strip().split()[-1] if len(address_parts) >= 3 else ''
-                        
-                        self.results.append({
-                            'place_id': place_id,
-                            'name': details.get('name'),
-                            'address': street,
-                            'city': city,
-                            'state': 'IL',
-                            'zip_code': zip_code,
-                            'latitude': details['geometry']['location']['lat'],
-                            'longitude': details['geometry']['location']['lng'],
-                            'phone': details.get('formatted_phone_number', ''),
-                            'website': details.get('website', ''),
-                            'category': 'food-pantries',
-                            'search_query': query,
-                            'collected_at': datetime.now().isoformat()
-                        })
-                        city_count += 1
-                    except:
+                    # Drop restaurants and chains before they cost a details lookup
+                    if not self.hit_filter.allow(place):
                         continue
+                    new_places += 1
+                    
+                    # Text search hits already carry name, address and geometry
+                    street, zip_code = parse_address(place.get('formatted_address', ''))
+                    resource = {
+                        'place_id': place_id,
+                        'name': place.get('name'),
+                        'address': street,
+                        'city': city or address_city(place.get('formatted_address', '')) or label,
+                        'state': state,
+                        'zip_code': zip_code,
+                        'latitude': place['geometry']['location']['lat'],
+                        'longitude': place['geometry']['location']['lng'],
+                        'phone': place.get('formatted_phone_number', ''),
+                        'website': place.get('website', ''),
+                        'category': 'food-pantries',
+                        'search_query': query,
+                        'collected_at': datetime.now().isoformat()
+                    }
+                    self.details.add(resource, place_id, missing_fields(place, DETAIL_FIELDS))
+                    resources.append(resource)
                 
-                time.sleep(0.3)
+                if self.boundaries:
+                    self.boundaries.assign(resources)
+                self.details.unit_done()
+                self.results.extend(resources)
+                city_count += len(resources)
+                self.scheduler.record(query, 'text', cls, queries, self.hit_filter.relevant(places), new_places)
+                if self.sink:
+                    self.sink.write(resources)
+                if self.journal:
+                    self.journal.record((unit, query, 'text'), resources)
             
             print(f"  ✅ {city_count} resources")
             
         except Exception as e:
             print(f"  ❌ Error: {str(e)}")
     
+    def _submit_text(self, search_query, lat, lng, radius):
+        """Schedule a text search (following its next_page_tokens, split if saturated)"""
+        return self.fetcher.submit_refined(self.split_policy, 'places', bounds_around(lat, lng, radius),
+                                           self.registry, self.max_pages, query=search_query,
+                                           location=(lat, lng), radius=radius)
+    
+    def _fill_details(self, resource, details):
+        """Merge deferred place() details into a resource built from its search hit"""
+        if details.get('formatted_address'):
+            # A ZIP from the boundary join (or the search hit) stays
+            resource['address'], zip_code = parse_address(details['formatted_address'])
+            resource['zip_code'] = resource['zip_code'] or zip_code
+        resource['phone'] = details.get('formatted_phone_number', resource['phone'])
+        resource['website'] = details.get('website', resource['website'])
+        if self.sink:
+            self.sink.write([resource])
+    
+    def cost(self):
+        """Searches plus place details lookups, at $17 per 1000"""
+        return (self.query_count + self.details.calls) * 0.017
+    
+    def resolve_details(self):
+        """Deferred stage: fetch the details still owed to collected resources in one batch"""
+        if len(self.details):
+            print(f"\n📇 Fetching place details for {len(self.details)} resources...")
+            self.details.flush()
+    
     def export_csv(self, filename):
+        self.resolve_details()
         if not self.results:
             print("❌ No results")
             return
@@ -181,24 +313,70 @@ class SmallTownCollector:
         
         with open(filename, 'w', newline='', encoding='utf-8') as f:
             writer = csv.DictWriter(f, fieldnames=[
-                'name', 'address', 'city', 'state', 'zip_code', 'latitude',
+                'name', 'address', 'city', 'county', 'state', 'zip_code', 'latitude',
                 'longitude', 'phone', 'website', 'category', 'place_id'
             ], extrasaction='ignore')
             writer.writeheader()
             writer.writerows(self.results)
+        self.registry.commit((r['place_id'] for r in self.results), 'collect_small_towns_IL')
         
         print(f"\n✅ Saved {len(self.results)} resources to {filename}")
-        print(f"💰 Cost: ${self.query_count * 0.017:.2f}")
+        print(f"💰 Cost: ${self.cost():.2f}")
+        print(f"📇 {self.details.summary()}")
+        print(f"🚫 {self.hit_filter.summary()}")
+        print(f"🗂️  {self.registry.summary()}")
+        if self.boundaries:
+            print(f"🗺️  {self.boundaries.summary()}")
+        if self.sink:
+            self.sink.flush()
+            print(f"🗄️  {self.sink.summary()}")
+        print(f"🔲 {self.split_policy.summary()}")
+        print(f"✂️  {self.scheduler.summary()}")
+        if hasattr(self.gmaps, 'summary'):
+            print(f"💾 {self.gmaps.summary()}")
 
 def main():
+    parser = argparse.ArgumentParser(description='Collect food resources in small Illinois towns')
+    add_plan_argument(parser)
+    add_split_arguments(parser)
+    add_scheduler_arguments(parser)
+    add_pagination_argument(parser)
+    add_details_argument(parser)
+    add_prefilter_argument(parser)
+    add_registry_arguments(parser)
+    add_sink_arguments(parser)
+    add_cache_arguments(parser)
+    add_gazetteer_arguments(parser)
+    add_boundary_arguments(parser)
+    add_resume_argument(parser)
+    args = parser.parse_args()
+    
     api_key = os.environ.get('GOOGLE_PLACES_API_KEY')
     if not api_key:
         print("❌ Need GOOGLE_PLACES_API_KEY")
         return 1
     
-    collector = SmallTownCollector(api_key)
-    collector.collect_all()
-    collector.export_csv('../data/il_small_towns_food_banks.csv')
+    filename = '../data/il_small_towns_food_banks.csv'
+    journal = CheckpointJournal(journal_path_for(filename), resume=args.resume)
+    
+    collector = SmallTownCollector(api_key, cache_path_from_args(args), journal=journal,
+                                   split_policy=split_policy_from_args(args), scheduler=scheduler_from_args(args),
+                                   details=args.details, hit_filter=hit_filter_from_args(args),
+                                   registry=registry_from_args(args), sink=sink_from_args(args),
+                                   max_pages=args.max_pages, gazetteer=gazetteer_from_args(args),
+                                   boundaries=boundaries_from_args(args))
+    if args.plan:
+        collector.collect_plan(load_plan(args.plan))
+    else:
+        collector.collect_all()
+    collector.export_csv(filename)
+    collector.scheduler.close()
+    collector.details.close()
+    collector.fetcher.close()
+    collector.registry.close()
+    if collector.sink:
+        collector.sink.close()
+    journal.close()
     
     print(f"\nNext: python import_csv.py --file ../data/il_small_towns_food_banks.csv")
     return 0
@@ -0,0 +1,363 @@
+#!/usr/bin/env python3
+"""
+Coverage Planner for HumanAid
+Tiles a state boundary into non-overlapping search cells sized by expected
+place density, so a full-state sweep queries every area exactly once
+
+Usage:
+    python coverage_planner.py --state IL --seed-csv ../data/*.csv
+    python coverage_planner.py --state MO --boundary ../data/mo_boundary.geojson
+    python collect_all_food_banks.py --plan ../data/il_coverage_plan.json
+"""
+
+import os
+import csv
+import json
+import math
+import argparse
+import threading
+from collections import Counter
+from datetime import datetime
+
+# (south, west, north, east) - used when no --boundary GeoJSON is given
+STATE_BBOX = {
+    'IL': (36.97, -91.51, 42.51, -87.02),
+    'MO': (35.99, -95.77, 40.61, -89.10),
+}
+
+# Places Nearby/Text Search accept at most a 50 km radius
+MAX_RADIUS_M = 50000
+MIN_RADIUS_M = 1500
+
+# One page of search results - denser cells get truncated, so split them
+DEFAULT_TARGET = 20
+
+# Expected places per km² where no seed data exists (rural background)
+DEFAULT_BACKGROUND = 0.002
+
+# Runtime splitting of saturated searches: depth limit, and the new place_ids
+# four extra quadrant queries must find (per query) to keep subdividing
+PAGE_SIZE = 20
+MAX_RESULTS = 3 * PAGE_SIZE
+MAX_SPLIT_DEPTH = 3
+MIN_SPLIT_YIELD = 2.0
+
+METERS_PER_DEGREE = 111320
+
+
+def _cell_radius_m(south, west, north, east):
+    """Radius of the circle through the cell's corners"""
+    lat = math.radians((south + north) / 2)
+    height = (north - south) * METERS_PER_DEGREE
+    width = (east - west) * METERS_PER_DEGREE * math.cos(lat)
+    return math.hypot(width, height) / 2
+
+
+def _cell_area_km2(south, west, north, east):
+    lat = math.radians((south + north) / 2)
+    return (north - south) * (east - west) * (METERS_PER_DEGREE / 1000) ** 2 * math.cos(lat)
+
+
+def load_boundary(path):
+    """Outer rings [(lng, lat), ...] of a GeoJSON Polygon/MultiPolygon/Feature/FeatureCollection"""
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+
+    geometries = []
+    if data.get('type') == 'FeatureCollection':
+        geometries = [feature['geometry'] for feature in data['features']]
+    elif data.get('type') == 'Feature':
+        geometries = [data['geometry']]
+    else:
+        geometries = [data]
+
+    rings = []
+    for geometry in geometries:
+        if geometry['type'] == 'Polygon':
+            rings.append([tuple(p[:2]) for p in geometry['coordinates'][0]])
+        elif geometry['type'] == 'MultiPolygon':
+            rings.extend([tuple(p[:2]) for p in polygon[0]] for polygon in geometry['coordinates'])
+    return rings
+
+
+def boundary_bbox(rings):
+    lngs = [p[0] for ring in rings for p in ring]
+    lats = [p[1] for ring in rings for p in ring]
+    return min(lats), min(lngs), max(lats), max(lngs)
+
+
+def _point_in_ring(lng, lat, ring):
+    inside = False
+    j = len(ring) - 1
+    for i in range(len(ring)):
+        xi, yi = ring[i]
+        xj, yj = ring[j]
+        if (yi > lat) != (yj > lat) and lng < (xj - xi) * (lat - yi) / (yj - yi) + xi:
+            inside = not inside
+        j = i
+    return inside
+
+
+def _segments_cross(a, b, c, d):
+    def orient(p, q, r):
+        return (q[0] - p[0]) * (r[1] - p[1]) - (q[1] - p[1]) * (r[0] - p[0])
+    return (orient(a, b, c) * orient(a, b, d) <= 0) and (orient(c, d, a) * orient(c, d, b) <= 0)
+
+
+def _cell_intersects(bounds, rings):
+    """True if the cell overlaps any boundary ring (corner inside, vertex inside or edge crossing)"""
+    south, west, north, east = bounds
+    corners = [(west, south), (east, south), (east, north), (west, north)]
+    sides = list(zip(corners, corners[1:] + corners[:1]))
+    for ring in rings:
+        if any(_point_in_ring(x, y, ring) for x, y in corners):
+            return True
+        for a, b in zip(ring, ring[1:] + ring[:1]):
+            if max(a[0], b[0]) < west or min(a[0], b[0]) > east or max(a[1], b[1]) < south or min(a[1], b[1]) > north:
+                continue
+            if west <= a[0] <= east and south <= a[1] <= north:
+                return True
+            if any(_segments_cross(a, b, c, d) for c, d in sides):
+                return True
+    return False
+
+
+def load_density_seeds(paths, bbox=None):
+    """(lat, lng, city) of previously collected resources, from collector/import CSVs"""
+    seeds = []
+    for path in paths:
+        with open(path, 'r', encoding='utf-8', newline='') as f:
+            for row in csv.DictReader(f):
+                try:
+                    lat, lng = float(row['latitude']), float(row['longitude'])
+                except (KeyError, TypeError, ValueError):
+                    continue
+                if bbox and not (bbox[0] <= lat <= bbox[2] and bbox[1] <= lng <= bbox[3]):
+                    continue
+                seeds.append((lat, lng, (row.get('city') or '').strip()))
+    return seeds
+
+
+def make_cell(bounds, seeds=(), background=DEFAULT_BACKGROUND):
+    """Search cell for a (south, west, north, east) box"""
+    south, west, north, east = bounds
+    cities = Counter(city for _, _, city in seeds if city)
+    return {
+        'lat': round((south + north) / 2, 6),
+        'lng': round((west + east) / 2, 6),
+        'radius_m': int(math.ceil(_cell_radius_m(*bounds))),
+        'bounds': [round(v, 6) for v in bounds],
+        'expected': round(len(seeds) + _cell_area_km2(*bounds) * background, 1),
+        'label': cities.most_common(1)[0][0] if cities else '',
+    }
+
+
+def split_bounds(bounds):
+    """The four quadrants of a (south, west, north, east) box"""
+    south, west, north, east = bounds
+    mid_lat, mid_lng = (south + north) / 2, (west + east) / 2
+    return [
+        (south, west, mid_lat, mid_lng), (south, mid_lng, mid_lat, east),
+        (mid_lat, west, north, mid_lng), (mid_lat, mid_lng, north, east),
+    ]
+
+
+def bounds_around(lat, lng, radius_m):
+    """Square (south, west, north, east) box enclosing a search circle"""
+    dlat = radius_m / METERS_PER_DEGREE
+    dlng = radius_m / (METERS_PER_DEGREE * math.cos(math.radians(lat)))
+    return (lat - dlat, lng - dlng, lat + dlat, lng + dlng)
+
+
+def search_circle(bounds):
+    """(lat, lng, radius_m) of the circle through a box's corners"""
+    south, west, north, east = bounds
+    return (round((south + north) / 2, 6), round((west + east) / 2, 6), int(math.ceil(_cell_radius_m(*bounds))))
+
+
+def is_saturated(response, max_results=MAX_RESULTS):
+    """A search was truncated if pages were left unfetched or it hit the API's 60-result cap"""
+    return bool(response.get('next_page_token')) or len(response.get('results', [])) >= max_results
+
+
+class SplitPolicy:
+    """Splits saturated searches into four quadrant searches while they keep finding new places"""
+
+    def __init__(self, max_depth=MAX_SPLIT_DEPTH, min_yield=MIN_SPLIT_YIELD, min_radius_m=MIN_RADIUS_M):
+        self.max_depth = max_depth
+        self.min_yield = min_yield
+        self.min_radius_m = min_radius_m
+        self.lock = threading.Lock()
+        self.splits = 0
+        self.queries = 0
+        self.found = 0
+
+    def refine(self, response, bounds, search_many, seen=()):
+        """(extra results, extra queries) for a saturated response over bounds.
+
+        search_many(circles) runs one search per (lat, lng, radius_m) and
+        returns their responses in order. Places in seen (or already returned)
+        are not counted as new. Each depth level is one search_many() batch,
+        so paginated quadrant searches wait out their page tokens together."""
+        found = {place['place_id'] for place in response.get('results', [])}
+        extra = []
+        total_queries = 0
+        level = [(response, bounds)]
+        for _ in range(self.max_depth):
+            splits = []
+            for parent, parent_bounds in level:
+                if not is_saturated(parent):
+                    continue
+                quadrants = split_bounds(parent_bounds)
+                circles = [search_circle(q) for q in quadrants]
+                if circles[0][2] >= self.min_radius_m:
+                    splits.append((quadrants, circles))
+            if not splits:
+                break
+
+            responses = iter(search_many([circle for _, circles in splits for circle in circles]))
+            level = []
+            for quadrants, circles in splits:
+                children = [next(responses) for _ in circles]
+                queries = sum(child.get('pages', 1) for child in children)
+                total_queries += queries
+
+                new = []
+                for child in children:
+                    for place in child.get('results', []):
+                        if place['place_id'] not in seen and place['place_id'] not in found:
+                            found.add(place['place_id'])
+                            new.append(place)
+                with self.lock:
+                    self.splits += 1
+                    self.queries += queries
+                    self.found += len(new)
+                extra.extend(new)
+
+                # Stop subdividing once the extra queries stop paying for themselves
+                if len(new) / queries >= self.min_yield:
+                    level.extend(zip(children, quadrants))
+        return extra, total_queries
+
+    def summary(self):
+        return (f"Adaptive split: {self.splits} saturated searches split, "
+                f"{self.queries} extra queries, {self.found} extra places")
+
+
+def _initial_grid(bbox, max_radius_m):
+    """Equal cells covering bbox, each small enough for one max-radius search"""
+    south, west, north, east = bbox
+    side_m = max_radius_m * math.sqrt(2)
+    lat_step = side_m / METERS_PER_DEGREE
+    lng_step = side_m / (METERS_PER_DEGREE * math.cos(math.radians(max(abs(south), abs(north)))))
+    rows = max(1, math.ceil((north - south) / lat_step))
+    cols = max(1, math.ceil((east - west) / lng_step))
+    lat_step, lng_step = (north - south) / rows, (east - west) / cols
+    return [(south + r * lat_step, west + c * lng_step, south + (r + 1) * lat_step, west + (c + 1) * lng_step)
+            for r in range(rows) for c in range(cols)]
+
+
+def plan_cells(bbox, rings=None, seeds=(), target=DEFAULT_TARGET, min_radius_m=MIN_RADIUS_M,
+               max_radius_m=MAX_RADIUS_M, background=DEFAULT_BACKGROUND):
+    """Quadtree leaves over bbox: split while a cell expects more than target places"""
+    cells = []
+    stack = []
+    for bounds in _initial_grid(bbox, max_radius_m):
+        inside = [s for s in seeds if bounds[0] <= s[0] < bounds[2] and bounds[1] <= s[1] < bounds[3]]
+        stack.append((bounds, inside))
+
+    while stack:
+        bounds, inside = stack.pop()
+        if rings and not _cell_intersects(bounds, rings):
+            continue
+        cell = make_cell(bounds, inside, background)
+        if cell['expected'] > target and cell['radius_m'] / 2 >= min_radius_m:
+            for quadrant in split_bounds(bounds):
+                stack.append((quadrant, [s for s in inside if quadrant[0] <= s[0] < quadrant[2]
+                                         and quadrant[1] <= s[1] < quadrant[3]]))
+            continue
+        cells.append(cell)
+
+    # Densest cells first, like the hand-picked lists (most populous first)
+    cells.sort(key=lambda c: (-c['expected'], -c['lat'], c['lng']))
+    return cells
+
+
+def build_plan(state, boundary=None, seed_paths=(), target=DEFAULT_TARGET, min_radius_m=MIN_RADIUS_M,
+               background=DEFAULT_BACKGROUND):
+    rings = load_boundary(boundary) if boundary else None
+    bbox = boundary_bbox(rings) if rings else STATE_BBOX[state]
+    seeds = load_density_seeds(seed_paths, bbox)
+    cells = plan_cells(bbox, rings, seeds, target, min_radius_m, background=background)
+    for i, cell in enumerate(cells, 1):
+        cell['id'] = f"{state}-{i:05d}"
+    return {
+        'state': state,
+        'created_at': datetime.now().isoformat(),
+        'boundary': boundary or 'bbox',
+        'seed_points': len(seeds),
+        'target_per_cell': target,
+        'cells': cells,
+    }
+
+
+def load_plan(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def add_plan_argument(parser):
+    parser.add_argument('--plan', help='Coverage plan JSON from coverage_planner.py; '
+                                       'searches its cells instead of the built-in city list')
+
+
+def add_split_arguments(parser):
+    parser.add_argument('--max-split-depth', type=int, default=MAX_SPLIT_DEPTH,
+                        help=f'Split saturated searches into quadrants up to this depth (default: {MAX_SPLIT_DEPTH}, 0 disables)')
+    parser.add_argument('--min-split-yield', type=float, default=MIN_SPLIT_YIELD,
+                        help=f'Stop splitting below this many new places per extra query (default: {MIN_SPLIT_YIELD})')
+
+
+def split_policy_from_args(args):
+    return SplitPolicy(args.max_split_depth, args.min_split_yield)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Plan non-overlapping search cells covering a state')
+    parser.add_argument('--state', choices=list(STATE_BBOX), required=True)
+    parser.add_argument('--boundary', help='State boundary GeoJSON (default: state bounding box)')
+    parser.add_argument('--seed-csv', nargs='*', default=[],
+                        help='Previously collected CSVs (latitude/longitude/city) used to estimate density')
+    parser.add_argument('--target', type=int, default=DEFAULT_TARGET,
+                        help=f'Split cells expecting more places than this (default: {DEFAULT_TARGET})')
+    parser.add_argument('--min-radius-km', type=float, default=MIN_RADIUS_M / 1000,
+                        help=f'Smallest search radius (default: {MIN_RADIUS_M / 1000})')
+    parser.add_argument('--background', type=float, default=DEFAULT_BACKGROUND,
+                        help=f'Expected places per km² without seed data (default: {DEFAULT_BACKGROUND})')
+    parser.add_argument('--output', help='Plan file (default: ../data/<state>_coverage_plan.json)')
+    args = parser.parse_args()
+
+    plan = build_plan(args.state, args.boundary, args.seed_csv, args.target,
+                      int(args.min_radius_km * 1000), args.background)
+    output = args.output or f"../data/{args.state.lower()}_coverage_plan.json"
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(plan, f, indent=1)
+
+    cells = plan['cells']
+    radii = sorted(c['radius_m'] for c in cells)
+    print(f"\n{'='*60}")
+    print(f"🗺️  COVERAGE PLAN - {args.state}")
+    print(f"{'='*60}")
+    print(f"📍 Boundary: {plan['boundary']}")
+    print(f"🌱 Density seeds: {plan['seed_points']}")
+    print(f"🔲 Cells: {len(cells)}")
+    if radii:
+        print(f"📏 Radius: {radii[0] / 1000:.1f} - {radii[-1] / 1000:.1f} km (median {radii[len(radii) // 2] / 1000:.1f} km)")
+    print(f"✅ Saved to {output}")
+    print(f"{'='*60}\n")
+    return 0
+
+
+if __name__ == '__main__':
+    exit(main())
@@ -5,13 +5,12 @@ Collects assistance resources from multiple sources and populates the database
 """
 
 import os
+import sys
 import json
-import time
+import argparse
 import requests
 from typing import List, Dict, Optional
 from dataclasses import dataclass, asdict
-import psycopg2
-from psycopg2.extras import execute_values
 from dotenv import load_dotenv
 
 # Try to import optional dependencies
@@ -29,8 +28,25 @@ except ImportError:
     BS4_AVAILABLE = False
     print("⚠️  beautifulsoup4 not installed. Run: pip install beautifulsoup4")
 
+# Shared collector helpers live in scripts/
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from address_utils import parse_address
+from boundary_join import add_boundary_arguments, boundaries_from_args
+from checkpoint import CheckpointJournal, add_resume_argument, journal_path_for
+from gazetteer import add_gazetteer_arguments, gazetteer_from_args
+from hit_filter import HitFilter, add_prefilter_argument, hit_filter_from_args
+from humanaid_db import connect
+from place_details import DEFAULT_DETAILS_MODE, DetailsStage, add_details_argument, missing_fields
+from place_registry import PlaceRegistry, add_registry_arguments, registry_from_args
+from resource_sink import ResourceSink
+from places_fetcher import MAX_PAGES, PlacesFetcher, add_pagination_argument, client_options, wrap_client
+
 load_dotenv()
 
+# Text search hits already carry name, address and location - only these need a place() call
+DETAIL_FIELDS = ['formatted_phone_number', 'website']
+
 @dataclass
 class Resource:
     """Data class for a single resource"""
@@ -47,31 +63,49 @@ class Resource:
     description: Optional[str] = None
     hours: Optional[Dict] = None
     email: Optional[str] = None
+    place_id: Optional[str] = None
+    details_pending: Optional[List[str]] = None
+    county: Optional[str] = None
 
 class ResourceCollector:
     """Main class for collecting resources from various sources"""
     
-    def __init__(self):
+    def __init__(self, journal=None, details=DEFAULT_DETAILS_MODE, hit_filter=None, registry=None,
+                 max_pages=MAX_PAGES, gazetteer=None, boundaries=None):
         self.db_conn = None
+        self.sink = None
         self.google_maps = None
+        self.fetcher = None
+        self.details = None
+        self.max_pages = max_pages
+        self.boundaries = boundaries
+        self.hit_filter = hit_filter or HitFilter()
+        self.registry = registry or PlaceRegistry()
         self.resources = []
         
         # Initialize Google Maps if available
         if GOOGLE_MAPS_AVAILABLE and os.getenv('GOOGLE_MAPS_API_KEY'):
-            self.google_maps = GoogleMapsClient(key=os.getenv('GOOGLE_MAPS_API_KEY'))
+            self.google_maps = wrap_client(GoogleMapsClient(key=os.getenv('GOOGLE_MAPS_API_KEY'), **client_options()),
+                                           gazetteer=gazetteer)
+            self.fetcher = PlacesFetcher(self.google_maps)
+            self.details = DetailsStage(self.google_maps, self._fill_details, details, fetcher=self.fetcher)
             print("✅ Google Maps API initialized")
         else:
             print("⚠️  Google Maps API not available")
+        
+        # Replay resources from a resumed checkpoint journal
+        self.journal = journal
+        if journal:
+            self.resources.extend(Resource(**r) for r in journal.resources)
+            self.registry.mark_seen(r.get('place_id') for r in journal.resources)
+            if self.details:
+                self.details.resume(self.resources)
     
     def connect_db(self):
         """Connect to PostgreSQL database"""
         try:
-            self.db_conn = psycopg2.connect(
-                host=os.getenv('DB_HOST', 'localhost'),
-                database=os.getenv('DB_NAME', 'humanaid'),
-                user=os.getenv('DB_USER', 'postgres'),
-                password=os.getenv('DB_PASSWORD')
-            )
+            self.db_conn = connect()
+            self.sink = ResourceSink(self.db_conn)
             print("✅ Connected to database")
         except Exception as e:
             print(f"❌ Database connection failed: {e}")
@@ -92,6 +126,17 @@ class ResourceCollector:
         
         return None
     
+    def _submit_searches(self, searches, place_type):
+        """Start every (unit, query) text search not yet in the journal at once, so their
+        page-token waits overlap; returns {query: future}"""
+        if not self.fetcher:
+            return {}
+        return {
+            query: self.fetcher.submit_search('places', self.max_pages, query=query, type=place_type)
+            for unit, query in searches
+            if not (self.journal and self.journal.is_done(unit, query, 'text'))
+        }
+    
     def collect_food_pantries_il(self):
         """Collect food pantries in Illinois"""
         print("\n🍽️  Collecting Illinois food pantries...")
@@ -102,38 +147,43 @@ class ResourceCollector:
             'Springfield', 'Peoria', 'Elgin', 'Waukegan', 'Champaign',
             'Bloomington', 'Decatur', 'Evanston', 'Des Plaines', 'Berwyn'
         ]
+        searches = self._submit_searches([(city, f"food pantry {city} IL") for city in il_cities], 'establishment')
         
         for city in il_cities:
             print(f"  Searching {city}...")
             
+            query = f"food pantry {city} IL"
+            if self.journal and self.journal.is_done(city, query, 'text'):
+                continue
+            
             if self.google_maps:
                 try:
                     # Search for food pantries
-                    results = self.google_maps.places(
-                        query=f"food pantry {city} IL",
-                        type='establishment'
-                    )
+                    results = searches[query].result()
                     
+                    city_resources = []
                     for place in results.get('results', []):
-                        details = self.google_maps.place(place['place_id'])['result']
+                        # Skip places already collected by this or an earlier run
+                        if not self.registry.claim(place['place_id']):
+                            continue
+                        if not self.hit_filter.allow(place):
+                            continue
                         
-                        resource = Resource(
-                            name=details.get('name'),
-                            address=details.get('formatted_address', '').split(',')[0],
-                            city=city,
-                            state='IL',
-                            zip_code=self._extract_zip(details.get('formatted_address', '')),
-                            latitude=details['geometry']['location']['lat'],
-                            longitude=details['geometry']['location']['lng'],
-                            phone=details.get('formatted_phone_number'),
-                            website=details.get('website'),
-                            category_slugs=['food-pantries'],
-                            description=f"Food pantry in {city}, IL"
+                        resource = self._resource_from_place(
+                            place, city, 'IL', ['food-pantries'],
+                            f"Food pantry in {city}, IL"
                         )
                         
                         self.resources.append(resource)
+                        city_resources.append(resource)
+                    self.details.unit_done()
+                    if self.boundaries:
+                        self.boundaries.assign(city_resources)
                     
-                    time.sleep(0.5)  # Rate limiting
+                    if self.sink:
+                        self.sink.write([asdict(r) for r in city_resources])
+                    if self.journal:
+                        self.journal.record((city, query, 'text'), [asdict(r) for r in city_resources])
                     
                 except Exception as e:
                     print(f"    Error searching {city}: {e}")
@@ -146,37 +196,42 @@ class ResourceCollector:
             'Chicago', 'Aurora', 'Rockford', 'Springfield', 'Peoria',
             'Champaign', 'Bloomington', 'Decatur'
         ]
+        searches = self._submit_searches([(city, f"homeless shelter {city} IL") for city in il_cities], 'establishment')
         
         for city in il_cities:
             print(f"  Searching {city}...")
             
+            query = f"homeless shelter {city} IL"
+            if self.journal and self.journal.is_done(city, query, 'text'):
+                continue
+            
             if self.google_maps:
                 try:
-                    results = self.google_maps.places(
-                        query=f"homeless shelter {city} IL",
-                        type='establishment'
-                    )
+                    results = searches[query].result()
                     
+                    city_resources = []
                     for place in results.get('results', []):
-                        details = self.google_maps.place(place['place_id'])['result']
+                        # Skip places already collected by this or an earlier run
+                        if not self.registry.claim(place['place_id']):
+                            continue
+                        if not self.hit_filter.allow(place):
+                            continue
                         
-                        resource = Resource(
-                            name=details.get('name'),
-                            address=details.get('formatted_address', '').split(',')[0],
-                            city=city,
-                            state='IL',
-                            zip_code=self._extract_zip(details.get('formatted_address', '')),
-                            latitude=details['geometry']['location']['lat'],
-                            longitude=details['geometry']['location']['lng'],
-                            phone=details.get('formatted_phone_number'),
-                            website=details.get('website'),
-                            category_slugs=['emergency-shelters'],
-                            description=f"Emergency shelter in {city}, IL"
+                        resource = self._resource_from_place(
+                            place, city, 'IL', ['emergency-shelters'],
+                            f"Emergency shelter in {city}, IL"
                         )
                         
                         self.resources.append(resource)
+                        city_resources.append(resource)
+                    self.details.unit_done()
+                    if self.boundaries:
+                        self.boundaries.assign(city_resources)
                     
-                    time.sleep(0.5)
+                    if self.sink:
+                        self.sink.write([asdict(r) for r in city_resources])
+                    if self.journal:
+                        self.journal.record((city, query, 'text'), [asdict(r) for r in city_resources])
                     
                 except Exception as e:
                     print(f"    Error searching {city}: {e}")
@@ -190,37 +245,42 @@ class ResourceCollector:
             'Independence', 'Lee\'s Summit', 'O\'Fallon', 'St. Joseph',
             'St. Charles', 'Blue Springs'
         ]
+        searches = self._submit_searches([(city, f"food pantry {city} MO") for city in mo_cities], 'establishment')
         
         for city in mo_cities:
             print(f"  Searching {city}...")
             
+            query = f"food pantry {city} MO"
+            if self.journal and self.journal.is_done(city, query, 'text'):
+                continue
+            
             if self.google_maps:
                 try:
-                    results = self.google_maps.places(
-                        query=f"food pantry {city} MO",
-                        type='establishment'
-                    )
+                    results = searches[query].result()
                     
+                    city_resources = []
                     for place in results.get('results', []):
-                        details = self.google_maps.place(place['place_id'])['result']
+                        # Skip places already collected by this or an earlier run
+                        if not self.registry.claim(place['place_id']):
+                            continue
+                        if not self.hit_filter.allow(place):
+                            continue
                         
-                        resource = Resource(
-                            name=details.get('name'),
-                            address=details.get('formatted_address', '').split(',')[0],
-                            city=city,
-                            state='MO',
-                            zip_code=self._extract_zip(details.get('formatted_address', '')),
-                            latitude=details['geometry']['location']['lat'],
-                            longitude=details['geometry']['location']['lng'],
-                            phone=details.get('formatted_phone_number'),
-                            website=details.get('website'),
-                            category_slugs=['food-pantries'],
-                            description=f"Food pantry in {city}, MO"
+                        resource = self._resource_from_place(
+                            place, city, 'MO', ['food-pantries'],
+                            f"Food pantry in {city}, MO"
                         )
                         
                         self.resources.append(resource)
+                        city_resources.append(resource)
+                    self.details.unit_done()
+                    if self.boundaries:
+                        self.boundaries.assign(city_resources)
                     
-                    time.sleep(0.5)
+                    if self.sink:
+                        self.sink.write([asdict(r) for r in city_resources])
+                    if self.journal:
+                        self.journal.record((city, query, 'text'), [asdict(r) for r in city_resources])
                     
                 except Exception as e:
                     print(f"    Error searching {city}: {e}")
@@ -233,116 +293,104 @@ class ResourceCollector:
             ('Chicago', 'IL'), ('St. Louis', 'MO'), ('Springfield', 'IL'),
             ('Kansas City', 'MO'), ('Rockford', 'IL'), ('Peoria', 'IL')
         ]
+        searches = self._submit_searches([(city, f"free clinic {city} {state}") for city, state in all_cities], 'health')
         
         for city, state in all_cities:
             print(f"  Searching {city}, {state}...")
             
+            query = f"free clinic {city} {state}"
+            if self.journal and self.journal.is_done(city, query, 'text'):
+                continue
+            
             if self.google_maps:
                 try:
-                    results = self.google_maps.places(
-                        query=f"free clinic {city} {state}",
-                        type='health'
-                    )
+                    results = searches[query].result()
                     
+                    city_resources = []
                     for place in results.get('results', []):
-                        details = self.google_maps.place(place['place_id'])['result']
+                        # Skip places already collected by this or an earlier run
+                        if not self.registry.claim(place['place_id']):
+                            continue
+                        if not self.hit_filter.allow(place):
+                            continue
                         
-                        resource = Resource(
-                            name=details.get('name'),
-                            address=details.get('formatted_address', '').split(',')[0],
-                            city=city,
-                            state=state,
-                            zip_code=self._extract_zip(details.get('formatted_address', '')),
-                            latitude=details['geometry']['location']['lat'],
-                            longitude=details['geometry']['location']['lng'],
-                            phone=details.get('formatted_phone_number'),
-                            website=details.get('website'),
-                            category_slugs=['free-clinics'],
-                            description=f"Free or low-cost health clinic in {city}, {state}"
+                        resource = self._resource_from_place(
+                            place, city, state, ['free-clinics'],
+                            f"Free or low-cost health clinic in {city}, {state}"
                         )
                         
                         self.resources.append(resource)
+                        city_resources.append(resource)
+                    self.details.unit_done()
+                    if self.boundaries:
+                        self.boundaries.assign(city_resources)
                     
-                    time.sleep(0.5)
+                    if self.sink:
+                        self.sink.write([asdict(r) for r in city_resources])
+                    if self.journal:
+                        self.journal.record((city, query, 'text'), [asdict(r) for r in city_resources])
                     
                 except Exception as e:
                     print(f"    Error searching {city}: {e}")
     
-    def _extract_zip(self, address: str) -> Optional[str]:
-        """Extract ZIP code from address string"""
-        import re
-        match = re.search(r'\b\d{5}(?:-\d{4})?\b', address)
-        return match.group(0) if match else None
+    def _resource_from_place(self, place: Dict, city: str, state: str, category_slugs: List[str],
+                             description: str) -> Resource:
+        """Build a Resource from a text search hit, queueing details for phone/website"""
+        street, zip_code = parse_address(place.get('formatted_address', ''))
+        resource = Resource(
+            name=place.get('name'),
+            address=street,
+            city=city,
+            state=state,
+            zip_code=zip_code or None,
+            latitude=place['geometry']['location']['lat'],
+            longitude=place['geometry']['location']['lng'],
+            phone=place.get('formatted_phone_number'),
+            website=place.get('website'),
+            category_slugs=category_slugs,
+            description=description,
+            place_id=place['place_id']
+        )
+        self.details.add(resource, place['place_id'], missing_fields(place, DETAIL_FIELDS))
+        return resource
+    
+    def _fill_details(self, resource: Resource, details: Dict):
+        """Merge deferred place() details into a Resource"""
+        resource.phone = details.get('formatted_phone_number', resource.phone)
+        resource.website = details.get('website', resource.website)
+        if details.get('formatted_address'):
+            # A ZIP from the boundary join (or the search hit) stays
+            resource.address, zip_code = parse_address(details['formatted_address'])
+            resource.zip_code = resource.zip_code or zip_code or None
+        if self.sink:
+            self.sink.write([asdict(resource)])
+    
+    def resolve_details(self):
+        """Deferred stage: fetch the details still owed to collected resources in one batch"""
+        if self.details and len(self.details):
+            print(f"\n📇 Fetching place details for {len(self.details)} resources...")
+            self.details.flush()
     
     def save_to_database(self):
-        """Save collected resources to database"""
-        if not self.db_conn or not self.resources:
+        """Upsert collected resources into the database by google_place_id"""
+        if not self.sink or not self.resources:
             print("❌ No database connection or no resources to save")
             return
         
         print(f"\n💾 Saving {len(self.resources)} resources to database...")
         
-        cursor = self.db_conn.cursor()
-        saved_count = 0
-        
-        for resource in self.resources:
-            try:
-                # Insert resource
-                cursor.execute("""
-                    INSERT INTO resources (
-                        name, slug, address, city, state, zip_code,
-                        location, phone, website, description,
-                        approval_status, is_active
-                    ) VALUES (
-                        %s, %s, %s, %s, %s, %s,
-                        ST_SetSRID(ST_MakePoint(%s, %s), 4326)::geography,
-                        %s, %s, %s, 'approved', true
-                    ) RETURNING id
-                """, (
-                    resource.name,
-                    self._slugify(resource.name),
-                    resource.address,
-                    resource.city,
-                    resource.state,
-                    resource.zip_code,
-                    resource.longitude,
-                    resource.latitude,
-                    resource.phone,
-                    resource.website,
-                    resource.description
-                ))
-                
-                resource_id = cursor.fetchone()[0]
-                
-                # Link to categories
-                for category_slug in resource.category_slugs:
-                    cursor.execute("""
-                        INSERT INTO resource_categories (resource_id, category_id)
-                        SELECT %s, id FROM categories WHERE slug = %s
-                        ON CONFLICT DO NOTHING
-                    """, (resource_id, category_slug))
-                
-                saved_count += 1
-                
-            except Exception as e:
-                print(f"  ⚠️  Error saving {resource.name}: {e}")
-                continue
-        
-        self.db_conn.commit()
-        print(f"✅ Saved {saved_count} resources successfully!")
-    
-    def _slugify(self, text: str) -> str:
-        """Convert text to URL-friendly slug"""
-        import re
-        text = text.lower()
-        text = re.sub(r'[^a-z0-9]+', '-', text)
-        return text.strip('-')
+        # Searches already streamed their resources; this picks up journal
+        # replays, and rows that did not change are left untouched
+        self.sink.write([asdict(r) for r in self.resources])
+        self.sink.flush()
+        print(f"✅ {self.sink.summary()}")
     
     def export_to_json(self, filename: str = 'resources_export.json'):
         """Export collected resources to JSON file"""
         data = [asdict(r) for r in self.resources]
         with open(filename, 'w') as f:
             json.dump(data, f, indent=2)
+        self.registry.commit((r.place_id for r in self.resources), 'collect_il_mo_resources')
         print(f"✅ Exported {len(data)} resources to {filename}")
     
     def run_full_collection(self):
@@ -356,8 +404,17 @@ class ResourceCollector:
         self.collect_shelters_il()
         self.collect_food_pantries_mo()
         self.collect_health_clinics()
+        self.resolve_details()
         
         print(f"\n📊 Total resources collected: {len(self.resources)}")
+        if self.details:
+            print(f"📇 {self.details.summary()}")
+        print(f"🚫 {self.hit_filter.summary()}")
+        print(f"🗂️  {self.registry.summary()}")
+        if self.boundaries:
+            print(f"🗺️  {self.boundaries.summary()}")
+        if hasattr(self.google_maps, 'summary'):
+            print(f"💾 {self.google_maps.summary()}")
         
         # Export to JSON
         self.export_to_json()
@@ -370,7 +427,20 @@ class ResourceCollector:
 
 def main():
     """Main entry point"""
-    collector = ResourceCollector()
+    parser = argparse.ArgumentParser(description='Collect IL & MO resources from Google Places')
+    add_pagination_argument(parser)
+    add_details_argument(parser)
+    add_prefilter_argument(parser)
+    add_registry_arguments(parser)
+    add_gazetteer_arguments(parser)
+    add_boundary_arguments(parser)
+    add_resume_argument(parser)
+    args = parser.parse_args()
+    
+    journal = CheckpointJournal(journal_path_for('resources_export.json'), resume=args.resume)
+    collector = ResourceCollector(journal=journal, details=args.details, hit_filter=hit_filter_from_args(args),
+                                  registry=registry_from_args(args), max_pages=args.max_pages,
+                                  gazetteer=gazetteer_from_args(args), boundaries=boundaries_from_args(args))
     
     # Try to connect to database
     try:
@@ -380,6 +450,11 @@ def main():
     
     # Run collection
     collector.run_full_collection()
+    if collector.details:
+        collector.details.close()
+        collector.fetcher.close()
+    collector.registry.close()
+    journal.close()
     
     print("\n✅ Resource collection complete!")
 
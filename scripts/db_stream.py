@@ -0,0 +1,40 @@
+"""
+Streaming Database Reader
+Runs a query on a named (server-side) cursor and yields namedtuple rows in
+batches, so full-table passes run in constant client memory and start
+producing results as soon as the first batch arrives
+"""
+
+import os
+import uuid
+
+from psycopg2.extras import NamedTupleCursor
+
+DEFAULT_ITERSIZE = int(os.getenv('DB_STREAM_ITERSIZE', '2000'))
+
+
+def stream_batches(conn, query, params=None, itersize=DEFAULT_ITERSIZE):
+    """Yield lists of up to itersize namedtuple rows (fields named after the columns)"""
+    # Named cursors live inside the connection's current transaction
+    cur = conn.cursor(name=f"stream_{uuid.uuid4().hex[:12]}", cursor_factory=NamedTupleCursor)
+    cur.itersize = itersize
+    try:
+        cur.execute(query, params)
+        while True:
+            rows = cur.fetchmany(itersize)
+            if not rows:
+                break
+            yield rows
+    finally:
+        cur.close()
+
+
+def stream_rows(conn, query, params=None, itersize=DEFAULT_ITERSIZE):
+    """Yield namedtuple rows one at a time, fetched itersize at a time"""
+    for batch in stream_batches(conn, query, params, itersize):
+        yield from batch
+
+
+def add_itersize_argument(parser):
+    parser.add_argument('--itersize', type=int, default=DEFAULT_ITERSIZE,
+                        help=f'Rows fetched per round trip when streaming resources (default: {DEFAULT_ITERSIZE})')
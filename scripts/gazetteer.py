@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+"""
+Offline Gazetteer Geocoder
+Census Gazetteer place and ZCTA centroids loaded into a compact sorted-array
+index, so "City, ST" and ZIP geocodes are answered locally in microseconds
+and only street addresses (and names the gazetteer lacks) reach the API
+
+Build the index once from the Census Gazetteer files
+(https://www.census.gov/geographies/reference-files/time-series/geo/gazetteer-files.html,
+"Places" and "ZIP Code Tabulation Areas", zipped or unzipped):
+
+Usage:
+    python gazetteer.py --places 2023_Gaz_place_national.zip --zctas 2023_Gaz_zcta_national.zip --states IL MO
+    python gazetteer.py --lookup "Mt. Vernon, IL"
+"""
+
+import os
+import re
+import io
+import csv
+import sys
+import time
+import bisect
+import zipfile
+import argparse
+import threading
+from array import array
+
+DEFAULT_GAZETTEER_PATH = os.getenv(
+    'GAZETTEER_PATH',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data', 'gazetteer.tsv')
+)
+
+# Legal/statistical area descriptions Census appends to place names ("Chicago city")
+LSAD_SUFFIX = re.compile(
+    r'\s+(city and borough|consolidated government|metro(politan)? government|unified government|'
+    r'urban county|municipality|borough|village|town|city|CDP)$'
+)
+
+# Abbreviations spelled out before matching, so "St. Louis" finds "St. Louis city"
+# and "Mt. Vernon" finds "Mount Vernon city"
+ABBREVIATIONS = {'st': 'saint', 'ste': 'sainte', 'mt': 'mount', 'ft': 'fort'}
+
+STATE_CODE = re.compile(r'^[A-Z]{2}$')
+ZIP_CODE = re.compile(r'^(\d{5})(-\d{4})?$')
+
+
+def display_name(census_name):
+    """Census place NAME without its "(balance)" marker and LSAD suffix"""
+    name = census_name.replace('(balance)', '').strip()
+    return LSAD_SUFFIX.sub('', name)
+
+
+def normalize_name(name):
+    """Lowercase, punctuation-free name with abbreviations expanded"""
+    words = re.sub(r"[.'’]", '', name.lower()).replace('-', ' ').split()
+    return ' '.join(ABBREVIATIONS.get(word, word) for word in words)
+
+
+def parse_query(address):
+    """('zip', code) or ('place', name, state) for a bare ZIP or "City, ST[ ZIP][, USA]";
+    None for anything else (street addresses always go to the API)"""
+    parts = [part.strip() for part in address.split(',')]
+    if parts and parts[-1].upper() in ('USA', 'US', 'UNITED STATES'):
+        parts = parts[:-1]
+
+    if len(parts) == 1:
+        match = ZIP_CODE.match(parts[0])
+        return ('zip', match.group(1)) if match else None
+    if len(parts) != 2 or not parts[0] or any(ch.isdigit() for ch in parts[0]):
+        return None
+
+    state, _, zip_code = parts[1].partition(' ')
+    if not STATE_CODE.match(state.upper()):
+        return None
+    match = ZIP_CODE.match(zip_code.strip())
+    if match:
+        return ('zip', match.group(1))
+    if zip_code.strip():
+        return None
+    return ('place', parts[0], state.upper())
+
+
+class Gazetteer:
+    """Sorted lookup keys with parallel lat/lng arrays; a lookup is one bisect"""
+
+    def __init__(self, path=DEFAULT_GAZETTEER_PATH):
+        self.path = path
+        rows = {}
+        with open(path, 'r', encoding='utf-8') as f:
+            for kind, state, name, lat, lng in csv.reader(f, delimiter='\t'):
+                key = f"zip|{name}" if kind == 'zcta' else f"{state}|{normalize_name(name)}"
+                rows.setdefault(key, (state, name, float(lat), float(lng)))
+
+        self.keys = sorted(rows)
+        self.names = [rows[key][1] for key in self.keys]
+        self.states = [rows[key][0] for key in self.keys]
+        self.lats = array('d', (rows[key][2] for key in self.keys))
+        self.lngs = array('d', (rows[key][3] for key in self.keys))
+
+    def __len__(self):
+        return len(self.keys)
+
+    def _find(self, key):
+        i = bisect.bisect_left(self.keys, key)
+        return i if i < len(self.keys) and self.keys[i] == key else None
+
+    def place(self, name, state):
+        """(lat, lng) of a city/town/CDP, or None"""
+        i = self._find(f"{state.upper()}|{normalize_name(name)}")
+        return None if i is None else (self.lats[i], self.lngs[i])
+
+    def zip_code(self, code):
+        """(lat, lng) of a ZIP Code Tabulation Area, or None"""
+        i = self._find(f"zip|{code}")
+        return None if i is None else (self.lats[i], self.lngs[i])
+
+    def geocode(self, address):
+        """googlemaps-style geocode() result for a city or ZIP query, or None if not answerable"""
+        query = parse_query(address)
+        if query is None:
+            return None
+        if query[0] == 'zip':
+            i = self._find(f"zip|{query[1]}")
+            formatted, types = f"{query[1]}, USA", ['postal_code']
+        else:
+            i = self._find(f"{query[2]}|{normalize_name(query[1])}")
+            formatted, types = None, ['locality', 'political']
+        if i is None:
+            return None
+
+        return [{
+            'formatted_address': formatted or f"{self.names[i]}, {self.states[i]}, USA",
+            'geometry': {'location': {'lat': self.lats[i], 'lng': self.lngs[i]}, 'location_type': 'APPROXIMATE'},
+            'types': types,
+        }]
+
+
+class GazetteerClient:
+    """Wraps a googlemaps-style client; geocode() answers city and ZIP queries from
+    the gazetteer and passes everything else (and misses) to the wrapped client"""
+
+    def __init__(self, client, gazetteer):
+        self.client = client
+        self.gazetteer = gazetteer
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def geocode(self, *args, **kwargs):
+        address = args[0] if args else kwargs.get('address')
+        extra = set(kwargs) - {'address'}
+        result = self.gazetteer.geocode(address) if isinstance(address, str) and not extra else None
+        with self.lock:
+            if result:
+                self.hits += 1
+            else:
+                self.misses += 1
+        return result or self.client.geocode(*args, **kwargs)
+
+    def places(self, *args, **kwargs):
+        return self.client.places(*args, **kwargs)
+
+    def places_nearby(self, *args, **kwargs):
+        return self.client.places_nearby(*args, **kwargs)
+
+    def place(self, *args, **kwargs):
+        return self.client.place(*args, **kwargs)
+
+    def contains(self, endpoint, *args, **kwargs):
+        contains = getattr(self.client, 'contains', None)
+        return bool(contains and contains(endpoint, *args, **kwargs))
+
+    def summary(self):
+        summary = f"{self.hits} gazetteer geocodes, {self.misses} sent to the API"
+        if hasattr(self.client, 'summary'):
+            summary += f"; {self.client.summary()}"
+        return summary
+
+
+def load_gazetteer(path=DEFAULT_GAZETTEER_PATH):
+    """The gazetteer at path, or None (with a hint) if it has not been built"""
+    if not os.path.exists(path):
+        print(f"📍 No gazetteer at {path} - geocoding cities through the API "
+              f"(build one with: python gazetteer.py --places ... --zctas ...)")
+        return None
+    return Gazetteer(path)
+
+
+def add_gazetteer_arguments(parser):
+    parser.add_argument('--gazetteer', default=DEFAULT_GAZETTEER_PATH,
+                        help='Offline city/ZIP centroid index (default: data/gazetteer.tsv or GAZETTEER_PATH)')
+    parser.add_argument('--no-gazetteer', action='store_true',
+                        help='Geocode every city through the API')
+
+
+def gazetteer_from_args(args):
+    return None if args.no_gazetteer else load_gazetteer(args.gazetteer)
+
+
+def _read_census(path):
+    """Rows of a tab-separated Census Gazetteer file (or the single file inside its .zip)"""
+    if path.endswith('.zip'):
+        with zipfile.ZipFile(path) as archive:
+            data = archive.read(archive.namelist()[0])
+    else:
+        with open(path, 'rb') as f:
+            data = f.read()
+    try:
+        text = data.decode('utf-8')
+    except UnicodeDecodeError:
+        # Older vintages are Latin-1
+        text = data.decode('latin-1')
+
+    reader = csv.reader(io.StringIO(text), delimiter='\t')
+    header = [column.strip() for column in next(reader)]
+    for row in reader:
+        yield dict(zip(header, (value.strip() for value in row)))
+
+
+def write_gazetteer(rows, path):
+    """Write (kind, state, name, lat, lng) rows - kind is 'place' or 'zcta'"""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f, delimiter='\t', lineterminator='\n')
+        for kind, state, name, lat, lng in rows:
+            writer.writerow([kind, state, name, f"{float(lat):.6f}", f"{float(lng):.6f}"])
+
+
+def build_gazetteer(place_files, zcta_files, output, states=None):
+    """Compact index from Census Gazetteer files; returns (places, zctas) written"""
+    states = {state.upper() for state in states} if states else None
+
+    # Where a name occurs twice in a state (a city and a CDP), keep the
+    # incorporated place, then the larger one
+    places = {}
+    for path in place_files:
+        for row in _read_census(path):
+            if states and row['USPS'] not in states:
+                continue
+            name = display_name(row['NAME'])
+            rank = (row.get('FUNCSTAT') == 'A', float(row.get('ALAND') or 0))
+            key = (row['USPS'], normalize_name(name))
+            if key not in places or rank > places[key][0]:
+                places[key] = (rank, ('place', row['USPS'], name, row['INTPTLAT'], row['INTPTLONG']))
+
+    zctas = [('zcta', '', row['GEOID'], row['INTPTLAT'], row['INTPTLONG'])
+             for path in zcta_files for row in _read_census(path)]
+
+    write_gazetteer([row for _, row in sorted(places.values(), key=lambda item: item[1])] + zctas, output)
+    return len(places), len(zctas)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build or query the offline city/ZIP gazetteer')
+    parser.add_argument('--places', nargs='+', default=[], help='Census Gazetteer place file(s), .txt or .zip')
+    parser.add_argument('--zctas', nargs='+', default=[], help='Census Gazetteer ZCTA file(s), .txt or .zip')
+    parser.add_argument('--states', nargs='+', help='Only keep places in these states (default: all)')
+    parser.add_argument('--output', default=DEFAULT_GAZETTEER_PATH, help='Index file to write or query')
+    parser.add_argument('--lookup', nargs='+', metavar='ADDRESS', help='Geocode addresses from the index')
+    args = parser.parse_args()
+
+    if args.places or args.zctas:
+        place_count, zcta_count = build_gazetteer(args.places, args.zctas, args.output, args.states)
+        print(f"✅ Wrote {place_count} places and {zcta_count} ZCTAs to {args.output}")
+
+    if args.lookup:
+        gazetteer = load_gazetteer(args.output)
+        if not gazetteer:
+            return 1
+        for address in args.lookup:
+            started = time.perf_counter()
+            result = gazetteer.geocode(address)
+            elapsed_us = (time.perf_counter() - started) * 1e6
+            if result:
+                location = result[0]['geometry']['location']
+                print(f"📍 {address}: {location['lat']:.6f}, {location['lng']:.6f} "
+                      f"({result[0]['formatted_address']}, {elapsed_us:.0f} µs)")
+            else:
+                print(f"❌ {address}: not in the gazetteer")
+    elif not (args.places or args.zctas):
+        parser.print_help()
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
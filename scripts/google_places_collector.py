@@ -7,11 +7,23 @@ Collects humanitarian resources using Google Places API
 import os
 import json
 import csv
-import time
 import argparse
 from datetime import datetime
 import googlemaps
 
+from checkpoint import CheckpointJournal, add_resume_argument, journal_path_for
+from gazetteer import add_gazetteer_arguments, gazetteer_from_args
+from boundary_join import add_boundary_arguments, boundaries_from_args
+from address_utils import parse_address
+from coverage_planner import SplitPolicy, add_split_arguments, bounds_around, split_policy_from_args
+from hit_filter import HitFilter, add_prefilter_argument, hit_filter_from_args
+from place_details import DEFAULT_DETAILS_MODE, DetailsStage, add_details_argument, missing_fields
+from place_registry import PlaceRegistry, add_registry_arguments, registry_from_args
+from places_cache import DEFAULT_CACHE_PATH, add_cache_arguments, cache_path_from_args
+from resource_sink import add_sink_arguments, sink_from_args
+from query_yield import QueryScheduler, add_scheduler_arguments, scheduler_from_args, size_class
+from places_fetcher import MAX_PAGES, PlacesFetcher, add_pagination_argument, client_options, wrap_client
+
 # Category search queries
 SEARCH_QUERIES = {
     'food-pantries': ['food bank', 'food pantry', 'food distribution'],
@@ -24,17 +36,49 @@ SEARCH_QUERIES = {
     'clothing': ['clothing closet', 'free clothing', 'thrift store nonprofit'],
 }
 
+# Fields each resource needs; nearby hits lack the full address, phone and website
+DETAIL_FIELDS = ['name', 'formatted_address', 'formatted_phone_number', 'website', 'geometry', 'business_status']
+
 class PlacesCollector:
-    def __init__(self, api_key):
-        self.gmaps = googlemaps.Client(key=api_key)
+    def __init__(self, api_key, cache_path=DEFAULT_CACHE_PATH, journal=None, split_policy=None, scheduler=None,
+                 details=DEFAULT_DETAILS_MODE, hit_filter=None, registry=None, sink=None, max_pages=MAX_PAGES,
+                 gazetteer=None, boundaries=None):
+        self.gmaps = wrap_client(googlemaps.Client(key=api_key, **client_options()), cache_path=cache_path,
+                                 gazetteer=gazetteer)
+        self.fetcher = PlacesFetcher(self.gmaps)
+        self.max_pages = max_pages
+        self.split_policy = split_policy or SplitPolicy()
+        self.scheduler = scheduler or QueryScheduler()
+        self.hit_filter = hit_filter or HitFilter()
+        self.registry = registry or PlaceRegistry()
+        self.sink = sink
+        self.boundaries = boundaries
+        self.details = DetailsStage(self.gmaps, self._fill_details, details, fetcher=self.fetcher)
         self.results = []
         self.query_count = 0
         self.cost_estimate = 0
         
+        # Replay resources from a resumed checkpoint journal
+        self.journal = journal
+        if journal:
+            self.results.extend(journal.resources)
+            self.registry.mark_seen(r['place_id'] for r in journal.resources)
+            self.details.resume(self.results)
+        
     def search_location(self, city, state, radius_miles=10):
         """Search for resources in a specific city"""
         print(f"\n🔍 Searching {city}, {state}...")
         
+        pending = [
+            (category, query)
+            for category, queries in SEARCH_QUERIES.items()
+            for query in queries
+            if not (self.journal and self.journal.is_done(city, query, 'nearby'))
+        ]
+        if not pending:
+            print(f"⏭️  Already collected {city}, {state} (checkpoint)")
+            return
+        
         # Geocode the city to get coordinates
         geocode_result = self.gmaps.geocode(f"{city}, {state}, USA")
         if not geocode_result:
@@ -47,69 +91,106 @@ class PlacesCollector:
         
         print(f"📍 Location: {lat}, {lng} (radius: {radius_miles} miles)")
         
-        # Search for each category
-        for category, queries in SEARCH_QUERIES.items():
-            for query in queries:
-                self._search_query(query, category, lat, lng, radius_meters, city, state)
-                time.sleep(0.5)  # Rate limiting
+        # Best-yielding terms first; terms that only re-find known places are skipped
+        cls = size_class(radius_m=radius_meters)
+        categories = {query: category for category, query in pending}
+        scheduled = self.scheduler.schedule([(query, 'nearby') for _, query in pending], cls)
+        if len(scheduled) < len(pending):
+            print(f"✂️  Skipping {len(pending) - len(scheduled)} low-yield searches ({cls})")
+        
+        # Start every search at once so their page-token waits overlap, then take them in order
+        searches = [(query, self._submit_nearby(query, lat, lng, radius_meters)) for query, _ in scheduled]
+        for query, future in searches:
+            self._search_query(query, categories[query], future, city, state, cls)
     
-    def _search_query(self, query, category, lat, lng, radius, city, state):
-        """Execute a single search query"""
+    def _submit_nearby(self, query, lat, lng, radius):
+        """Schedule a Places Nearby search (following its next_page_tokens, split if saturated)"""
+        return self.fetcher.submit_refined(self.split_policy, 'places_nearby', bounds_around(lat, lng, radius),
+                                           self.registry, self.max_pages, location=(lat, lng), radius=radius,
+                                           keyword=query, type='point_of_interest')
+    
+    def _search_query(self, query, category, future, city, state, cls='city'):
+        """Wait for a single search query and keep its new places"""
+        resources = []
         try:
             print(f"  🔎 {query}...", end=" ")
             
-            places_result = self.gmaps.places_nearby(
-                location=(lat, lng),
-                radius=radius,
-                keyword=query,
-                type='point_of_interest'
-            )
-            
-            self.query_count += 1
-            self.cost_estimate = self.query_count * 0.017  # $17 per 1000 requests
+            # Saturated searches come back split into quadrant searches while those kept finding new places
+            results, queries = future.result()
+            self.query_count += queries
+            self.cost_estimate = (self.query_count + self.details.calls) * 0.017  # $17 per 1000 requests
             
-            results = places_result.get('results', [])
             new_count = 0
             
             for place in results:
                 place_id = place['place_id']
                 
-                # Skip if already collected
-                if any(r['place_id'] == place_id for r in self.results):
+                # Skip if already collected by this or an earlier run
+                if not self.registry.claim(place_id):
                     continue
                 
-                # Get detailed info
-                details = self.gmaps.place(place_id=place_id, fields=[
-                    'name', 'formatted_address', 'formatted_phone_number',
-                    'website', 'geometry', 'business_status'
-                ])['result']
+                # Drop restaurants and chains before they cost a details lookup
+                if not self.hit_filter.allow(place):
+                    continue
                 
+                # Build from the search hit; nearby hits carry only a short 'vicinity' address
                 resource = {
                     'place_id': place_id,
-                    'name': details.get('name'),
-                    'address': details.get('formatted_address', ''),
+                    'name': place.get('name'),
+                    'address': place.get('formatted_address') or place.get('vicinity', ''),
                     'city': city,
                     'state': state,
-                    'latitude': details['geometry']['location']['lat'],
-                    'longitude': details['geometry']['location']['lng'],
-                    'phone': details.get('formatted_phone_number', ''),
-                    'website': details.get('website', ''),
+                    'zip_code': parse_address(place.get('formatted_address', ''))[1],
+                    'latitude': place['geometry']['location']['lat'],
+                    'longitude': place['geometry']['location']['lng'],
+                    'phone': place.get('formatted_phone_number', ''),
+                    'website': place.get('website', ''),
                     'category': category,
                     'search_query': query,
-                    'business_status': details.get('business_status', ''),
+                    'business_status': place.get('business_status', ''),
                     'collected_at': datetime.now().isoformat()
                 }
+                self.details.add(resource, place_id, missing_fields(place, DETAIL_FIELDS))
                 
                 self.results.append(resource)
+                resources.append(resource)
                 new_count += 1
             
             print(f"✅ Found {new_count} new ({len(results)} total)")
+            if self.boundaries:
+                self.boundaries.assign(resources)
+            self.details.unit_done()
+            self.scheduler.record(query, 'nearby', cls, queries, self.hit_filter.relevant(results), new_count)
+            if self.sink:
+                self.sink.write(resources)
+            if self.journal:
+                self.journal.record((city, query, 'nearby'), resources)
             
         except Exception as e:
             print(f"❌ Error: {str(e)}")
+            # Keep what we got, but retry the query on --resume
+            if self.journal and resources:
+                self.journal.record((city, query, 'nearby'), resources, complete=False)
+    
+    def _fill_details(self, resource, details):
+        """Merge deferred place() details into a resource built from its search hit"""
+        resource['address'] = details.get('formatted_address', resource['address'])
+        resource['zip_code'] = resource.get('zip_code') or parse_address(details.get('formatted_address'))[1]
+        resource['phone'] = details.get('formatted_phone_number', resource['phone'])
+        resource['website'] = details.get('website', resource['website'])
+        if self.sink:
+            self.sink.write([resource])
+    
+    def resolve_details(self):
+        """Deferred stage: fetch the details still owed to collected resources in one batch"""
+        if len(self.details):
+            print(f"\n📇 Fetching place details for {len(self.details)} resources...")
+            self.details.flush()
+        self.cost_estimate = (self.query_count + self.details.calls) * 0.017
     
     def export_to_csv(self, filename):
         """Export results to CSV"""
+        self.resolve_details()
         if not self.results:
             print("❌ No results to export")
             return
@@ -117,16 +198,29 @@ class PlacesCollector:
         os.makedirs(os.path.dirname(filename) if os.path.dirname(filename) else '.', exist_ok=True)
         
         with open(filename, 'w', newline='', encoding='utf-8') as csvfile:
-            fieldnames = ['name', 'address', 'city', 'state', 'latitude', 'longitude', 
+            fieldnames = ['name', 'address', 'city', 'county', 'state', 'zip_code', 'latitude', 'longitude', 
                          'phone', 'website', 'category', 'search_query', 'place_id']
             writer = csv.DictWriter(csvfile, fieldnames=fieldnames, extrasaction='ignore')
             
             writer.writeheader()
             for row in self.results:
                 writer.writerow(row)
+        self.registry.commit((r['place_id'] for r in self.results), 'google_places_collector')
         
         print(f"\n✅ Exported {len(self.results)} resources to {filename}")
-        print(f"💰 API Cost: ${self.cost_estimate:.2f} ({self.query_count} queries)")
+        print(f"💰 API Cost: ${self.cost_estimate:.2f} ({self.query_count} searches + {self.details.calls} details)")
+        print(f"📇 {self.details.summary()}")
+        print(f"🚫 {self.hit_filter.summary()}")
+        print(f"🗂️  {self.registry.summary()}")
+        if self.boundaries:
+            print(f"🗺️  {self.boundaries.summary()}")
+        if self.sink:
+            self.sink.flush()
+            print(f"🗄️  {self.sink.summary()}")
+        print(f"🔲 {self.split_policy.summary()}")
+        print(f"✂️  {self.scheduler.summary()}")
+        if hasattr(self.gmaps, 'summary'):
+            print(f"💾 {self.gmaps.summary()}")
 
 def main():
     parser = argparse.ArgumentParser(description='Collect humanitarian resources using Google Places API')
@@ -135,6 +229,17 @@ def main():
     parser.add_argument('--radius', type=int, default=10, help='Search radius in miles (default: 10)')
     parser.add_argument('--output', default='data/collected_resources.csv', help='Output CSV file')
     parser.add_argument('--api-key', help='Google Places API key (or set GOOGLE_PLACES_API_KEY env var)')
+    add_split_arguments(parser)
+    add_scheduler_arguments(parser)
+    add_pagination_argument(parser)
+    add_details_argument(parser)
+    add_prefilter_argument(parser)
+    add_registry_arguments(parser)
+    add_sink_arguments(parser)
+    add_cache_arguments(parser)
+    add_gazetteer_arguments(parser)
+    add_boundary_arguments(parser)
+    add_resume_argument(parser)
     
     args = parser.parse_args()
     
@@ -146,13 +251,26 @@ def main():
         return 1
     
     # Initialize collector
-    collector = PlacesCollector(api_key)
+    journal = CheckpointJournal(journal_path_for(args.output), resume=args.resume)
+    collector = PlacesCollector(api_key, cache_path_from_args(args), journal=journal,
+                                split_policy=split_policy_from_args(args), scheduler=scheduler_from_args(args),
+                                details=args.details, hit_filter=hit_filter_from_args(args),
+                                registry=registry_from_args(args), sink=sink_from_args(args),
+                                max_pages=args.max_pages, gazetteer=gazetteer_from_args(args),
+                                boundaries=boundaries_from_args(args))
     
     # Search location
     collector.search_location(args.city, args.state, args.radius)
     
     # Export results
     collector.export_to_csv(args.output)
+    collector.scheduler.close()
+    collector.details.close()
+    collector.fetcher.close()
+    collector.registry.close()
+    if collector.sink:
+        collector.sink.close()
+    journal.close()
     
     return 0
 
@@ -0,0 +1,78 @@
+"""
+Search Hit Pre-Filter
+Runs the cleanup scripts' commercial/keep rules on a raw search hit's name,
+so collectors drop restaurants, wholesalers and chains before paying for
+place details, exporting or importing them
+"""
+
+import threading
+from collections import Counter
+
+from smart_cleanup import REMOVE_PATTERNS
+from validate_and_categorize import KEEP_MATCHER, REMOVE_MATCHER
+
+# smart_cleanup matches these with ILIKE '%name%'
+KNOWN_COMMERCIAL = [(pattern.lower(), reason) for pattern, reason in REMOVE_PATTERNS]
+
+
+def reject_reason(name):
+    """Why a hit named `name` is not an assistance resource, or None to keep it.
+
+    Same decision as validate_and_categorize.should_remove on the name alone,
+    plus smart_cleanup's list of known commercial businesses"""
+    name_lower = (name or '').lower()
+    if KEEP_MATCHER.search(name_lower):
+        return None
+
+    for pattern, reason in KNOWN_COMMERCIAL:
+        if pattern in name_lower:
+            return f"known {reason}"
+
+    keyword = REMOVE_MATCHER.first(name_lower)
+    return f"commercial keyword '{keyword}'" if keyword else None
+
+
+class HitFilter:
+    """Drops commercial search hits and logs each rejection with its reason"""
+
+    def __init__(self, enabled=True, verbose=True):
+        self.enabled = enabled
+        self.verbose = verbose
+        self.lock = threading.Lock()
+        self.rejected = Counter()
+
+    def allow(self, place):
+        """True if the hit should be kept"""
+        if not self.enabled:
+            return True
+        reason = reject_reason(place.get('name'))
+        if reason is None:
+            return True
+
+        with self.lock:
+            self.rejected[reason] += 1
+        if self.verbose:
+            print(f"    🚫 Skipped {place.get('name')}: {reason}")
+        return False
+
+    def relevant(self, places):
+        """The places allow() would keep, without logging or counting the rest"""
+        if not self.enabled:
+            return list(places)
+        return [place for place in places if reject_reason(place.get('name')) is None]
+
+    def summary(self):
+        if not self.enabled:
+            return "Hit pre-filter: off"
+        total = sum(self.rejected.values())
+        top = ', '.join(f"{reason} x{count}" for reason, count in self.rejected.most_common(3))
+        return f"Hit pre-filter: {total} commercial hits skipped" + (f" ({top})" if top else '')
+
+
+def add_prefilter_argument(parser):
+    parser.add_argument('--no-prefilter', action='store_true',
+                        help='Keep every search hit instead of skipping restaurants, wholesalers and chains by name')
+
+
+def hit_filter_from_args(args):
+    return HitFilter(enabled=not args.no_prefilter)
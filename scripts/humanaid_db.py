@@ -0,0 +1,139 @@
+"""
+Shared Database Access
+One env-driven connection config and psycopg2 connection pool for every
+script, plus transaction context managers and batch / prepared-statement
+helpers
+
+Environment:
+  DB_HOST, DB_PORT, DB_NAME, DB_USER, DB_PASSWORD   connection settings
+  DB_POOL_MIN, DB_POOL_MAX                          pool size (default 1-5)
+  DB_STATEMENT_TIMEOUT_MS                           per-statement limit (0 = none)
+  DB_BATCH_PAGE_SIZE                                rows per batched round trip
+"""
+
+import os
+import threading
+import weakref
+from contextlib import contextmanager
+
+import psycopg2
+from dotenv import load_dotenv
+from psycopg2.extras import execute_batch, execute_values
+from psycopg2.pool import ThreadedConnectionPool
+
+load_dotenv()
+
+POOL_MIN = int(os.getenv('DB_POOL_MIN', '1'))
+POOL_MAX = int(os.getenv('DB_POOL_MAX', '5'))
+STATEMENT_TIMEOUT_MS = int(os.getenv('DB_STATEMENT_TIMEOUT_MS', '0'))
+BATCH_PAGE_SIZE = int(os.getenv('DB_BATCH_PAGE_SIZE', '1000'))
+
+_pool = None
+_pool_lock = threading.Lock()
+
+# Statement names already PREPAREd, per connection
+_prepared = weakref.WeakKeyDictionary()
+
+
+def db_config(**overrides):
+    """Connection settings from DB_* environment variables; non-None overrides win"""
+    config = {
+        'host': os.getenv('DB_HOST', 'localhost'),
+        'port': os.getenv('DB_PORT', '5432'),
+        'database': os.getenv('DB_NAME', 'humanaid'),
+        'user': os.getenv('DB_USER', 'postgres'),
+        'password': os.getenv('DB_PASSWORD', 'humanaid2025'),
+    }
+    config.update({key: value for key, value in overrides.items() if value is not None})
+    if STATEMENT_TIMEOUT_MS:
+        config.setdefault('options', f'-c statement_timeout={STATEMENT_TIMEOUT_MS}')
+    return config
+
+
+def connect(**overrides):
+    """A dedicated (unpooled) connection, for long-lived single-connection jobs"""
+    return psycopg2.connect(**db_config(**overrides))
+
+
+def get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadedConnectionPool(POOL_MIN, POOL_MAX, **db_config())
+        return _pool
+
+
+def close_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.closeall()
+            _pool = None
+
+
+@contextmanager
+def connection():
+    """Borrow a pooled connection; uncommitted work is rolled back when it is returned"""
+    pool = get_pool()
+    conn = pool.getconn()
+    try:
+        yield conn
+    finally:
+        broken = bool(conn.closed)
+        if not broken:
+            try:
+                conn.rollback()
+                # Hand the next borrower a session without our prepared statements
+                if _prepared.pop(conn, None):
+                    with conn.cursor() as cur:
+                        cur.execute("DEALLOCATE ALL")
+                    conn.commit()
+            except psycopg2.Error:
+                broken = True
+        pool.putconn(conn, close=broken)
+
+
+@contextmanager
+def transaction(conn=None):
+    """Cursor whose work commits on success and rolls back on error"""
+    if conn is None:
+        with connection() as pooled, transaction(pooled) as cur:
+            yield cur
+        return
+
+    cur = conn.cursor()
+    try:
+        yield cur
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+
+
+def prepare(cur, name, sql, types=()):
+    """PREPARE sql (with $1, $2 ... placeholders) once per connection under name"""
+    names = _prepared.setdefault(cur.connection, set())
+    if name not in names:
+        signature = f" ({', '.join(types)})" if types else ''
+        cur.execute(f"PREPARE {name}{signature} AS {sql}")
+        names.add(name)
+
+
+def execute_prepared(cur, name, params=()):
+    """EXECUTE a statement set up with prepare()"""
+    if params:
+        cur.execute(f"EXECUTE {name} ({', '.join(['%s'] * len(params))})", params)
+    else:
+        cur.execute(f"EXECUTE {name}")
+
+
+def insert_values(cur, sql, rows, template=None, fetch=False):
+    """execute_values with the shared page size - sql contains a single VALUES %s"""
+    return execute_values(cur, sql, rows, template=template, page_size=BATCH_PAGE_SIZE, fetch=fetch)
+
+
+def execute_many(cur, sql, rows):
+    """Run a parameterized statement for every row, BATCH_PAGE_SIZE rows per round trip"""
+    execute_batch(cur, sql, rows, page_size=BATCH_PAGE_SIZE)
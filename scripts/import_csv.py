@@ -5,13 +5,16 @@ Imports resources from CSV into PostgreSQL database
 """
 
 import os
+import io
 import csv
 import sys
 import argparse
+import itertools
 import psycopg2
-from psycopg2.extras import execute_values
 import re
 
+from humanaid_db import db_config
+
 # Add parent directory to path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 
@@ -36,101 +39,348 @@ CATEGORY_MAPPING = {
     'clothing': 'clothing',
 }
 
+# Rows handed to the DB writer at a time
+DEFAULT_BATCH_SIZE = 1000
+
+# Rows between progress updates
+PROGRESS_EVERY = 100
+
+# Columns staged by the bulk (COPY) import path, in COPY order
+STAGING_COLUMNS = [
+    'name', 'slug', 'address', 'city', 'state', 'zip_code', 'county',
+    'longitude', 'latitude', 'phone', 'website', 'description', 'category_slug', 'google_place_id'
+]
+
+# Staged columns the per-row path stores as '' when empty; COPY (FORMAT csv)
+# would otherwise load an empty field as NULL. county and google_place_id
+# stay NULL when empty, as in the per-row path.
+NOT_NULL_COLUMNS = [
+    'name', 'slug', 'address', 'city', 'state', 'zip_code', 'phone', 'website', 'description', 'category_slug'
+]
+
+# Bulk-path dedup, set-based but with the per-row path's semantics: rows
+# matching the live table are rejected first, then each pass accepts the
+# undecided rows that come first on every key and rejects the undecided rows
+# sharing a key with an accepted one, until no row is undecided. A rejected
+# row never blocks a later one, just as in the per-row path.
+BULK_REJECT_EXISTING_SQL = """
+    UPDATE import_staging s SET accepted = false
+    WHERE EXISTS (
+        SELECT 1 FROM resources r WHERE LOWER(r.name) = LOWER(s.name)
+    ) OR EXISTS (
+        SELECT 1 FROM resources r WHERE r.address != '' AND LOWER(r.address) = LOWER(s.address)
+    ) OR EXISTS (
+        SELECT 1 FROM resources r WHERE r.google_place_id = s.google_place_id
+    )
+"""
+
+BULK_ACCEPT_SQL = """
+    WITH ranked AS (
+        SELECT s.row_num,
+               ROW_NUMBER() OVER (PARTITION BY LOWER(s.name) ORDER BY s.row_num) AS name_rank,
+               CASE WHEN s.address = '' THEN 1
+                    ELSE ROW_NUMBER() OVER (PARTITION BY LOWER(s.address) ORDER BY s.row_num)
+               END AS address_rank,
+               CASE WHEN s.google_place_id IS NULL THEN 1
+                    ELSE ROW_NUMBER() OVER (PARTITION BY s.google_place_id ORDER BY s.row_num)
+               END AS place_rank
+        FROM import_staging s
+        WHERE s.accepted IS NULL
+    )
+    UPDATE import_staging s SET accepted = true
+    FROM ranked
+    WHERE s.row_num = ranked.row_num
+      AND ranked.name_rank = 1 AND ranked.address_rank = 1 AND ranked.place_rank = 1
+"""
+
+BULK_REJECT_SQL = """
+    UPDATE import_staging s SET accepted = false
+    WHERE s.accepted IS NULL
+      AND (EXISTS (
+          SELECT 1 FROM import_staging a WHERE a.accepted AND LOWER(a.name) = LOWER(s.name)
+      ) OR EXISTS (
+          SELECT 1 FROM import_staging a
+          WHERE a.accepted AND s.address != '' AND LOWER(a.address) = LOWER(s.address)
+      ) OR EXISTS (
+          SELECT 1 FROM import_staging a WHERE a.accepted AND a.google_place_id = s.google_place_id
+      ))
+"""
+
+# Insert the accepted rows and link their categories. Accepted rows have
+# unique names, so each inserted slug belongs to exactly one staging row.
+BULK_INSERT_SQL = """
+    WITH inserted AS (
+        INSERT INTO resources (
+            name, slug, address, city, state, zip_code, county,
+            location, phone, website, description, google_place_id,
+            approval_status, is_active, verified
+        )
+        SELECT s.name, s.slug, s.address, s.city, s.state, s.zip_code, s.county,
+               ST_SetSRID(ST_MakePoint(s.longitude, s.latitude), 4326),
+               s.phone, s.website, s.description, s.google_place_id,
+               'approved', true, false
+        FROM import_staging s
+        WHERE s.accepted
+        ORDER BY s.row_num
+        ON CONFLICT DO NOTHING
+        RETURNING id, slug
+    ),
+    linked AS (
+        INSERT INTO resource_categories (resource_id, category_id)
+        SELECT i.id, c.id
+        FROM inserted i
+        JOIN import_staging s ON s.slug = i.slug AND s.accepted
+        JOIN categories c ON c.slug = s.category_slug
+        ON CONFLICT DO NOTHING
+        RETURNING resource_id
+    )
+    SELECT (SELECT COUNT(*) FROM inserted), (SELECT COUNT(*) FROM linked)
+"""
+
+class DedupIndex:
+    """In-memory normalized name/address/place_id keys for O(1) duplicate checks"""
+    
+    def __init__(self):
+        self.names = set()
+        self.addresses = set()
+        self.place_ids = set()
+    
+    @staticmethod
+    def normalize(value):
+        return ' '.join((value or '').lower().split())
+    
+    def load(self, cursor):
+        """Pre-load keys for every existing resource (one scan per import)"""
+        cursor.execute("SELECT name, address, google_place_id FROM resources")
+        for name, address, place_id in cursor:
+            self.add(name, address, place_id)
+        return self
+    
+    def contains(self, name, address, place_id=None):
+        return (
+            self.normalize(name) in self.names
+            or (bool(address) and self.normalize(address) in self.addresses)
+            or (bool(place_id) and place_id in self.place_ids)
+        )
+    
+    def add(self, name, address, place_id=None):
+        self.names.add(self.normalize(name))
+        if address:
+            self.addresses.add(self.normalize(address))
+        if place_id:
+            self.place_ids.add(place_id)
+
 class ResourceImporter:
-    def __init__(self, db_config):
+    def __init__(self, db_config, preload_dedup=True):
         self.conn = psycopg2.connect(**db_config)
         self.cursor = self.conn.cursor()
         self.imported_count = 0
         self.skipped_count = 0
         self.error_count = 0
+        
+        # Duplicate checks hit this index instead of the database
+        self.dedup = DedupIndex().load(self.cursor) if preload_dedup else None
     
-    def import_from_csv(self, filename):
+    def import_from_csv(self, filename, batch_size=DEFAULT_BATCH_SIZE):
         """Import resources from CSV file"""
         print(f"\n📂 Reading {filename}...")
         
-        with open(filename, 'r', encoding='utf-8') as csvfile:
-            reader = csv.DictReader(csvfile)
-            resources = list(reader)
+        for batch in self._read_batches(filename, batch_size):
+            for resource in batch:
+                try:
+                    self._import_resource(resource)
+                except Exception as e:
+                    print(f"\n❌ Error importing {resource.get('name', 'Unknown')}: {str(e)}")
+                    self.error_count += 1
+        
+        self.conn.commit()
         
-        print(f"📊 Found {len(resources)} resources to import")
+        print(f"\n\n✅ Import complete!")
+        print(f"   Imported: {self.imported_count}")
+        print(f"   Skipped (duplicates): {self.skipped_count}")
+        print(f"   Errors: {self.error_count}")
+    
+    def import_from_csv_bulk(self, filename, batch_size=DEFAULT_BATCH_SIZE):
+        """Import resources from CSV file via COPY into a staging table"""
+        print(f"\n📂 Reading {filename} (bulk mode)...")
         
-        for i, resource in enumerate(resources, 1):
-            if i % 10 == 0:
-                print(f"  Processing {i}/{len(resources)}...", end='\r')
+        self.cursor.execute("""
+            CREATE TEMP TABLE import_staging (
+                row_num SERIAL,
+                name TEXT, slug TEXT, address TEXT, city TEXT, state TEXT, zip_code TEXT, county TEXT,
+                longitude DOUBLE PRECISION, latitude DOUBLE PRECISION,
+                phone TEXT, website TEXT, description TEXT, category_slug TEXT,
+                google_place_id TEXT,
+                accepted BOOLEAN
+            ) ON COMMIT DROP
+        """)
+        
+        # COPY each batch as it is read, so only one batch is held client-side
+        staged = 0
+        for batch in self._read_batches(filename, batch_size):
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            for resource in batch:
+                try:
+                    writer.writerow(self._staging_row(resource))
+                    staged += 1
+                except (ValueError, KeyError) as e:
+                    print(f"\n❌ Error staging {resource.get('name', 'Unknown')}: {str(e)}")
+                    self.error_count += 1
             
-            try:
-                self._import_resource(resource)
-            except Exception as e:
-                print(f"\n❌ Error importing {resource.get('name', 'Unknown')}: {str(e)}")
-                self.error_count += 1
+            buffer.seek(0)
+            self.cursor.copy_expert(
+                f"COPY import_staging ({', '.join(STAGING_COLUMNS)}) FROM STDIN "
+                f"WITH (FORMAT csv, FORCE_NOT_NULL ({', '.join(NOT_NULL_COLUMNS)}))",
+                buffer
+            )
         
+        print(f"\n📊 Staged {staged} resources for import")
+        
+        self._resolve_staged_duplicates()
+        self.cursor.execute(BULK_INSERT_SQL)
+        inserted, linked = self.cursor.fetchone()
         self.conn.commit()
         
-        print(f"\n\n✅ Import complete!")
+        self.imported_count += inserted
+        self.skipped_count += staged - inserted
+        
+        print(f"\n✅ Import complete!")
         print(f"   Imported: {self.imported_count}")
+        print(f"   Category links: {linked}")
         print(f"   Skipped (duplicates): {self.skipped_count}")
         print(f"   Errors: {self.error_count}")
     
-    def _import_resource(self, resource):
-        """Import a single resource"""
-        # Validate required fields
-        if not resource.get('name') or not resource.get('city'):
-            self.skipped_count += 1
-            return
+    def _resolve_staged_duplicates(self):
+        """Mark every staged row accepted or rejected (see BULK_REJECT_EXISTING_SQL)"""
+        self.cursor.execute("CREATE INDEX ON import_staging (LOWER(name))")
+        self.cursor.execute("CREATE INDEX ON import_staging (LOWER(address)) WHERE address != ''")
+        self.cursor.execute("CREATE INDEX ON import_staging (google_place_id)")
+        self.cursor.execute("ANALYZE import_staging")
+        
+        self.cursor.execute(BULK_REJECT_EXISTING_SQL)
+        # The earliest undecided row is always accepted, so every pass makes progress
+        while True:
+            self.cursor.execute(BULK_ACCEPT_SQL)
+            if not self.cursor.rowcount:
+                return
+            self.cursor.execute(BULK_REJECT_SQL)
+    
+    def _read_resources(self, filename):
+        """Stream validated, category-mapped CSV rows with the byte offset reached"""
+        total_bytes = os.path.getsize(filename) or 1
         
+        with open(filename, 'rb') as raw:
+            reader = csv.DictReader(io.TextIOWrapper(raw, encoding='utf-8', newline=''))
+            for i, resource in enumerate(reader, 1):
+                if i % PROGRESS_EVERY == 0:
+                    percent = 100 * raw.tell() / total_bytes
+                    print(f"  Processing row {i} ({percent:.0f}% of {total_bytes / 1e6:.1f} MB)...", end='\r')
+                
+                # Validate required fields
+                if not resource.get('name') or not resource.get('city'):
+                    self.skipped_count += 1
+                    continue
+                
+                resource['category_slug'] = self._map_category(resource.get('category', ''))
+                yield resource
+    
+    def _read_batches(self, filename, batch_size):
+        """Group the row stream into fixed-size batches for the DB writer"""
+        rows = self._read_resources(filename)
+        while True:
+            batch = list(itertools.islice(rows, batch_size))
+            if not batch:
+                return
+            yield batch
+    
+    def _staging_row(self, resource):
+        """Build one COPY row (STAGING_COLUMNS order) from a CSV record"""
+        return [
+            resource['name'],
+            self._make_slug(resource['name']),
+            resource.get('address', ''),
+            resource['city'],
+            resource['state'],
+            resource.get('zip_code', resource.get('zip', '')),
+            resource.get('county') or None,
+            float(resource.get('longitude', 0)),
+            float(resource.get('latitude', 0)),
+            resource.get('phone', ''),
+            resource.get('website', ''),
+            resource.get('description', f"{resource['name']} in {resource['city']}, {resource['state']}"),
+            resource['category_slug'] or '',
+            resource.get('place_id') or None,
+        ]
+    
+    def _make_slug(self, name):
+        """URL slug with a short hash suffix to avoid collisions"""
+        slug = re.sub(r'[^a-z0-9]+', '-', name.lower()).strip('-')
+        return slug + '-' + str(hash(name))[:8]
+    
+    def _import_resource(self, resource):
+        """Import a single (already validated) resource"""
         # Check for duplicates
-        if self._is_duplicate(resource['name'], resource.get('address', '')):
+        if self._is_duplicate(resource['name'], resource.get('address', ''), resource.get('place_id')):
             self.skipped_count += 1
             return
         
-        # Create slug
-        slug = re.sub(r'[^a-z0-9]+', '-', resource['name'].lower()).strip('-')
-        
         # Insert resource
         self.cursor.execute("""
             INSERT INTO resources (
-                name, slug, address, city, state, zip_code,
-                location, phone, website, description,
+                name, slug, address, city, state, zip_code, county,
+                location, phone, website, description, google_place_id,
                 approval_status, is_active, verified
             ) VALUES (
-                %s, %s, %s, %s, %s, %s,
+                %s, %s, %s, %s, %s, %s, %s,
                 ST_SetSRID(ST_MakePoint(%s, %s), 4326),
-                %s, %s, %s, 'approved', true, false
+                %s, %s, %s, %s, 'approved', true, false
             )
             RETURNING id
         """, (
             resource['name'],
-            slug + '-' + str(hash(resource['name']))[:8],
+            self._make_slug(resource['name']),
             resource.get('address', ''),
             resource['city'],
             resource['state'],
             resource.get('zip_code', resource.get('zip', '')),
+            resource.get('county') or None,
             float(resource.get('longitude', 0)),
             float(resource.get('latitude', 0)),
             resource.get('phone', ''),
             resource.get('website', ''),
-            resource.get('description', f"{resource['name']} in {resource['city']}, {resource['state']}")
+            resource.get('description', f"{resource['name']} in {resource['city']}, {resource['state']}"),
+            resource.get('place_id') or None
         ))
         
         resource_id = self.cursor.fetchone()[0]
+        if self.dedup is not None:
+            self.dedup.add(resource['name'], resource.get('address', ''), resource.get('place_id'))
         
         # Link to category
-        category_slug = self._map_category(resource.get('category', ''))
-        if category_slug:
-            self._link_category(resource_id, category_slug)
+        if resource['category_slug']:
+            self._link_category(resource_id, resource['category_slug'])
         
         self.imported_count += 1
     
-    def _is_duplicate(self, name, address):
+    def _is_duplicate(self, name, address, place_id=None):
         """Check if resource already exists"""
+        if self.dedup is not None:
+            return self.dedup.contains(name, address, place_id)
+        
+        # Fallback: probes that can each use an index
+        # (see database/migrations/001_resources_dedup_indexes.sql and 003)
         self.cursor.execute("""
-            SELECT COUNT(*) FROM resources 
-            WHERE LOWER(name) = LOWER(%s) 
-            OR (address != '' AND LOWER(address) = LOWER(%s))
-        """, (name, address))
+            SELECT EXISTS (
+                SELECT 1 FROM resources WHERE LOWER(name) = LOWER(%s)
+            ) OR EXISTS (
+                SELECT 1 FROM resources WHERE address != '' AND LOWER(address) = LOWER(%s)
+            ) OR EXISTS (
+                SELECT 1 FROM resources WHERE google_place_id = %s
+            )
+        """, (name, address, place_id or None))
         
-        count = self.cursor.fetchone()[0]
-        return count > 0
+        return self.cursor.fetchone()[0]
     
     def _map_category(self, category):
         """Map category name to slug"""
@@ -153,28 +403,38 @@ class ResourceImporter:
 def main():
     parser = argparse.ArgumentParser(description='Import resources from CSV to database')
     parser.add_argument('--file', required=True, help='CSV file to import')
-    parser.add_argument('--db-host', default='localhost', help='Database host')
-    parser.add_argument('--db-port', default='5432', help='Database port')
-    parser.add_argument('--db-name', default='humanaid', help='Database name')
-    parser.add_argument('--db-user', default='postgres', help='Database user')
+    parser.add_argument('--db-host', help='Database host (or set DB_HOST env var)')
+    parser.add_argument('--db-port', help='Database port (or set DB_PORT env var)')
+    parser.add_argument('--db-name', help='Database name (or set DB_NAME env var)')
+    parser.add_argument('--db-user', help='Database user (or set DB_USER env var)')
     parser.add_argument('--db-password', help='Database password (or set DB_PASSWORD env var)')
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+                        help=f'Rows read per batch before writing to the database (default: {DEFAULT_BATCH_SIZE})')
+    parser.add_argument('--no-dedup-cache', action='store_true',
+                        help='Check duplicates with indexed per-row queries instead of pre-loading existing names/addresses')
+    parser.add_argument('--bulk', action='store_true',
+                        help='Stage the file with COPY and insert with set-based SQL (much faster for large files)')
     
     args = parser.parse_args()
     
-    # Database config
-    db_config = {
-        'host': args.db_host,
-        'port': args.db_port,
-        'database': args.db_name,
-        'user': args.db_user,
-        'password': args.db_password or os.environ.get('DB_PASSWORD', 'humanaid2025')
-    }
+    # Database config (command-line flags override the DB_* environment)
+    config = db_config(
+        host=args.db_host,
+        port=args.db_port,
+        database=args.db_name,
+        user=args.db_user,
+        password=args.db_password
+    )
     
     # Import resources
-    importer = ResourceImporter(db_config)
+    # --bulk dedups in SQL, so only the per-row path uses the in-memory index
+    importer = ResourceImporter(config, preload_dedup=not (args.no_dedup_cache or args.bulk))
     
     try:
-        importer.import_from_csv(args.file)
+        if args.bulk:
+            importer.import_from_csv_bulk(args.file, args.batch_size)
+        else:
+            importer.import_from_csv(args.file, args.batch_size)
     finally:
         importer.close()
     
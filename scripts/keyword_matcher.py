@@ -0,0 +1,100 @@
+"""
+Compiled Multi-Keyword Matcher
+Shared by the categorizers and cleanup scripts: each keyword list is compiled
+once into a trie-shaped regex, and one pass over the text returns every hit
+"""
+
+import re
+from collections import defaultdict
+
+
+def _trie_pattern(keywords):
+    """Regex equivalent to an alternation of keywords, factored by common prefix"""
+    trie = {}
+    for keyword in keywords:
+        node = trie
+        for char in keyword:
+            node = node.setdefault(char, {})
+        node[''] = True
+
+    def emit(node):
+        branches = [re.escape(char) + emit(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        # A keyword ends here: the longer continuations are optional (greedy, so longest wins)
+        return '(?:' + body + ')?' if '' in node else body
+
+    return emit(trie)
+
+
+class KeywordMatcher:
+    """Substring matcher for a fixed keyword list (callers lower-case the text)"""
+
+    def __init__(self, keywords):
+        self.keywords = list(dict.fromkeys(keywords))
+        # Zero-width lookahead so overlapping keywords are all seen in one scan
+        self.pattern = re.compile('(?=(' + _trie_pattern(self.keywords) + '))') if self.keywords else None
+        # The regex reports the longest keyword at each position; shorter
+        # keywords starting at the same position are its prefixes
+        self.implied = {
+            keyword: {other for other in self.keywords if keyword.startswith(other)}
+            for keyword in self.keywords
+        }
+
+    def search(self, text):
+        """True if any keyword occurs in text - same as any(kw in text for kw in keywords)"""
+        return bool(self.pattern and text and self.pattern.search(text))
+
+    def hits(self, text):
+        """Set of every keyword that occurs in text"""
+        found = set()
+        if self.pattern and text:
+            for match in self.pattern.finditer(text):
+                found |= self.implied[match.group(1)]
+        return found
+
+    def first(self, text):
+        """The earliest keyword in list order that occurs in text, or None"""
+        found = self.hits(text)
+        return next((keyword for keyword in self.keywords if keyword in found), None)
+
+
+class KeywordGroups:
+    """One matcher over several named keyword lists; reports which groups were hit"""
+
+    def __init__(self, groups):
+        self.groups = {name: list(keywords) for name, keywords in groups.items()}
+        self.groups_for = defaultdict(set)
+        for name, keywords in self.groups.items():
+            for keyword in keywords:
+                self.groups_for[keyword].add(name)
+        self.matcher = KeywordMatcher(keyword for keywords in self.groups.values() for keyword in keywords)
+
+    def match(self, text):
+        """Map of group name -> keywords hit, for every group with at least one hit"""
+        result = defaultdict(set)
+        for keyword in self.matcher.hits(text):
+            for name in self.groups_for[keyword]:
+                result[name].add(keyword)
+        return result
+
+
+class RuleMatcher:
+    """Ordered rule list - a rule fires when any of its 'keywords' and none of its 'exclude' hit"""
+
+    def __init__(self, rules):
+        self.rules = rules
+        self.groups = KeywordGroups({
+            (index, field): rule.get(field, [])
+            for index, rule in enumerate(rules)
+            for field in ('keywords', 'exclude')
+        })
+
+    def first(self, text):
+        """The first rule that fires for text, or None"""
+        hits = self.groups.match(text)
+        for index, rule in enumerate(self.rules):
+            if (index, 'keywords') in hits and (index, 'exclude') not in hits:
+                return rule
+        return None
@@ -0,0 +1,122 @@
+"""
+Deferred Place Details Lookups
+Collectors build resources straight from the search payload and queue a
+place() details call only for the fields the hit did not carry. Queued
+lookups run per unit (eager), in one concurrent batch at the end (deferred),
+or never (none)
+"""
+
+import threading
+
+from places_fetcher import DEFAULT_WORKERS, PlacesFetcher
+
+DETAILS_MODES = ('deferred', 'eager', 'none')
+DEFAULT_DETAILS_MODE = 'deferred'
+
+# Marker left on resources whose details are still owed; the checkpoint journal
+# keeps it, so a --resume run fetches them too
+PENDING_KEY = 'details_pending'
+
+
+def missing_fields(place, fields):
+    """Requested details fields that the search hit did not already include"""
+    return [field for field in fields if field not in place]
+
+
+def _set_pending(resource, fields):
+    if isinstance(resource, dict):
+        resource[PENDING_KEY] = fields
+    else:
+        setattr(resource, PENDING_KEY, fields)
+
+
+def _get_pending(resource):
+    if isinstance(resource, dict):
+        return resource.get(PENDING_KEY)
+    return getattr(resource, PENDING_KEY, None)
+
+
+def _clear_pending(resource):
+    if isinstance(resource, dict):
+        resource.pop(PENDING_KEY, None)
+    else:
+        setattr(resource, PENDING_KEY, None)
+
+
+class DetailsStage:
+    """Queue of place() lookups owed to resources built from search hits.
+
+    fill(resource, details) merges a details result into a resource in place.
+    Pass the collector's PlacesFetcher to share its pool, otherwise the stage
+    runs its own."""
+
+    def __init__(self, client, fill, mode=DEFAULT_DETAILS_MODE, fetcher=None, workers=DEFAULT_WORKERS):
+        self.fill = fill
+        self.mode = mode
+        self.own_fetcher = fetcher is None
+        self.fetcher = fetcher or PlacesFetcher(client, max_workers=workers)
+        self.lock = threading.Lock()
+        self.pending = []
+        self.calls = 0
+        self.failed = 0
+
+    def add(self, resource, place_id, fields):
+        """Owe resource the given details fields (ignored in 'none' mode or when nothing is missing)"""
+        if self.mode == 'none' or not fields:
+            return
+        _set_pending(resource, list(fields))
+        with self.lock:
+            self.pending.append((resource, place_id, list(fields)))
+
+    def resume(self, resources):
+        """Re-queue replayed journal resources that were exported before their details arrived"""
+        for resource in resources:
+            fields = _get_pending(resource)
+            place_id = resource.get('place_id') if isinstance(resource, dict) else getattr(resource, 'place_id', None)
+            if fields and place_id:
+                self.add(resource, place_id, fields)
+
+    def unit_done(self):
+        """End of a search unit: eager mode resolves its lookups before the unit is journaled"""
+        if self.mode == 'eager':
+            return self.flush()
+        return 0
+
+    def flush(self):
+        """Run every queued lookup concurrently and merge the answers; returns lookups made"""
+        with self.lock:
+            batch, self.pending = self.pending, []
+        if not batch:
+            return 0
+
+        futures = [(resource, self.fetcher.submit('place', place_id=place_id, fields=fields))
+                   for resource, place_id, fields in batch]
+        for resource, future in futures:
+            try:
+                details = future.result().get('result', {})
+            except Exception:
+                # Keep the marker - the resource is exported with search fields only
+                self.failed += 1
+                continue
+            self.fill(resource, details)
+            _clear_pending(resource)
+
+        self.calls += len(batch)
+        return len(batch)
+
+    def __len__(self):
+        return len(self.pending)
+
+    def summary(self):
+        failed = f", {self.failed} failed" if self.failed else ''
+        return f"Place details ({self.mode}): {self.calls} lookups{failed}"
+
+    def close(self):
+        if self.own_fetcher:
+            self.fetcher.close()
+
+
+def add_details_argument(parser):
+    parser.add_argument('--details', choices=DETAILS_MODES, default=DEFAULT_DETAILS_MODE,
+                        help='When to fetch place details for fields a search hit lacks: in one batch at the end '
+                             '(deferred, default), after each search (eager), or never - search fields only (none)')
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Persistent place_id Registry
+SQLite record of every Google place_id a collector has exported or the
+database already holds, loaded into an in-memory set so each search hit is
+checked in O(1) and a new run never re-details or re-exports a known place
+
+Usage:
+    python place_registry.py              # counts by source
+    python place_registry.py --sync-db    # pull resources.google_place_id from the database
+"""
+
+import os
+import sqlite3
+import argparse
+import threading
+import time
+
+DEFAULT_REGISTRY_PATH = os.getenv(
+    'PLACE_REGISTRY_DB',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data', 'place_registry.sqlite3')
+)
+
+# Source recorded for ids pulled from resources.google_place_id
+DB_SOURCE = 'database'
+
+
+class PlaceRegistry:
+    """Known place_ids from earlier runs plus the ones claimed by this run.
+
+    Only exported places are committed to disk, so a run that dies before
+    exporting does not hide its places from the next one. With persist=False
+    the registry only de-duplicates within the run."""
+
+    def __init__(self, path=DEFAULT_REGISTRY_PATH, persist=True):
+        self.path = path
+        self.persist = persist
+        self.lock = threading.Lock()
+        self.known = set()
+        self.run = set()
+        self.skipped = 0
+        self.conn = None
+
+        if persist:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self.conn = sqlite3.connect(path, check_same_thread=False)
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS place_registry (
+                    place_id TEXT PRIMARY KEY,
+                    source TEXT NOT NULL,
+                    registered_at REAL NOT NULL
+                )
+            """)
+            self.known.update(row[0] for row in self.conn.execute("SELECT place_id FROM place_registry"))
+
+    def __contains__(self, place_id):
+        return place_id in self.known or place_id in self.run
+
+    def __len__(self):
+        return len(self.known | self.run)
+
+    def claim(self, place_id):
+        """True the first time this run sees a place_id that no earlier run exported"""
+        with self.lock:
+            if place_id in self.known:
+                self.skipped += 1
+                return False
+            if place_id in self.run:
+                return False
+            self.run.add(place_id)
+            return True
+
+    def mark_seen(self, place_ids):
+        """Claim place_ids replayed from a checkpoint journal"""
+        with self.lock:
+            self.run.update(place_id for place_id in place_ids if place_id)
+
+    def commit(self, place_ids, source):
+        """Persist exported place_ids so later runs skip them"""
+        rows = [(place_id, source, time.time()) for place_id in place_ids if place_id]
+        with self.lock:
+            self.known.update(place_id for place_id, _, _ in rows)
+            if self.conn and rows:
+                self.conn.executemany(
+                    "INSERT OR IGNORE INTO place_registry (place_id, source, registered_at) VALUES (?, ?, ?)", rows)
+                self.conn.commit()
+        return len(rows)
+
+    def sync_db(self, conn):
+        """Register every resources.google_place_id already in the database; returns ids added"""
+        from db_stream import stream_rows
+
+        before = len(self.known)
+        batch = []
+        for row in stream_rows(conn, "SELECT google_place_id FROM resources WHERE google_place_id IS NOT NULL"):
+            if row.google_place_id not in self.known:
+                batch.append(row.google_place_id)
+            if len(batch) >= 5000:
+                self.commit(batch, DB_SOURCE)
+                batch = []
+        self.commit(batch, DB_SOURCE)
+        return len(self.known) - before
+
+    def counts(self):
+        """Registered place_ids per source"""
+        if not self.conn:
+            return {}
+        return dict(self.conn.execute("SELECT source, COUNT(*) FROM place_registry GROUP BY source"))
+
+    def summary(self):
+        if not self.persist:
+            return f"Place registry: off ({len(self.run)} place_ids this run)"
+        return (f"Place registry: {self.skipped} already-known hits skipped, "
+                f"{len(self.known)} place_ids registered")
+
+    def close(self):
+        with self.lock:
+            if self.conn:
+                self.conn.close()
+                self.conn = None
+
+
+def sync_registry_from_db(registry):
+    """Pull the database's place_ids into the registry, warning (not failing) if it is unreachable"""
+    from humanaid_db import connection
+
+    try:
+        with connection() as conn:
+            added = registry.sync_db(conn)
+        print(f"🗂️  Registered {added} place_ids from the database")
+    except Exception as e:
+        print(f"⚠️  Could not sync place registry from the database: {e}")
+
+
+def add_registry_arguments(parser):
+    parser.add_argument('--registry-db', default=DEFAULT_REGISTRY_PATH,
+                        help='SQLite place_id registry (default: data/place_registry.sqlite3 or PLACE_REGISTRY_DB)')
+    parser.add_argument('--no-registry', action='store_true',
+                        help='Re-collect places that earlier runs already exported (dedupe within this run only)')
+    parser.add_argument('--sync-db', action='store_true',
+                        help='Before searching, register every google_place_id already in the database')
+
+
+def registry_from_args(args):
+    registry = PlaceRegistry(args.registry_db, persist=not args.no_registry)
+    if args.sync_db and registry.persist:
+        sync_registry_from_db(registry)
+    return registry
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Show or update the persistent place_id registry')
+    parser.add_argument('--registry-db', default=DEFAULT_REGISTRY_PATH)
+    parser.add_argument('--sync-db', action='store_true',
+                        help='Register every google_place_id already in the database')
+    args = parser.parse_args()
+
+    registry = PlaceRegistry(args.registry_db)
+    if args.sync_db:
+        sync_registry_from_db(registry)
+
+    counts = registry.counts()
+    registry.close()
+    if not counts:
+        print("❌ Registry is empty - export a collection or run with --sync-db")
+        return 1
+
+    print(f"\n🗂️  {sum(counts.values())} registered place_ids")
+    for source, count in sorted(counts.items(), key=lambda item: -item[1]):
+        print(f"   {source:<24}{count:>8}")
+    return 0
+
+
+if __name__ == '__main__':
+    exit(main())
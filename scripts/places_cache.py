@@ -0,0 +1,182 @@
+"""
+Persistent Response Cache for googlemaps Calls
+SQLite-backed cache keyed by (endpoint, normalized params) with a TTL per
+endpoint and LRU eviction once the cache grows past max_entries
+"""
+
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import Counter
+
+DAY = 24 * 60 * 60
+
+DEFAULT_CACHE_PATH = os.getenv(
+    'PLACES_CACHE_DB',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data', 'places_cache.sqlite3')
+)
+
+# City centroids never move; search results and details drift slowly
+DEFAULT_TTL = {
+    'geocode': 365 * DAY,
+    'places': 30 * DAY,
+    'places_nearby': 30 * DAY,
+    'place': 90 * DAY,
+}
+
+DEFAULT_MAX_ENTRIES = 200000
+
+# Names for positional arguments, so place(pid) and place(place_id=pid) share a key
+POSITIONAL_PARAMS = {
+    'geocode': ('address',),
+    'places': ('query',),
+    'places_nearby': ('location',),
+    'place': ('place_id',),
+}
+
+# Free-text params are case- and whitespace-insensitive; place_ids are not
+TEXT_PARAMS = {'address', 'query', 'keyword'}
+
+# How many inserts between eviction sweeps
+EVICT_EVERY = 500
+
+
+def _normalize(name, value):
+    if isinstance(value, str):
+        value = re.sub(r'\s+', ' ', value.strip())
+        return value.lower() if name in TEXT_PARAMS else value
+    if isinstance(value, float):
+        return round(value, 6)
+    if isinstance(value, dict):
+        return {k: _normalize(k, v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        items = [_normalize(name, v) for v in value]
+        # Field lists are order-insensitive; coordinates are not
+        return sorted(items) if name == 'fields' else items
+    return value
+
+
+def cache_key(endpoint, args, kwargs):
+    """Build a stable cache key for a client call"""
+    params = dict(zip(POSITIONAL_PARAMS.get(endpoint, ()), args))
+    params.update(kwargs)
+    normalized = {name: _normalize(name, value) for name, value in params.items() if value is not None}
+    return endpoint + ':' + json.dumps(normalized, sort_keys=True, separators=(',', ':'))
+
+
+class CachedClient:
+    """Wraps a googlemaps-style client and serves repeat calls from disk"""
+
+    def __init__(self, client, path=DEFAULT_CACHE_PATH, ttl=None, max_entries=DEFAULT_MAX_ENTRIES):
+        self.client = client
+        self.path = path
+        self.ttl = dict(DEFAULT_TTL)
+        self.ttl.update(ttl or {})
+        self.max_entries = max_entries
+        self.stats = Counter()
+        self.lock = threading.Lock()
+        self._inserts = 0
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                endpoint TEXT NOT NULL,
+                response TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_accessed ON responses(accessed_at)")
+
+    def _get(self, key, endpoint):
+        now = time.time()
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT response, created_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or now - row[1] > self.ttl.get(endpoint, 0):
+                return None
+            self.conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+        return json.loads(row[0])
+
+    def _put(self, key, endpoint, response):
+        now = time.time()
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO responses (key, endpoint, response, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, endpoint, json.dumps(response), now, now)
+            )
+            self._inserts += 1
+            if self._inserts % EVICT_EVERY == 0:
+                self._evict()
+
+    def _evict(self):
+        """Drop least-recently-used rows beyond max_entries (caller holds the lock)"""
+        count = self.conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        excess = count - self.max_entries
+        if excess > 0:
+            self.conn.execute("""
+                DELETE FROM responses WHERE key IN (
+                    SELECT key FROM responses ORDER BY accessed_at LIMIT ?
+                )
+            """, (excess,))
+            self.stats['evicted'] += excess
+
+    def _call(self, endpoint, *args, **kwargs):
+        key = cache_key(endpoint, args, kwargs)
+        cached = self._get(key, endpoint)
+        with self.lock:
+            self.stats['hits' if cached is not None else 'misses'] += 1
+        if cached is not None:
+            return cached
+
+        response = getattr(self.client, endpoint)(*args, **kwargs)
+        self._put(key, endpoint, response)
+        return response
+
+    def contains(self, endpoint, *args, **kwargs):
+        """True if this call would be answered from the cache"""
+        key = cache_key(endpoint, args, kwargs)
+        with self.lock:
+            row = self.conn.execute("SELECT created_at FROM responses WHERE key = ?", (key,)).fetchone()
+        return row is not None and time.time() - row[0] <= self.ttl.get(endpoint, 0)
+
+    def geocode(self, *args, **kwargs):
+        return self._call('geocode', *args, **kwargs)
+
+    def places(self, *args, **kwargs):
+        return self._call('places', *args, **kwargs)
+
+    def places_nearby(self, *args, **kwargs):
+        return self._call('places_nearby', *args, **kwargs)
+
+    def place(self, *args, **kwargs):
+        return self._call('place', *args, **kwargs)
+
+    def summary(self):
+        return f"{self.stats['hits']} cache hits, {self.stats['misses']} API calls"
+
+    def close(self):
+        with self.lock:
+            self._evict()
+            self.conn.close()
+
+
+def add_cache_arguments(parser):
+    """Add the --cache-db/--no-cache flags shared by the collectors"""
+    parser.add_argument('--cache-db', default=DEFAULT_CACHE_PATH,
+                        help='SQLite response cache (default: data/places_cache.sqlite3 or PLACES_CACHE_DB)')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='Always call the API instead of reusing cached responses')
+
+
+def cache_path_from_args(args):
+    return None if args.no_cache else args.cache_db
@@ -0,0 +1,311 @@
+"""
+Concurrent Google Places Fetch Engine
+Runs geocode/search/details calls on a bounded thread pool under
+per-endpoint token-bucket rate limits, and follows search next_page_tokens
+as deferred tasks so their activation delay overlaps other searches
+"""
+
+import os
+import argparse
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from gazetteer import GazetteerClient
+from places_cache import DEFAULT_CACHE_PATH, CachedClient
+
+# Default queries per second for each googlemaps endpoint we use
+DEFAULT_QPS = {
+    'geocode': 10,
+    'places': 10,
+    'places_nearby': 10,
+    'place': 10,
+}
+
+DEFAULT_WORKERS = 8
+
+# The Places API returns at most 3 pages of 20 search results
+MAX_PAGES = 3
+
+# A next_page_token is rejected (INVALID_REQUEST) for about 2 seconds after it
+# is issued; a too-early follow-up is retried a few times after a short wait
+PAGE_TOKEN_DELAY = 2.0
+PAGE_RETRY_DELAY = 1.0
+PAGE_RETRIES = 3
+
+
+class TokenBucket:
+    """Thread-safe token bucket - acquire() blocks until a token is available"""
+
+    def __init__(self, rate, capacity=1):
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class RateLimitedClient:
+    """Wraps a googlemaps.Client so every endpoint respects its own QPS budget"""
+
+    def __init__(self, client, qps=None):
+        self.client = client
+        rates = dict(DEFAULT_QPS)
+        rates.update(qps or {})
+        self.buckets = {endpoint: TokenBucket(rate) for endpoint, rate in rates.items()}
+
+    def _call(self, endpoint, *args, **kwargs):
+        self.buckets[endpoint].acquire()
+        return getattr(self.client, endpoint)(*args, **kwargs)
+
+    def geocode(self, *args, **kwargs):
+        return self._call('geocode', *args, **kwargs)
+
+    def places(self, *args, **kwargs):
+        return self._call('places', *args, **kwargs)
+
+    def places_nearby(self, *args, **kwargs):
+        return self._call('places_nearby', *args, **kwargs)
+
+    def place(self, *args, **kwargs):
+        return self._call('place', *args, **kwargs)
+
+
+def _token_not_ready(error):
+    """googlemaps raises ApiError('INVALID_REQUEST') for a page token that is not active yet"""
+    return getattr(error, 'status', None) == 'INVALID_REQUEST'
+
+
+class _SearchChain:
+    """One search plus its next_page_token follow-ups, merged into a single response.
+
+    No pool thread waits out a token's activation delay: each follow-up is
+    handed back to the pool by a timer, so other searches use the workers
+    in the meantime."""
+
+    def __init__(self, fetcher, endpoint, max_pages):
+        self.fetcher = fetcher
+        self.endpoint = endpoint
+        self.max_pages = max_pages
+        self.future = Future()
+        self.results = []
+        self.pages = 0
+
+    def request(self, kwargs, retries=0):
+        future = self.fetcher.submit(self.endpoint, **kwargs)
+        future.add_done_callback(lambda f: self._page_done(f, kwargs, retries))
+
+    def _page_done(self, future, kwargs, retries):
+        try:
+            response = future.result()
+        except Exception as e:
+            if not self.pages:
+                self.future.set_exception(e)
+            elif _token_not_ready(e) and retries < PAGE_RETRIES:
+                self.fetcher.defer(PAGE_RETRY_DELAY, self.request, kwargs, retries + 1)
+            else:
+                # Keep the pages we have; the leftover token marks the search as truncated
+                self._finish(kwargs['page_token'])
+            return
+
+        try:
+            self._next_page(response)
+        except Exception as e:
+            # A callback error would otherwise leave the search's Future unresolved
+            if not self.future.done():
+                self.future.set_exception(e)
+
+    def _next_page(self, response):
+        self.pages += 1
+        self.results.extend(response.get('results', []))
+        token = response.get('next_page_token')
+        if not token or self.pages >= self.max_pages:
+            self._finish(token)
+            return
+
+        # A cached follow-up page is served at once; a live token needs its activation delay
+        delay = 0 if self.fetcher.is_cached(self.endpoint, page_token=token) else PAGE_TOKEN_DELAY
+        self.fetcher.defer(delay, self.request, {'page_token': token})
+
+    def _finish(self, token):
+        response = {'status': 'OK' if self.results else 'ZERO_RESULTS', 'results': self.results, 'pages': self.pages}
+        if token:
+            response['next_page_token'] = token
+        self.future.set_result(response)
+
+
+class _SeenPlaces:
+    """A caller's seen place_ids plus every place_id another search already returned"""
+
+    def __init__(self, seen, returned):
+        self.seen = seen
+        self.returned = returned
+
+    def __contains__(self, place_id):
+        return place_id in self.seen or place_id in self.returned
+
+
+class PlacesFetcher:
+    """Bounded thread pool that issues client calls concurrently and counts requests"""
+
+    def __init__(self, client, max_workers=DEFAULT_WORKERS):
+        self.client = client
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+        self.request_counts = Counter()
+        self.lock = threading.Lock()
+        self.timers = set()
+        self.returned = set()
+        # Splits block while their quadrant searches run, so they get their own threads
+        self.splitter = ThreadPoolExecutor(max_workers=max_workers * 4)
+
+    def call(self, endpoint, *args, **kwargs):
+        """Run a single client call on the current thread"""
+        with self.lock:
+            self.request_counts[endpoint] += 1
+        return getattr(self.client, endpoint)(*args, **kwargs)
+
+    def submit(self, endpoint, *args, **kwargs):
+        """Schedule a client call on the pool and return its Future"""
+        return self.executor.submit(self.call, endpoint, *args, **kwargs)
+
+    def submit_search(self, endpoint, max_pages=MAX_PAGES, **kwargs):
+        """Schedule a places/places_nearby search that follows next_page_token up to max_pages.
+
+        The Future resolves to one response with every page's results and a
+        'pages' count (requests billed). 'next_page_token' is kept only when
+        pages were left unfetched, i.e. the search is still truncated."""
+        chain = _SearchChain(self, endpoint, max_pages)
+        chain.request(kwargs)
+        return chain.future
+
+    def search(self, endpoint, max_pages=MAX_PAGES, **kwargs):
+        """Run a paginated search and wait for the merged response"""
+        return self.submit_search(endpoint, max_pages, **kwargs).result()
+
+    def submit_refined(self, split_policy, endpoint, bounds, seen=(), max_pages=MAX_PAGES, **kwargs):
+        """Schedule a paginated search and split_policy.refine() its results over bounds.
+
+        Quadrant searches reuse kwargs with their own location and radius. The
+        Future resolves to (places, requests). Splits of different searches run
+        side by side, and a split only counts a place as new if no other search
+        has returned it."""
+        first = self.submit_search(endpoint, max_pages, **kwargs)
+
+        def search_many(circles):
+            futures = [self.submit_search(endpoint, max_pages, **dict(kwargs, location=(lat, lng), radius=radius))
+                       for lat, lng, radius in circles]
+            return [future.result() for future in futures]
+
+        def refined():
+            response = first.result()
+            self._returned(response.get('results', []))
+            extra, queries = split_policy.refine(response, bounds, search_many, _SeenPlaces(seen, self.returned))
+            self._returned(extra)
+            return response.get('results', []) + extra, response.get('pages', 1) + queries
+
+        return self.splitter.submit(refined)
+
+    def _returned(self, places):
+        with self.lock:
+            self.returned.update(place['place_id'] for place in places)
+
+    def defer(self, delay, fn, *args):
+        """Run fn(*args) after delay seconds without holding a pool thread"""
+        if delay <= 0:
+            fn(*args)
+            return
+
+        def fire():
+            with self.lock:
+                self.timers.discard(timer)
+            fn(*args)
+
+        timer = threading.Timer(delay, fire)
+        timer.daemon = True
+        with self.lock:
+            self.timers.add(timer)
+        timer.start()
+
+    def is_cached(self, endpoint, *args, **kwargs):
+        """True if the client's response cache would answer this call"""
+        contains = getattr(self.client, 'contains', None)
+        return bool(contains and contains(endpoint, *args, **kwargs))
+
+    def close(self):
+        self.splitter.shutdown(wait=True)
+        # Let deferred page-token follow-ups reach the pool before it shuts down
+        while True:
+            with self.lock:
+                timers = list(self.timers)
+            if not timers:
+                break
+            for timer in timers:
+                timer.join()
+        self.executor.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def client_options():
+    """Extra googlemaps.Client kwargs; GOOGLE_MAPS_BASE_URL redirects calls (e.g. to bench/fake_places_server.py)"""
+    base_url = os.getenv('GOOGLE_MAPS_BASE_URL')
+    return {'base_url': base_url.rstrip('/')} if base_url else {}
+
+
+def wrap_client(client, qps=None, cache_path=DEFAULT_CACHE_PATH, gazetteer=None):
+    """Standard client stack: offline gazetteer (optional) -> disk cache (optional)
+    -> rate limiter -> googlemaps.Client"""
+    wrapped = RateLimitedClient(client, qps)
+    if cache_path:
+        wrapped = CachedClient(wrapped, cache_path)
+    if gazetteer:
+        wrapped = GazetteerClient(wrapped, gazetteer)
+    return wrapped
+
+
+def add_pagination_argument(parser):
+    parser.add_argument('--max-pages', type=int, choices=range(1, MAX_PAGES + 1), default=MAX_PAGES,
+                        help=f'Result pages (20 places each) to fetch per search via next_page_token '
+                             f'(default: {MAX_PAGES}, the API maximum)')
+
+
+def qps_value(value):
+    """argparse type for one --qps value: (endpoint, rate) for ENDPOINT=RATE, (None, rate) for a bare RATE"""
+    endpoint, _, rate = value.rpartition('=')
+    if endpoint and endpoint not in DEFAULT_QPS:
+        raise argparse.ArgumentTypeError(f"unknown endpoint '{endpoint}' (choose from {', '.join(DEFAULT_QPS)})")
+    try:
+        rate = float(rate)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid rate '{rate}' (expected a number, e.g. 5 or places=2.5)")
+    if rate <= 0:
+        raise argparse.ArgumentTypeError(f"rate must be positive, got {rate:g}")
+    return endpoint or None, rate
+
+
+def parse_qps(values):
+    """Combine --qps values (see qps_value): a bare rate sets every endpoint, ENDPOINT=RATE sets one"""
+    qps = {}
+    for endpoint, rate in values or []:
+        if endpoint:
+            qps[endpoint] = rate
+        else:
+            qps.update({name: rate for name in DEFAULT_QPS})
+    return qps
@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+"""
+Query Yield History and Scheduler
+Records how many place_ids each (query, method, size class) search adds to
+what the run has already found, then orders and prunes search terms by that
+marginal yield per dollar (decayed, so old runs fade) so repeat sweeps skip
+terms that only re-find places other terms return
+
+Usage:
+    python query_yield.py                 # yield report for every size class
+    python query_yield.py --size-class metro
+"""
+
+import os
+import sqlite3
+import argparse
+import threading
+import time
+
+DEFAULT_YIELD_PATH = os.getenv(
+    'QUERY_YIELD_DB',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data', 'query_yield.sqlite3')
+)
+
+# Same flat estimate the collectors use for cost summaries
+COST_PER_QUERY = 0.017
+
+# Prune a term once it has this many runs in a size class averaging fewer new places per query
+DEFAULT_MIN_YIELD = 0.5
+DEFAULT_MIN_RUNS = 3
+
+# Weight of the newest run in a term's yield average, so old history fades
+DEFAULT_DECAY = 0.3
+
+# A pruned term is searched again after this many skips, so it can recover
+DEFAULT_PROBE_EVERY = 5
+
+# Records between writes to disk
+FLUSH_EVERY = 50
+
+SIZE_CLASSES = ('metro', 'city', 'town')
+
+
+def size_class(radius_m=None, expected=None):
+    """'metro' / 'city' / 'town' from a plan cell's expected places, else from the search radius"""
+    if expected is not None:
+        return 'metro' if expected >= 40 else 'city' if expected >= 10 else 'town'
+    return 'metro' if radius_m >= 30000 else 'city' if radius_m >= 16000 else 'town'
+
+
+class QueryScheduler:
+    """SQLite-backed yield history for (query, method, size class) search units.
+
+    A unit's history is [runs, queries, new_places, yield_runs, yield, skips]:
+    totals for the report (new_places = new to the place registry), the
+    decayed in-run yield per query the scheduler ranks by, and the number of
+    times it has been pruned since it last ran."""
+
+    def __init__(self, path=DEFAULT_YIELD_PATH, min_yield=DEFAULT_MIN_YIELD, min_runs=DEFAULT_MIN_RUNS,
+                 prune=True, decay=DEFAULT_DECAY, probe_every=DEFAULT_PROBE_EVERY):
+        self.path = path
+        self.min_yield = min_yield
+        self.min_runs = min_runs
+        self.prune = prune
+        self.decay = decay
+        self.probe_every = probe_every
+        self.lock = threading.Lock()
+        self.dirty = set()
+        self.seen = set()
+        self.pruned = 0
+        self.probed = 0
+        self.scheduled = 0
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS query_yield (
+                query TEXT NOT NULL,
+                method TEXT NOT NULL,
+                size_class TEXT NOT NULL,
+                runs INTEGER NOT NULL,
+                queries INTEGER NOT NULL,
+                new_places INTEGER NOT NULL,
+                yield_runs INTEGER NOT NULL DEFAULT 0,
+                yield REAL,
+                skips INTEGER NOT NULL DEFAULT 0,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (query, method, size_class)
+            )
+        """)
+        # Histories from before in-run yields were kept re-measure every term
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(query_yield)")}
+        for column, ddl in (('yield_runs', 'INTEGER NOT NULL DEFAULT 0'), ('yield', 'REAL'),
+                            ('skips', 'INTEGER NOT NULL DEFAULT 0')):
+            if column not in columns:
+                self.conn.execute(f"ALTER TABLE query_yield ADD COLUMN {column} {ddl}")
+        self.history = {
+            (query, method, cls): list(entry)
+            for query, method, cls, *entry in self.conn.execute(
+                "SELECT query, method, size_class, runs, queries, new_places, yield_runs, yield, skips "
+                "FROM query_yield")
+        }
+
+    def estimate(self, query, method, cls):
+        """Decayed new-to-this-run places per dollar, or None while the unit has too little history"""
+        entry = self.history.get((query, method, cls))
+        if not entry or entry[3] < self.min_runs or entry[4] is None:
+            return None
+        return entry[4] / COST_PER_QUERY
+
+    def schedule(self, units, cls):
+        """Order (query, method) units best-yield first and drop ones below min_yield.
+
+        Units without enough history keep their original order and run last,
+        so their yield is measured against what the proven terms already found.
+        A pruned unit still runs (after those) on every probe_every-th skip, so
+        a term whose area has changed gets a chance to recover."""
+        known, unknown = [], []
+        for i, (query, method) in enumerate(units):
+            estimate = self.estimate(query, method, cls)
+            if estimate is None:
+                unknown.append((query, method))
+            else:
+                known.append((-estimate, i, (query, method)))
+        known.sort()
+
+        floor = self.min_yield / COST_PER_QUERY
+        kept = [unit for negative, _, unit in known if not self.prune or -negative >= floor]
+        if not kept and not unknown and known:
+            # Never prune an area down to nothing - keep the single best term
+            kept = [known[0][2]]
+
+        pruned = [unit for _, _, unit in known if unit not in kept]
+        with self.lock:
+            probes = [unit for unit in pruned if self._skipped((*unit, cls))]
+
+        self.pruned += len(pruned) - len(probes)
+        self.probed += len(probes)
+        self.scheduled += len(kept) + len(unknown) + len(probes)
+        return kept + unknown + probes
+
+    def _skipped(self, key):
+        """Count one pruning of a unit; True once it is due a re-probe"""
+        entry = self.history[key]
+        entry[5] += 1
+        self.dirty.add(key)
+        return bool(self.probe_every) and entry[5] >= self.probe_every
+
+    def record(self, query, method, cls, queries, places, new_places):
+        """Log one finished unit: queries spent (incl. splits), the places it returned that
+        passed the hit filter, and how many of those were new to the place registry.
+
+        Its yield is the places no earlier search in this run returned, so a
+        term is scored on what it adds, not on whether past runs found it."""
+        with self.lock:
+            key = (query, method, cls)
+            place_ids = {place['place_id'] for place in places}
+            added = len(place_ids - self.seen)
+            self.seen |= place_ids
+
+            entry = self.history.setdefault(key, [0, 0, 0, 0, None, 0])
+            entry[0] += 1
+            entry[1] += queries
+            entry[2] += new_places
+            if queries:
+                observed = added / queries
+                entry[4] = observed if entry[4] is None else self.decay * observed + (1 - self.decay) * entry[4]
+                entry[3] += 1
+            entry[5] = 0
+            self.dirty.add(key)
+            if len(self.dirty) >= FLUSH_EVERY:
+                self._flush()
+
+    def _flush(self):
+        if not self.dirty:
+            return
+        now = time.time()
+        self.conn.executemany("""
+            INSERT INTO query_yield
+                (query, method, size_class, runs, queries, new_places, yield_runs, yield, skips, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (query, method, size_class) DO UPDATE SET
+                runs = excluded.runs,
+                queries = excluded.queries,
+                new_places = excluded.new_places,
+                yield_runs = excluded.yield_runs,
+                yield = excluded.yield,
+                skips = excluded.skips,
+                updated_at = excluded.updated_at
+        """, [(*key, *self.history[key], now) for key in self.dirty])
+        self.conn.commit()
+        self.dirty = set()
+
+    def summary(self):
+        return (f"Query scheduler: {self.scheduled} searches run ({self.probed} re-probes of pruned terms), "
+                f"{self.pruned} low-yield searches skipped (~${self.pruned * COST_PER_QUERY:.2f} saved)")
+
+    def close(self):
+        with self.lock:
+            self._flush()
+            self.conn.close()
+
+
+def add_scheduler_arguments(parser):
+    parser.add_argument('--yield-db', default=DEFAULT_YIELD_PATH,
+                        help='SQLite query-yield history (default: data/query_yield.sqlite3 or QUERY_YIELD_DB)')
+    parser.add_argument('--min-query-yield', type=float, default=DEFAULT_MIN_YIELD,
+                        help=f'Skip terms averaging fewer new places per query (default: {DEFAULT_MIN_YIELD})')
+    parser.add_argument('--no-prune', action='store_true',
+                        help='Run every search term (still ordered by and recorded into the yield history)')
+    parser.add_argument('--probe-every', type=int, default=DEFAULT_PROBE_EVERY,
+                        help=f'Search a pruned term again after this many skips, 0 = never '
+                             f'(default: {DEFAULT_PROBE_EVERY})')
+
+
+def scheduler_from_args(args):
+    return QueryScheduler(args.yield_db, args.min_query_yield, prune=not args.no_prune,
+                          probe_every=args.probe_every)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Show recorded marginal yield per search term')
+    parser.add_argument('--yield-db', default=DEFAULT_YIELD_PATH)
+    parser.add_argument('--size-class', choices=SIZE_CLASSES)
+    parser.add_argument('--min-query-yield', type=float, default=DEFAULT_MIN_YIELD)
+    args = parser.parse_args()
+
+    scheduler = QueryScheduler(args.yield_db, args.min_query_yield)
+    rows = sorted(
+        ((cls, per_query or 0, query, method, runs, queries, new_places, yield_runs)
+         for (query, method, cls), (runs, queries, new_places, yield_runs, per_query, _) in scheduler.history.items()
+         if not args.size_class or cls == args.size_class),
+        key=lambda row: (row[0], -row[1]))
+    scheduler.close()
+
+    if not rows:
+        print("❌ No yield history yet - run a collector first")
+        return 1
+
+    print(f"\n{'Class':<7}{'Query':<30}{'Method':<8}{'Runs':>6}{'Queries':>9}{'New':>7}{'Yield/query':>13}{'$/place':>9}")
+    print("-" * 89)
+    for cls, per_query, query, method, runs, queries, new_places, yield_runs in rows:
+        flag = '  ✂️' if yield_runs >= scheduler.min_runs and per_query < args.min_query_yield else ''
+        cost = f"{COST_PER_QUERY / per_query:.2f}" if per_query else '-'
+        print(f"{cls:<7}{query[:29]:<30}{method:<8}{runs:>6}{queries:>9}{new_places:>7}{per_query:>13.2f}{cost:>9}{flag}")
+    print("\nNew = new to the place registry; Yield/query = places no earlier search in the run returned, "
+          f"averaged with decay {scheduler.decay}")
+    print(f"✂️  = pruned by the scheduler (below {args.min_query_yield} after {scheduler.min_runs}+ runs; "
+          f"re-probed every {scheduler.probe_every} skips)")
+    return 0
+
+
+if __name__ == '__main__':
+    exit(main())
@@ -4,20 +4,10 @@ Recategorize Non-Food Locations
 Moves parks, recreation centers, etc. to appropriate categories
 """
 
-import psycopg2
-import os
-from dotenv import load_dotenv
-
-load_dotenv()
-
-def connect_db():
-    return psycopg2.connect(
-        host=os.getenv('DB_HOST', 'localhost'),
-        port=os.getenv('DB_PORT', '5432'),
-        database=os.getenv('DB_NAME', 'humanaid'),
-        user=os.getenv('DB_USER', 'postgres'),
-        password=os.getenv('DB_PASSWORD', 'humanaid2025')
-    )
+from db_stream import DEFAULT_ITERSIZE, add_itersize_argument, stream_rows
+from humanaid_db import connection, execute_many, transaction
+from keyword_matcher import KeywordMatcher, RuleMatcher
+from validation_state import ValidationState, add_full_argument, rules_hash, source_version
 
 # Category mappings
 RECATEGORIZE_RULES = [
@@ -57,6 +47,10 @@ FOOD_KEYWORDS = [
     'food shelf', 'emergency food'
 ]
 
+FOOD_MATCHER = KeywordMatcher(FOOD_KEYWORDS)
+RECATEGORIZE_MATCHER = RuleMatcher(RECATEGORIZE_RULES)
+RULES_HASH = rules_hash(RECATEGORIZE_RULES, FOOD_KEYWORDS)
+
 def ensure_categories_exist(conn):
     """Create new categories if they don't exist"""
     cur = conn.cursor()
@@ -84,57 +78,54 @@ def ensure_categories_exist(conn):
     conn.commit()
     cur.close()
 
-def find_resources_to_recategorize(conn):
+def find_resources_to_recategorize(conn, validation_state, itersize=DEFAULT_ITERSIZE):
     """Find resources that need recategorization"""
-    cur = conn.cursor()
-    
-    cur.execute("""
-        SELECT r.id, r.name, r.address, r.city, r.state
+    resources = stream_rows(conn, f"""
+        SELECT r.id, r.name, r.address, r.city, r.state, {source_version('r')} AS source_hash
         FROM resources r
         WHERE r.is_active = true AND r.approval_status = 'approved'
-        ORDER BY r.name
-    """)
-    
-    resources = cur.fetchall()
+          AND {validation_state.where('r')}
+        ORDER BY r.id
+    """, validation_state.params, itersize=itersize)
     to_recategorize = []
     
     for resource in resources:
-        res_id, name, address, city, state = resource
+        res_id, name, address, city, state, source_hash = resource
+        validation_state.mark(res_id, source_hash)
         name_lower = name.lower()
         
         # Skip if it has food keywords (keep in food categories)
-        if any(kw in name_lower for kw in FOOD_KEYWORDS):
+        if FOOD_MATCHER.search(name_lower):
             continue
         
         # Check if it matches recategorization rules
-        for rule in RECATEGORIZE_RULES:
-            if any(kw in name_lower for kw in rule['keywords']):
-                to_recategorize.append({
-                    'id': res_id,
-                    'name': name,
-                    'city': city,
-                    'state': state,
-                    'new_category': rule['new_category'],
-                    'category_name': rule['category_name']
-                })
-                break
+        rule = RECATEGORIZE_MATCHER.first(name_lower)
+        if rule:
+            to_recategorize.append({
+                'id': res_id,
+                'name': name,
+                'city': city,
+                'state': state,
+                'new_category': rule['new_category'],
+                'category_name': rule['category_name']
+            })
     
-    cur.close()
     return to_recategorize
 
-def recategorize_resources(dry_run=True):
+def recategorize_resources(conn, dry_run=True, itersize=DEFAULT_ITERSIZE, full=False):
     """Recategorize resources"""
-    conn = connect_db()
+    validation_state = ValidationState('recategorize_locations', RULES_HASH, full)
     
     print("\n📋 Step 1: Ensuring categories exist...")
     ensure_categories_exist(conn)
     
     print("\n🔍 Step 2: Finding resources to recategorize...")
-    to_recategorize = find_resources_to_recategorize(conn)
+    to_recategorize = find_resources_to_recategorize(conn, validation_state, itersize)
     
     if not to_recategorize:
         print("✅ No resources need recategorization!")
-        conn.close()
+        if not dry_run:
+            validation_state.save(conn)
         return
     
     # Group by category
@@ -160,7 +151,6 @@ def recategorize_resources(dry_run=True):
         print(f"\n🔵 DRY RUN MODE - No changes made")
         print("\nTo recategorize, run:")
         print("  python recategorize_locations.py --recategorize")
-        conn.close()
         return
     
     # Confirm
@@ -169,41 +159,37 @@ def recategorize_resources(dry_run=True):
     
     if response != 'RECATEGORIZE':
         print("❌ Cancelled.")
-        conn.close()
         return
     
     # Recategorize
-    cur = conn.cursor()
-    updated = 0
-    
-    for res in to_recategorize:
-        try:
-            # Get the category ID
-            cur.execute("SELECT id FROM categories WHERE slug = %s", (res['new_category'],))
-            cat_result = cur.fetchone()
-            if not cat_result:
+    with transaction(conn) as cur:
+        cur.execute("SELECT slug, id FROM categories")
+        category_ids = dict(cur.fetchall())
+        
+        assignments = []
+        skipped = []
+        for res in to_recategorize:
+            if res['new_category'] not in category_ids:
                 print(f"⚠️  Category {res['new_category']} not found for {res['name']}")
+                skipped.append(res['id'])
                 continue
-            
-            category_id = cat_result[0]
-            
-            # Remove old categories
-            cur.execute("DELETE FROM resource_categories WHERE resource_id = %s", (res['id'],))
-            
-            # Add new category
-            cur.execute("""
-                INSERT INTO resource_categories (resource_id, category_id)
-                VALUES (%s, %s)
-                ON CONFLICT DO NOTHING
-            """, (res['id'], category_id))
-            
-            updated += 1
-        except Exception as e:
-            print(f"❌ Error updating {res['name']}: {str(e)}")
-    
-    conn.commit()
-    cur.close()
-    conn.close()
+            assignments.append((res['id'], category_ids[res['new_category']]))
+        
+        # Remove old categories
+        cur.execute("DELETE FROM resource_categories WHERE resource_id = ANY(%s)",
+                    ([resource_id for resource_id, _ in assignments],))
+        
+        # Add new category
+        execute_many(cur, """
+            INSERT INTO resource_categories (resource_id, category_id)
+            VALUES (%s, %s)
+            ON CONFLICT DO NOTHING
+        """, assignments)
+        updated = len(assignments)
+    
+    # Skipped resources were never recategorized - leave them for the next run
+    validation_state.forget(skipped)
+    validation_state.save(conn)
     
     print(f"\n✅ Recategorized {updated} resources!")
 
@@ -211,9 +197,12 @@ def main():
     import argparse
     parser = argparse.ArgumentParser()
     parser.add_argument('--recategorize', action='store_true')
+    add_itersize_argument(parser)
+    add_full_argument(parser)
     args = parser.parse_args()
     
-    recategorize_resources(dry_run=not args.recategorize)
+    with connection() as conn:
+        recategorize_resources(conn, dry_run=not args.recategorize, itersize=args.itersize, full=args.full)
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,211 @@
+"""
+Streaming Resource Sink
+Collectors hand it resources as each search finishes; it upserts them in
+batches keyed on resources.google_place_id and links their categories, so
+collected places are live in seconds instead of after a CSV export/import
+
+An existing row is only rewritten when a column actually changed, and empty
+values (e.g. a phone number still waiting on place details) never blank out
+what the database already has. Rows imported without a place_id (CSV
+imports) are matched on name and address and adopt the place_id instead
+of being inserted twice
+"""
+
+import hashlib
+import re
+import threading
+import time
+
+from humanaid_db import connect, insert_values, transaction
+from import_csv import CATEGORY_MAPPING
+
+DEFAULT_SINK_BATCH = 200
+
+# Longest a queued resource waits for its batch to fill, in seconds
+DEFAULT_MAX_DELAY = 5.0
+
+# Columns refreshed when a known place_id comes back; slug, description and
+# moderation fields are left as they are
+UPDATE_COLUMNS = ['name', 'address', 'city', 'state', 'zip_code', 'county', 'phone', 'website']
+
+
+def _kept(column):
+    """New value unless it is empty, else the stored one"""
+    return f"COALESCE(NULLIF(EXCLUDED.{column}, ''), resources.{column})"
+
+
+UPSERT_SQL = f"""
+    INSERT INTO resources (
+        name, slug, address, city, state, zip_code, county,
+        location, phone, website, description, google_place_id,
+        approval_status, is_active, verified
+    ) VALUES %s
+    ON CONFLICT (google_place_id) DO UPDATE SET
+        {', '.join(f'{column} = {_kept(column)}' for column in UPDATE_COLUMNS)},
+        location = EXCLUDED.location
+    WHERE ({', '.join(f'resources.{column}' for column in UPDATE_COLUMNS)}, ST_AsBinary(resources.location))
+        IS DISTINCT FROM ({', '.join(_kept(column) for column in UPDATE_COLUMNS)}, ST_AsBinary(EXCLUDED.location))
+    RETURNING (xmax = 0) AS inserted
+"""
+
+UPSERT_TEMPLATE = """(
+    %s, %s, %s, %s, %s, %s, %s,
+    ST_SetSRID(ST_MakePoint(%s, %s), 4326),
+    %s, %s, %s, %s, 'approved', true, false
+)"""
+
+# Give rows without a place_id the place_id of a collected place with the same
+# name and address (the import_csv.py dedup keys), one row per place, so the
+# upsert updates them instead of inserting a duplicate
+BACKFILL_PLACE_ID_SQL = """
+    UPDATE resources r SET google_place_id = m.google_place_id
+    FROM (
+        SELECT DISTINCT ON (v.google_place_id) v.google_place_id, r.id
+        FROM (VALUES %s) AS v (google_place_id, name, address)
+        JOIN resources r ON LOWER(r.name) = LOWER(v.name)
+                        AND r.address != '' AND LOWER(r.address) = LOWER(v.address)
+        WHERE r.google_place_id IS NULL
+          AND NOT EXISTS (SELECT 1 FROM resources p WHERE p.google_place_id = v.google_place_id)
+        ORDER BY v.google_place_id, r.id
+    ) m
+    WHERE r.id = m.id
+    RETURNING r.id
+"""
+
+LINK_CATEGORIES_SQL = """
+    INSERT INTO resource_categories (resource_id, category_id)
+    SELECT r.id, c.id
+    FROM (VALUES %s) AS v (google_place_id, slug)
+    JOIN resources r ON r.google_place_id = v.google_place_id
+    JOIN categories c ON c.slug = v.slug
+    ON CONFLICT DO NOTHING
+"""
+
+
+def place_slug(name, place_id):
+    """URL slug that stays unique per place (a hash of its place_id, not its name)"""
+    base = re.sub(r'[^a-z0-9]+', '-', (name or '').lower()).strip('-')
+    return f"{base}-{hashlib.sha1(place_id.encode()).hexdigest()[:8]}"
+
+
+def category_slugs(resource):
+    """Category slugs of a collector row ('category') or Resource dict ('category_slugs')"""
+    if resource.get('category_slugs'):
+        return list(resource['category_slugs'])
+    slug = CATEGORY_MAPPING.get((resource.get('category') or '').lower())
+    return [slug] if slug else []
+
+
+class ResourceSink:
+    """Buffers collected resources and upserts them batch_size at a time
+    (or once the oldest has waited max_delay seconds).
+
+    Resources without a place_id are skipped - use import_csv.py for those.
+    A resource written again before its batch is flushed replaces the
+    buffered copy (e.g. once its place details arrive)."""
+
+    def __init__(self, conn=None, batch_size=DEFAULT_SINK_BATCH, max_delay=DEFAULT_MAX_DELAY):
+        self.own_conn = conn is None
+        self.conn = conn or connect()
+        self.batch_size = batch_size
+        self.max_delay = max_delay
+        self.lock = threading.Lock()
+        self.pending = {}
+        self.oldest = None
+        self.inserted = 0
+        self.matched = 0
+        self.updated = 0
+        self.unchanged = 0
+        self.skipped = 0
+        self.failed = 0
+
+    def write(self, resources):
+        """Queue resources (dicts) for upsert, flushing when the batch is full or overdue"""
+        with self.lock:
+            for resource in resources:
+                place_id = resource.get('place_id')
+                if not place_id or not resource.get('name'):
+                    self.skipped += 1
+                    continue
+                self.pending[place_id] = dict(resource)
+            if self.pending and self.oldest is None:
+                self.oldest = time.monotonic()
+            if self.pending and (len(self.pending) >= self.batch_size
+                                 or time.monotonic() - self.oldest >= self.max_delay):
+                self._flush()
+
+    def flush(self):
+        with self.lock:
+            self._flush()
+
+    def _flush(self):
+        if not self.pending:
+            return
+        batch, self.pending = list(self.pending.values()), {}
+        self.oldest = None
+
+        rows = [(
+            r['name'],
+            place_slug(r['name'], r['place_id']),
+            r.get('address') or '',
+            r.get('city') or '',
+            r.get('state') or '',
+            r.get('zip_code') or '',
+            r.get('county') or '',
+            float(r.get('longitude') or 0),
+            float(r.get('latitude') or 0),
+            r.get('phone') or '',
+            r.get('website') or '',
+            r.get('description') or f"{r['name']} in {r.get('city')}, {r.get('state')}",
+            r['place_id'],
+        ) for r in batch]
+        keys = [(r['place_id'], r['name'], r.get('address') or '') for r in batch]
+        links = [(r['place_id'], slug) for r in batch for slug in category_slugs(r)]
+
+        try:
+            with transaction(self.conn) as cur:
+                matched = insert_values(cur, BACKFILL_PLACE_ID_SQL, keys, fetch=True)
+                returned = insert_values(cur, UPSERT_SQL, rows, template=UPSERT_TEMPLATE, fetch=True)
+                if links:
+                    insert_values(cur, LINK_CATEGORIES_SQL, links)
+        except Exception as e:
+            # One bad batch should not end the collection - its places stay in the CSV export
+            print(f"  ⚠️  Upsert of {len(batch)} resources failed: {e}")
+            self.failed += len(batch)
+            return
+
+        inserted = sum(1 for (was_insert,) in returned if was_insert)
+        self.inserted += inserted
+        self.matched += len(matched)
+        self.updated += len(returned) - inserted
+        self.unchanged += len(batch) - len(returned)
+
+    def summary(self):
+        failed = f", {self.failed} failed" if self.failed else ''
+        skipped = f", {self.skipped} without a place_id skipped" if self.skipped else ''
+        matched = f", {self.matched} matched to rows imported without a place_id" if self.matched else ''
+        return (f"Database upsert: {self.inserted} inserted{matched}, {self.updated} updated, "
+                f"{self.unchanged} unchanged{failed}{skipped}")
+
+    def close(self):
+        self.flush()
+        if self.own_conn:
+            self.conn.close()
+
+
+def add_sink_arguments(parser):
+    parser.add_argument('--upsert', action='store_true',
+                        help='Upsert resources into the database (by google_place_id) as they are collected')
+    parser.add_argument('--upsert-batch', type=int, default=DEFAULT_SINK_BATCH,
+                        help=f'Resources per upsert round trip (default: {DEFAULT_SINK_BATCH})')
+
+
+def sink_from_args(args):
+    """A ResourceSink when --upsert was given and the database is reachable, else None"""
+    if not args.upsert:
+        return None
+    try:
+        return ResourceSink(batch_size=args.upsert_batch)
+    except Exception as e:
+        print(f"⚠️  Database unavailable, not upserting ({e})")
+        return None
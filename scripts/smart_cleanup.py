@@ -3,20 +3,7 @@
 Smart Database Cleanup - Only makes HIGHLY CONFIDENT changes
 """
 
-import psycopg2
-import os
-from dotenv import load_dotenv
-
-load_dotenv()
-
-def connect_db():
-    return psycopg2.connect(
-        host='localhost',
-        port='5432',
-        database='humanaid',
-        user='postgres',
-        password='humanaid2025'
-    )
+from humanaid_db import connection, execute_many, execute_prepared, prepare, transaction
 
 # REMOVALS - High confidence commercial businesses
 REMOVE_PATTERNS = [
@@ -69,20 +56,21 @@ RECATEGORIZE = {
     },
 }
 
-def find_and_remove_commercial(dry_run=True):
+def find_and_remove_commercial(conn, dry_run=True):
     """Remove obvious commercial businesses"""
-    conn = connect_db()
     cur = conn.cursor()
     
     removed = []
     
+    prepare(cur, 'find_active_by_name', """
+        SELECT id, name, city, state
+        FROM resources
+        WHERE name ILIKE $1
+        AND is_active = true
+    """, ['text'])
+    
     for name_pattern, reason in REMOVE_PATTERNS:
-        cur.execute("""
-            SELECT id, name, city, state
-            FROM resources
-            WHERE name ILIKE %s
-            AND is_active = true
-        """, (f'%{name_pattern}%',))
+        execute_prepared(cur, 'find_active_by_name', (f'%{name_pattern}%',))
         
         matches = cur.fetchall()
         for res_id, name, city, state in matches:
@@ -102,22 +90,20 @@ def find_and_remove_commercial(dry_run=True):
         print(f"  • {item['name']} - {item['city']}, {item['state']}")
         print(f"    Reason: {item['reason']}")
     
+    cur.close()
+    
     if not dry_run:
         print(f"\nRemoving {len(removed)} businesses...")
-        for item in removed:
-            cur.execute("DELETE FROM resource_categories WHERE resource_id = %s", (item['id'],))
-            cur.execute("DELETE FROM resources WHERE id = %s", (item['id'],))
-        conn.commit()
+        ids = [item['id'] for item in removed]
+        with transaction(conn) as cur:
+            cur.execute("DELETE FROM resource_categories WHERE resource_id = ANY(%s)", (ids,))
+            cur.execute("DELETE FROM resources WHERE id = ANY(%s)", (ids,))
         print(f"✅ Removed {len(removed)} businesses")
     
-    cur.close()
-    conn.close()
-    
     return len(removed)
 
-def recategorize_resources(dry_run=True):
+def recategorize_resources(conn, dry_run=True):
     """Recategorize obvious mismatches"""
-    conn = connect_db()
     cur = conn.cursor()
     
     changes = []
@@ -154,26 +140,23 @@ def recategorize_resources(dry_run=True):
         print(f"    {item['from']} → {item['to']}")
         print(f"    Reason: {item['reason']}\n")
     
+    cur.close()
+    
     if not dry_run:
         print(f"\nApplying {len(changes)} recategorizations...")
-        for item in changes:
-            # Get new category ID
-            cur.execute("SELECT id FROM categories WHERE slug = %s", (item['to'],))
-            new_cat_id = cur.fetchone()[0]
+        with transaction(conn) as cur:
+            # Get new category IDs
+            cur.execute("SELECT slug, id FROM categories")
+            category_ids = dict(cur.fetchall())
             
             # Update
-            cur.execute("""
+            execute_many(cur, """
                 UPDATE resource_categories 
                 SET category_id = %s 
                 WHERE resource_id = %s
-            """, (new_cat_id, item['id']))
-        
-        conn.commit()
+            """, [(category_ids[item['to']], item['id']) for item in changes])
         print(f"✅ Recategorized {len(changes)} resources")
     
-    cur.close()
-    conn.close()
-    
     return len(changes)
 
 def main():
@@ -186,8 +169,10 @@ def main():
     
     print(f"\n🧹 SMART CLEANUP - Only High-Confidence Changes")
     
-    removed = find_and_remove_commercial(dry_run)
-    recategorized = recategorize_resources(dry_run)
+    # Both phases share one pooled connection
+    with connection() as conn:
+        removed = find_and_remove_commercial(conn, dry_run)
+        recategorized = recategorize_resources(conn, dry_run)
     
     if dry_run:
         print(f"\n🔵 DRY RUN MODE - No changes made")
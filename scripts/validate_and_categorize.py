@@ -4,20 +4,14 @@ Comprehensive Database Validation and Auto-Categorization
 Checks every resource and automatically categorizes, recategorizes, or removes
 """
 
-import psycopg2
-import os
-from dotenv import load_dotenv
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import groupby, islice
 
-load_dotenv()
-
-def connect_db():
-    return psycopg2.connect(
-        host=os.getenv('DB_HOST', 'localhost'),
-        port=os.getenv('DB_PORT', '5432'),
-        database=os.getenv('DB_NAME', 'humanaid'),
-        user=os.getenv('DB_USER', 'postgres'),
-        password=os.getenv('DB_PASSWORD', 'humanaid2025')
-    )
+from db_stream import DEFAULT_ITERSIZE, add_itersize_argument, stream_rows
+from humanaid_db import connection, insert_values, transaction
+from keyword_matcher import KeywordMatcher, RuleMatcher
+from validation_state import ValidationState, add_full_argument, rules_hash, source_version
 
 # REMOVE these commercial businesses
 REMOVE_KEYWORDS = [
@@ -147,55 +141,157 @@ CATEGORIZATION_RULES = [
     },
 ]
 
+REMOVE_MATCHER = KeywordMatcher(REMOVE_KEYWORDS)
+KEEP_MATCHER = KeywordMatcher(KEEP_KEYWORDS)
+CATEGORIZATION_MATCHER = RuleMatcher(CATEGORIZATION_RULES)
+
+DEFAULT_BATCH_SIZE = 500  # resources per worker task
+
+# Changes whenever the keyword lists or rules do, forcing a full re-check
+RULES_HASH = rules_hash(REMOVE_KEYWORDS, KEEP_KEYWORDS, CATEGORIZATION_RULES)
+
 def should_remove(name, website=''):
     """Check if resource should be removed (commercial business)"""
     name_lower = name.lower()
     website_lower = (website or '').lower()
     
     # Keep if legitimate food assistance
-    for keyword in KEEP_KEYWORDS:
-        if keyword in name_lower:
-            return False
+    if KEEP_MATCHER.search(name_lower):
+        return False
     
     # Remove if commercial
-    for keyword in REMOVE_KEYWORDS:
-        if keyword in name_lower or keyword in website_lower:
-            return True
-    
-    return False
+    return REMOVE_MATCHER.search(name_lower) or REMOVE_MATCHER.search(website_lower)
 
 def get_correct_category(name, description=''):
     """Determine the correct category for a resource"""
     text = (name + ' ' + (description or '')).lower()
     
-    for rule in CATEGORIZATION_RULES:
-        # Check if matches keywords
-        if any(kw in text for kw in rule['keywords']):
-            # Check exclusions if any
-            if 'exclude' in rule and any(ex in text for ex in rule['exclude']):
-                continue
-            return rule['category'], rule['action']
+    # First rule whose keywords match and whose exclusions don't
+    rule = CATEGORIZATION_MATCHER.first(text)
+    if rule:
+        return rule['category'], rule['action']
     
     return None, None
 
-def validate_database(dry_run=True):
-    """Validate and fix all resources in database"""
-    conn = connect_db()
-    cur = conn.cursor()
+def iter_resources(rows, validation_state=None):
+    """Collapse streamed (resource, category) rows into one tuple per resource"""
+    for res_id, group in groupby(rows, key=lambda row: row.id):
+        group = list(group)
+        first = group[0]
+        current_cats = [row.category_slug for row in group if row.category_slug]
+        if validation_state:
+            validation_state.mark(res_id, first.source_hash)
+        yield res_id, first.name, first.description, first.city, first.state, first.website, current_cats
+
+def classify_resource(name, description, website, current_cats):
+    """Validation verdict for one resource: (verdict, category, action)"""
+    # Check if should be removed
+    if should_remove(name, website):
+        return 'remove', None, None
+    
+    # Get correct category
+    correct_cat, action = get_correct_category(name, description)
+    if not correct_cat:
+        return None, None, None
+    
+    # Check if already correctly categorized
+    if correct_cat in current_cats:
+        return 'correct', correct_cat, action
+    return 'recategorize', correct_cat, action
+
+def classify_batch(batch):
+    """Classify a list of resource tuples (runs in worker processes)"""
+    return [
+        classify_resource(name, description, website, current_cats)
+        for _, name, description, _, _, website, current_cats in batch
+    ]
+
+def _init_worker(keep_matcher, remove_matcher, categorization_matcher):
+    """Install the compiled rule tables once per worker process"""
+    global KEEP_MATCHER, REMOVE_MATCHER, CATEGORIZATION_MATCHER
+    KEEP_MATCHER = keep_matcher
+    REMOVE_MATCHER = remove_matcher
+    CATEGORIZATION_MATCHER = categorization_matcher
+
+def classify_batches(batches, workers=1):
+    """Yield (batch, verdicts) in input order, fanning batches out to worker processes"""
+    if workers <= 1:
+        for batch in batches:
+            yield batch, classify_batch(batch)
+        return
+    
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(KEEP_MATCHER, REMOVE_MATCHER, CATEGORIZATION_MATCHER)) as pool:
+        pending = deque()
+        for batch in batches:
+            pending.append((batch, pool.submit(classify_batch, batch)))
+            # Bound in-flight work so the DB stream never runs far ahead of the pool
+            if len(pending) >= workers * 2:
+                batch, future = pending.popleft()
+                yield batch, future.result()
+        while pending:
+            batch, future = pending.popleft()
+            yield batch, future.result()
+
+def load_category_ids(cur):
+    """Map of category slug -> id, fetched once per run"""
+    cur.execute("SELECT slug, id FROM categories")
+    return dict(cur.fetchall())
+
+def apply_fixes(conn, to_remove, to_recategorize):
+    """Apply all decisions as a few set-based statements in one transaction"""
+    with transaction(conn) as cur:
+        return _apply_decisions(cur, to_remove, to_recategorize)
+
+def _apply_decisions(cur, to_remove, to_recategorize):
+    category_ids = load_category_ids(cur)
+    
+    decisions = [(res['id'], 'remove', None) for res in to_remove]
+    skipped = []
+    for res in to_recategorize:
+        category_id = category_ids.get(res['new_category'])
+        if category_id is None:
+            print(f"⚠️  Unknown category {res['new_category']}, skipping {res['name']}")
+            skipped.append(res['id'])
+            continue
+        decisions.append((res['id'], 'recategorize', category_id))
     
-    # Get all resources
     cur.execute("""
-        SELECT r.id, r.name, r.description, r.city, r.state, r.website,
-               array_agg(c.slug) as current_categories
-        FROM resources r
-        LEFT JOIN resource_categories rc ON r.id = rc.resource_id
-        LEFT JOIN categories c ON rc.category_id = c.id
-        WHERE r.is_active = true AND r.approval_status = 'approved'
-        GROUP BY r.id
-        ORDER BY r.name
+        CREATE TEMP TABLE fix_decisions (
+            resource_id INTEGER PRIMARY KEY,
+            action VARCHAR(20) NOT NULL,
+            category_id INTEGER
+        ) ON COMMIT DROP
     """)
+    insert_values(cur, "INSERT INTO fix_decisions (resource_id, action, category_id) VALUES %s", decisions)
+    cur.execute("ANALYZE fix_decisions")
     
-    resources = cur.fetchall()
+    # Removed and recategorized resources both lose their current categories
+    cur.execute("""
+        DELETE FROM resource_categories rc
+        USING fix_decisions d
+        WHERE rc.resource_id = d.resource_id
+    """)
+    cur.execute("""
+        DELETE FROM resources r
+        USING fix_decisions d
+        WHERE r.id = d.resource_id AND d.action = 'remove'
+    """)
+    removed = cur.rowcount
+    cur.execute("""
+        INSERT INTO resource_categories (resource_id, category_id)
+        SELECT resource_id, category_id
+        FROM fix_decisions
+        WHERE action = 'recategorize'
+    """)
+    recategorized = cur.rowcount
+    
+    return removed, recategorized, skipped
+
+def validate_database(conn, dry_run=True, itersize=DEFAULT_ITERSIZE, workers=1, batch_size=DEFAULT_BATCH_SIZE,
+                      full=False):
+    """Validate and fix all resources in database"""
+    validation_state = ValidationState('validate_and_categorize', RULES_HASH, full)
     
     # Statistics
     to_remove = []
@@ -203,31 +299,42 @@ def validate_database(dry_run=True):
     correctly_categorized = []
     
     print(f"\n{'='*80}")
-    print(f"🔍 Validating {len(resources)} resources...")
+    print(f"🔍 Validating {'all' if full else 'new and changed'} resources...")
     print(f"{'='*80}\n")
     
-    for resource in resources:
-        res_id, name, description, city, state, website, current_cats = resource
-        
-        # Check if should be removed
-        if should_remove(name, website):
-            to_remove.append({
-                'id': res_id,
-                'name': name,
-                'city': city,
-                'state': state,
-                'reason': 'Commercial business'
-            })
-            continue
-        
-        # Get correct category
-        correct_cat, action = get_correct_category(name, description)
-        
-        if correct_cat:
-            # Check if already correctly categorized
-            if current_cats and correct_cat in current_cats:
+    # One row per (resource, category), streamed in id order so each
+    # resource's categories arrive together
+    rows = stream_rows(conn, f"""
+        SELECT r.id, r.name, r.description, r.city, r.state, r.website,
+               c.slug AS category_slug, {source_version('r')} AS source_hash
+        FROM resources r
+        LEFT JOIN resource_categories rc ON r.id = rc.resource_id
+        LEFT JOIN categories c ON rc.category_id = c.id
+        WHERE r.is_active = true AND r.approval_status = 'approved'
+          AND {validation_state.where('r')}
+        ORDER BY r.id
+    """, validation_state.params, itersize=itersize)
+    
+    resources = iter_resources(rows, validation_state)
+    batches = iter(lambda: list(islice(resources, batch_size)), [])
+    
+    validated = 0
+    for batch, decisions in classify_batches(batches, workers):
+        for resource, (verdict, correct_cat, action) in zip(batch, decisions):
+            res_id, name, description, city, state, website, current_cats = resource
+            validated += 1
+            
+            if verdict == 'remove':
+                to_remove.append({
+                    'id': res_id,
+                    'name': name,
+                    'city': city,
+                    'state': state,
+                    'reason': 'Commercial business'
+                })
+            elif verdict == 'correct':
                 correctly_categorized.append(name)
-            else:
+            elif verdict == 'recategorize':
                 to_recategorize.append({
                     'id': res_id,
                     'name': name,
@@ -239,7 +346,7 @@ def validate_database(dry_run=True):
                 })
     
     # Print summary
-    print(f"📊 VALIDATION SUMMARY:")
+    print(f"📊 VALIDATION SUMMARY ({validated} resources):")
     print(f"  ✅ Correctly categorized: {len(correctly_categorized)}")
     print(f"  🔄 Need recategorization: {len(to_recategorize)}")
     print(f"  ❌ Should be removed: {len(to_remove)}")
@@ -277,8 +384,6 @@ def validate_database(dry_run=True):
         print(f"\n🔵 DRY RUN MODE - No changes made")
         print("\nTo apply fixes, run:")
         print("  python validate_and_categorize.py --fix")
-        cur.close()
-        conn.close()
         return
     
     # Confirm
@@ -289,51 +394,20 @@ def validate_database(dry_run=True):
     
     if response != 'FIX':
         print("❌ Cancelled.")
-        cur.close()
-        conn.close()
         return
     
     # Apply fixes
     print("\n🔧 Applying fixes...")
     
-    # Remove commercial businesses
-    removed = 0
-    for res in to_remove:
-        try:
-            cur.execute("DELETE FROM resource_categories WHERE resource_id = %s", (res['id'],))
-            cur.execute("DELETE FROM resources WHERE id = %s", (res['id'],))
-            removed += 1
-        except Exception as e:
-            print(f"❌ Error removing {res['name']}: {str(e)}")
-    
-    # Recategorize resources
-    recategorized = 0
-    for res in to_recategorize:
-        try:
-            # Get category ID
-            cur.execute("SELECT id FROM categories WHERE slug = %s", (res['new_category'],))
-            cat_result = cur.fetchone()
-            if not cat_result:
-                continue
-            
-            category_id = cat_result[0]
-            
-            # Remove old categories
-            cur.execute("DELETE FROM resource_categories WHERE resource_id = %s", (res['id'],))
-            
-            # Add new category
-            cur.execute("""
-                INSERT INTO resource_categories (resource_id, category_id)
-                VALUES (%s, %s)
-            """, (res['id'], category_id))
-            
-            recategorized += 1
-        except Exception as e:
-            print(f"❌ Error recategorizing {res['name']}: {str(e)}")
+    try:
+        removed, recategorized, skipped = apply_fixes(conn, to_remove, to_recategorize)
+    except Exception as e:
+        print(f"❌ Error applying fixes, nothing changed: {str(e)}")
+        return
     
-    conn.commit()
-    cur.close()
-    conn.close()
+    # Skipped decisions were never applied - leave them for the next run
+    validation_state.forget(skipped)
+    validation_state.save(conn)
     
     print(f"\n✅ COMPLETE!")
     print(f"  ❌ Removed: {removed} commercial businesses")
@@ -343,9 +417,17 @@ def main():
     import argparse
     parser = argparse.ArgumentParser()
     parser.add_argument('--fix', action='store_true', help='Apply fixes (default is dry run)')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='Classify resources in N worker processes (default: 1, in-process)')
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+                        help=f'Resources per worker task (default: {DEFAULT_BATCH_SIZE})')
+    add_itersize_argument(parser)
+    add_full_argument(parser)
     args = parser.parse_args()
     
-    validate_database(dry_run=not args.fix)
+    with connection() as conn:
+        validate_database(conn, dry_run=not args.fix, itersize=args.itersize,
+                          workers=args.workers, batch_size=args.batch_size, full=args.full)
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,89 @@
+"""
+Incremental Validation State
+Remembers, per ruleset and resource, the rule-set hash and content hash
+each resource was last classified at, so a run only re-checks rows whose
+content, categories or rules changed since the last applied run
+"""
+
+import hashlib
+import json
+
+from psycopg2.extras import execute_values
+
+
+def rules_hash(*tables):
+    """Stable hash of a script's keyword lists and rule tables"""
+    payload = json.dumps(tables, sort_keys=True, default=sorted)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def source_version(alias='r'):
+    """SQL for a resource's content hash: the fields the rules read plus its sorted category ids.
+
+    Computed from the row itself, so edits made through the app (which bump no
+    version column) and category changes both mark a resource as changed"""
+    return f"""md5(ROW(
+        {alias}.name, {alias}.address, {alias}.city, {alias}.state, {alias}.website, {alias}.description,
+        ARRAY(SELECT rc.category_id FROM resource_categories rc WHERE rc.resource_id = {alias}.id
+              ORDER BY rc.category_id)
+    )::text)"""
+
+
+class ValidationState:
+    """Selects resources still to classify under a ruleset, and records them once applied"""
+
+    def __init__(self, ruleset, rules_hash, full=False):
+        self.ruleset = ruleset
+        self.rules_hash = rules_hash
+        self.full = full
+        self.classified = []
+
+    @property
+    def params(self):
+        return {'ruleset': self.ruleset, 'rules_hash': self.rules_hash}
+
+    def where(self, alias='r'):
+        """WHERE fragment (named params, see .params) skipping rows already classified"""
+        if self.full:
+            return 'TRUE'
+        return f"""NOT EXISTS (
+            SELECT 1 FROM resource_validation_state s
+            WHERE s.ruleset = %(ruleset)s
+              AND s.resource_id = {alias}.id
+              AND s.rules_hash = %(rules_hash)s
+              AND s.source_hash = {source_version(alias)}
+        )"""
+
+    def mark(self, resource_id, source_hash):
+        self.classified.append((resource_id, source_hash))
+
+    def forget(self, resource_ids):
+        """Drop resources whose decision was not applied, so the next run re-checks them"""
+        resource_ids = set(resource_ids)
+        self.classified = [(resource_id, source_hash) for resource_id, source_hash in self.classified
+                           if resource_id not in resource_ids]
+
+    def save(self, conn):
+        """Record every classified resource - only call once the run's changes are applied"""
+        cur = conn.cursor()
+        rows = [(self.ruleset, resource_id, self.rules_hash, source_hash)
+                for resource_id, source_hash in self.classified]
+        # Resources deleted by this run are dropped by the join
+        execute_values(cur, """
+            INSERT INTO resource_validation_state (ruleset, resource_id, rules_hash, source_hash)
+            SELECT v.ruleset, v.resource_id, v.rules_hash, v.source_hash
+            FROM (VALUES %s) AS v (ruleset, resource_id, rules_hash, source_hash)
+            JOIN resources r ON r.id = v.resource_id
+            ON CONFLICT (ruleset, resource_id) DO UPDATE SET
+                rules_hash = EXCLUDED.rules_hash,
+                source_hash = EXCLUDED.source_hash,
+                validated_at = CURRENT_TIMESTAMP
+        """, rows, template='(%s, %s, %s, %s)', page_size=1000)
+        conn.commit()
+        cur.close()
+        print(f"📝 Recorded validation state for {len(self.classified)} resources ({self.ruleset})")
+
+
+def add_full_argument(parser):
+    parser.add_argument('--full', action='store_true',
+                        help='Re-check every resource, not just those new or changed since the last applied run')
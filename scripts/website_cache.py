@@ -0,0 +1,105 @@
+"""
+Conditional-GET Website Content Cache
+Stores extracted page text with its ETag/Last-Modified validators, a content
+hash and the last analysis result, so unchanged pages are neither re-parsed
+nor re-analyzed
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+
+DEFAULT_CACHE_PATH = os.getenv(
+    'WEBSITE_CACHE_DB',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data', 'website_cache.sqlite3')
+)
+
+CachedPage = namedtuple('CachedPage', [
+    'url', 'etag', 'last_modified', 'content_hash', 'text',
+    'analysis_key', 'category', 'reason', 'fetched_at'
+])
+
+
+def content_hash(body):
+    return hashlib.sha256(body).hexdigest()
+
+
+def analysis_key(*inputs):
+    """Hash of the non-page inputs to the analysis (name, description, ...)"""
+    return hashlib.sha256('\x1f'.join(i or '' for i in inputs).encode('utf-8')).hexdigest()
+
+
+class WebsiteCache:
+    """SQLite store of page text, HTTP validators and cached analysis per URL"""
+
+    def __init__(self, path=DEFAULT_CACHE_PATH):
+        self.path = path
+        self.lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS pages (
+                url TEXT PRIMARY KEY,
+                etag TEXT,
+                last_modified TEXT,
+                content_hash TEXT NOT NULL,
+                text TEXT,
+                analysis_key TEXT,
+                category TEXT,
+                reason TEXT,
+                fetched_at REAL NOT NULL
+            )
+        """)
+
+    def get(self, url):
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT url, etag, last_modified, content_hash, text, analysis_key, category, reason, fetched_at "
+                "FROM pages WHERE url = ?", (url,)
+            ).fetchone()
+        return CachedPage(*row) if row else None
+
+    @staticmethod
+    def conditional_headers(page):
+        """If-None-Match / If-Modified-Since headers for a cached page"""
+        headers = {}
+        if page and page.etag:
+            headers['If-None-Match'] = page.etag
+        if page and page.last_modified:
+            headers['If-Modified-Since'] = page.last_modified
+        return headers
+
+    def store(self, url, etag, last_modified, body_hash, text):
+        """Save a changed page; its previous analysis no longer applies"""
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO pages "
+                "(url, etag, last_modified, content_hash, text, analysis_key, category, reason, fetched_at) "
+                "VALUES (?, ?, ?, ?, ?, NULL, NULL, NULL, ?)",
+                (url, etag, last_modified, body_hash, text, time.time())
+            )
+
+    def touch(self, url, etag, last_modified):
+        """Record a revalidation of an unchanged page"""
+        with self.lock:
+            self.conn.execute(
+                "UPDATE pages SET etag = COALESCE(?, etag), last_modified = COALESCE(?, last_modified), "
+                "fetched_at = ? WHERE url = ?",
+                (etag, last_modified, time.time(), url)
+            )
+
+    def store_analysis(self, url, key, category, reason):
+        with self.lock:
+            self.conn.execute(
+                "UPDATE pages SET analysis_key = ?, category = ?, reason = ? WHERE url = ?",
+                (key, category, reason, url)
+            )
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
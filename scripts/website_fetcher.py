@@ -0,0 +1,189 @@
+"""
+Concurrent Website Fetcher
+Thread-pooled HTTP client with keep-alive sessions, a global concurrency cap,
+per-host queues (a busy host's URLs wait without holding a worker) and a hard
+deadline on each whole request, redirects and body included
+"""
+
+import socket
+import threading
+import time
+from collections import defaultdict, deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+USER_AGENT = 'Mozilla/5.0 (compatible; HumanAid/1.0; +https://humanaid.org)'
+
+DEFAULT_WORKERS = 32
+DEFAULT_PER_HOST = 2
+DEFAULT_TIMEOUT = 10      # seconds per connect/read
+DEFAULT_DEADLINE = 15     # seconds for the whole request including redirects and body
+MAX_BODY_BYTES = 2 * 1024 * 1024
+
+
+class DeadlineExceeded(requests.exceptions.Timeout):
+    pass
+
+
+def _host(url):
+    return (urlsplit(url).hostname or '').lower()
+
+
+def _abort(response, expired):
+    """Watchdog: shut the socket down so a body read stuck past the deadline returns"""
+    expired.set()
+    try:
+        if hasattr(response.raw, 'shutdown'):
+            response.raw.shutdown()  # urllib3 >= 2.3
+        else:
+            sock = getattr(getattr(response.raw, 'connection', None), 'sock', None)
+            if sock:
+                sock.shutdown(socket.SHUT_RDWR)
+    except OSError:
+        pass
+
+
+class WebsiteFetcher:
+    """Fetches many URLs concurrently while staying polite to each host"""
+
+    def __init__(self, max_workers=DEFAULT_WORKERS, per_host=DEFAULT_PER_HOST,
+                 timeout=DEFAULT_TIMEOUT, deadline=DEFAULT_DEADLINE):
+        self.max_workers = max_workers
+        self.per_host = per_host
+        self.timeout = timeout
+        self.deadline = deadline
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+        self.local = threading.local()
+        self.host_lock = threading.Condition()
+        self.host_active = defaultdict(int)
+        self.host_waiting = defaultdict(deque)
+        self.outstanding = 0
+
+    def _session(self):
+        """One keep-alive session per worker thread"""
+        session = getattr(self.local, 'session', None)
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=self.max_workers, pool_maxsize=self.max_workers)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            session.headers['User-Agent'] = USER_AGENT
+            self.local.session = session
+        return session
+
+    def _remaining(self, url, deadline):
+        """Connect/read timeout for the next step of a request, capped by its deadline"""
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise DeadlineExceeded(f"{url} took longer than {self.deadline}s")
+        return min(self.timeout, remaining)
+
+    def get(self, url, headers=None):
+        """GET a URL; returns (response, body). Connects, redirects and the body
+        all share one deadline - DeadlineExceeded once it passes"""
+        deadline = time.monotonic() + self.deadline
+        try:
+            response = self._open(url, headers, deadline)
+        except requests.exceptions.Timeout as e:
+            if time.monotonic() >= deadline:
+                raise DeadlineExceeded(f"{url} took longer than {self.deadline}s") from e
+            raise
+
+        # A read blocked on a slow server is cut off by the watchdog, not just checked between chunks
+        expired = threading.Event()
+        watchdog = threading.Timer(max(0.0, deadline - time.monotonic()), _abort, (response, expired))
+        watchdog.daemon = True
+        watchdog.start()
+        try:
+            chunks = []
+            size = 0
+            for chunk in response.iter_content(chunk_size=65536):
+                chunks.append(chunk)
+                size += len(chunk)
+                if size >= MAX_BODY_BYTES or expired.is_set():
+                    break
+        except Exception as e:
+            if expired.is_set():
+                raise DeadlineExceeded(f"{url} took longer than {self.deadline}s") from e
+            raise
+        finally:
+            watchdog.cancel()
+            response.close()
+        if expired.is_set():
+            raise DeadlineExceeded(f"{url} took longer than {self.deadline}s")
+        return response, b''.join(chunks)
+
+    def _open(self, url, headers, deadline):
+        """Send the request, following redirects one hop at a time so each hop's
+        timeouts fit the deadline; returns the final (streamed) response"""
+        session = self._session()
+        response = session.get(url, headers=headers, timeout=self._remaining(url, deadline),
+                               allow_redirects=False, stream=True)
+        for _ in range(session.max_redirects):
+            if not response.is_redirect:
+                return response
+            response.close()
+            response = session.send(response.next, timeout=self._remaining(url, deadline),
+                                    allow_redirects=False, stream=True)
+        response.close()
+        raise requests.exceptions.TooManyRedirects(f"{url} exceeded {session.max_redirects} redirects")
+
+    def submit(self, url, func, *args):
+        """Schedule func(*args), which fetches url, and return its Future.
+
+        It reaches the pool only once url's host has fewer than per_host
+        fetches running; until then it waits in the host's queue."""
+        future = Future()
+        host = _host(url)
+        with self.host_lock:
+            self.outstanding += 1
+            if self.host_active[host] >= self.per_host:
+                self.host_waiting[host].append((future, func, args))
+                return future
+            self.host_active[host] += 1
+        self._start(host, future, func, args)
+        return future
+
+    def _start(self, host, future, func, args):
+        task = self.executor.submit(func, *args)
+        task.add_done_callback(lambda done: self._finished(host, future, done))
+
+    def _finished(self, host, future, task):
+        # Hand the host's slot straight to its next queued fetch
+        with self.host_lock:
+            queued = self.host_waiting[host].popleft() if self.host_waiting[host] else None
+            if queued is None:
+                self.host_active[host] -= 1
+        if queued:
+            self._start(host, *queued)
+
+        error = task.exception()
+        if error is None:
+            future.set_result(task.result())
+        else:
+            future.set_exception(error)
+        with self.host_lock:
+            self.outstanding -= 1
+            self.host_lock.notify_all()
+
+    def map(self, func, items, url=lambda item: item):
+        """Apply func(item) on the pool, per_host at a time for each url(item)'s host;
+        yields results in input order"""
+        futures = [self.submit(url(item), func, item) for item in items]
+        return (future.result() for future in futures)
+
+    def close(self):
+        # Queued fetches are started from finishing ones, so drain them before shutdown
+        with self.host_lock:
+            while self.outstanding:
+                self.host_lock.wait()
+        self.executor.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()